@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+#! /usr/bin/env python
+"""
+This benchmark measures the per-call overhead of the aggregated function
+monitoring (:class:`CallStatistics`) and compares it to the default
+function monitoring.
+
+Usage: python aggregate_overhead.py [budget_in_us]
+
+The exit status is 1 if the aggregated overhead exceeds the budget
+(Default : 2 us).
+"""
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+
+import sys
+import timeit
+
+from progressmonitor.stats import CallStatistics
+from progressmonitor.monitor import monitor_function
+from functools import partial
+
+
+def noop(x):
+    return x
+
+def hook(task, exception=None):
+    pass
+
+
+def per_call(function, number):
+    """Best per-call time (in seconds) over a few repetitions"""
+    timer = timeit.Timer(lambda: function(1))
+    return min(timer.repeat(5, number)) / number
+
+
+if __name__ == '__main__':
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 2.
+    number = 200000
+
+    aggregated = CallStatistics("noop", flush_period=None).wrap(noop)
+    monitored = partial(monitor_function, noop, hook, None)
+
+    raw_t = per_call(noop, number)
+    agg_t = per_call(aggregated, number)
+    mon_t = per_call(monitored, number)
+
+    overhead = (agg_t - raw_t) * 1e6
+    print "Raw call:                %.3f us" % (raw_t * 1e6)
+    print "Aggregated call:         %.3f us (overhead: %.3f us)" % \
+        (agg_t * 1e6, overhead)
+    print "Monitored call (no-op):  %.3f us (overhead: %.3f us)" % \
+        (mon_t * 1e6, (mon_t - raw_t) * 1e6)
+    print "Budget:                  %.3f us" % budget
+
+    sys.exit(0 if overhead <= budget else 1)
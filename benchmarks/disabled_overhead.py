@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+#! /usr/bin/env python
+"""
+This benchmark shows that a disabled monitor costs nothing per iteration:
+the iterable handed back by :func:`monitor_with` is the original one, so
+iterating over it takes the same time as iterating over the raw iterable.
+
+Usage: PROGRESSMONITOR_DISABLE=1 python disabled_overhead.py
+(or without the environment variable: the switch is then turned off through
+the API)
+"""
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+
+import sys
+import timeit
+
+from progressmonitor import (monitor_with, dict_config, disable_monitoring,
+                             is_monitoring_enabled)
+
+
+def iterate(iterable):
+    for _ in iterable:
+        pass
+
+
+if __name__ == '__main__':
+    length = 1000000
+    dict_config({
+        "version": 1,
+        "generator_monitors": {
+            "bench": {"rate": 0.1, "callback_factory": "$stdout"}
+        }
+    })
+    if is_monitoring_enabled():
+        disable_monitoring()
+
+    data = range(length)
+    monitored = monitor_with("bench")(data)
+
+    raw_t = min(timeit.Timer(lambda: iterate(data)).repeat(5, 1))
+    dis_t = min(timeit.Timer(lambda: iterate(monitored)).repeat(5, 1))
+
+    print "Same object:              %s" % (monitored is data)
+    print "Raw iteration:            %.3f ns/iteration" % (raw_t*1e9/length)
+    print "Disabled monitor:         %.3f ns/iteration" % (dis_t*1e9/length)
+
+    sys.exit(0 if monitored is data else 1)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+#! /usr/bin/env python
+"""
+This benchmark measures the time and memory taken by a million short
+tasks: the per-call cost of :func:`monitor_function` (one
+:class:`FunctionalTask` per call) and of a bare task lifecycle, as well as
+the memory held by a million live tasks.
+
+The per-call cost is compared to the one of a reference monitor, which does
+what :func:`monitor_function` did before the tasks were linked, aggregated
+and registered (a task with an eagerly built name, timed with `time.time`,
+and the two hook calls).
+
+Usage: python task_allocation.py [nb_tasks] [budget]
+
+The exit status is 1 if a monitored call costs more than `budget` times a
+call of the reference monitor (Default : 1.5).
+"""
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+
+import sys
+import time
+import timeit
+import resource
+
+from progressmonitor.monitor import (ProgressableTask, FunctionalTask,
+                                     monitor_function)
+
+
+def noop(x):
+    return x
+
+def hook(task, exception=None):
+    pass
+
+
+class ReferenceTask(object):
+    """The functional task of the reference monitor"""
+    nb_tasks = 0
+
+    def __init__(self, function, args, kwargs, name=None):
+        self._id = ReferenceTask.nb_tasks
+        ReferenceTask.nb_tasks += 1
+        if name is None:
+            name = "Unnamed_task." + str(self._id)
+        self._name = name
+        self._nb_steps = 1
+        self._progress = 0
+        self._status = 0
+        self._end_time = None
+        self._start_time = time.time()
+        self._function = function
+        self._args = args
+        self._kwargs = kwargs
+        self._result = None
+        self._is_set = False
+
+    def set_result(self, result):
+        if self._is_set:
+            raise TypeError("Result can only be set once.")
+        self._result = result
+        self._is_set = True
+
+    def update(self, progress):
+        if self._status > 1:
+            return self._status == 2
+        self._status = 1
+        self._progress = progress
+        return progress >= self._nb_steps
+
+    def close(self, finished=True):
+        self._status = 2 if finished else 3
+        self._end_time = time.time()
+
+
+def reference_monitor(function, hook, task_name=None, *args, **kwargs):
+    """The reference monitor"""
+    task = ReferenceTask(function, args, kwargs, task_name)
+    try:
+        hook(task, None)
+        result = function(*args, **kwargs)
+        task.set_result(result)
+        task.update(1)
+        task.close(True)
+        hook(task, None)
+    except Exception as excep:
+        task.close(False)
+        hook(task, excep)
+        raise
+    return result
+
+
+def lifecycle():
+    task = ProgressableTask(1)
+    task.start()
+    task.update(1)
+    task.close(True)
+
+
+def timed(function, nb_tasks):
+    """Best time per task (in seconds) over a few repetitions"""
+    number = max(1, nb_tasks // 5)
+    return min(timeit.Timer(function).repeat(5, number)) / number
+
+
+def max_rss():
+    """Peak resident set size (in bytes, Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+if __name__ == '__main__':
+    nb_tasks = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else 1.5
+
+    ref_t = timed(lambda: reference_monitor(noop, hook, None, 1), nb_tasks)
+    call_t = timed(lambda: monitor_function(noop, hook, None, 1), nb_tasks)
+    life_t = timed(lifecycle, nb_tasks)
+
+    before = max_rss()
+    tasks = [FunctionalTask(noop, (), {}) for _ in xrange(nb_tasks)]
+    held = max_rss() - before
+
+    ratio = call_t / ref_t
+    print "Tasks:                   %d" % nb_tasks
+    print "Reference call:          %.3f us" % (ref_t * 1e6)
+    print "monitor_function call:   %.3f us (%.2f x the reference)" % \
+        (call_t * 1e6, ratio)
+    print "Task lifecycle:          %.3f us" % (life_t * 1e6)
+    print "Task size:               %d bytes" % sys.getsizeof(tasks[0])
+    print "Memory held by the tasks: %.1f MB (%.0f bytes per task)" % \
+        (held / 1e6, float(held) / nb_tasks)
+    # Unnamed tasks do not build their name until it is requested
+    print "Name (built on access):  %s" % tasks[-1].name
+    print "Budget:                  %.2f x the reference" % budget
+
+    sys.exit(0 if ratio <= budget else 1)
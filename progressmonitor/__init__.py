@@ -80,6 +80,10 @@ Callbacks
 The callbacks concern all types of monitoring relying on formatters. They
 are responsible for disposing of the string yielded by them.
 
+Concurrent tasks writing on the same terminal can share a :class:`Dashboard`
+(`$dashboard` callback) which assigns a line to each live task and redraws
+them in place (see :mod:`dashboard`).
+
 See :mod:`callback` for more information.
 
 Factories
@@ -109,6 +113,147 @@ done.
 
 See :func:`report_hook_factory` for more information.
 
+Structured events
+-----------------
+Instead of human-readable strings, monitors can issue structured events
+(task id, name, progress, total, timestamps, status, exception type, rate
+and remaining time) as compact JSON lines or binary msgpack strings. Pass
+`hook_factory=structured_hook_factory` (`$json` in the configuration) to the
+monitor factories.
+
+See :func:`structured_hook_factory` for more information.
+
+Event log
+---------
+For post-mortem analysis, `hook_factory=eventlog_hook_factory` (`$eventlog`
+in the configuration) appends fixed-size binary records to a memory-mapped
+ring file (`eventlog_path` argument), which outlives a crash of the process.
+The log is decoded with `python -m progressmonitor.eventlog <path>`.
+
+See :mod:`eventlog` for more information.
+
+Additional hooks
+----------------
+The monitor factories issue the hooks built by their `hook_factories`
+argument alongside the main hook. For instance, `prometheus_hook_factory`
+(`$prometheus`) exposes the tasks as Prometheus metrics from a small HTTP
+server bound to localhost (`prometheus_port` argument). The metrics are read
+from the tasks at scrape time.
+
+See :mod:`prometheus` for more information.
+
+Similarly, `statsd_hook_factory` (`$statsd`) sends progress gauges,
+completion/failure counters and durations as batched StatsD datagrams (see
+:mod:`statsd`). The metrics of a monitor are named after its `task_name`, its
+name in the configuration or the monitored function (`metric_name`
+argument), never after the individual tasks.
+
+An additional hook can be given as a dictionary with its own notification
+rule and arguments (e.g. `{"hook_factory": statsd_hook_factory,
+"rule_factory": periodic_rule_factory, "period": 300}`), so that each
+destination is notified at its own pace. The hooks are dispatched by a
+:class:`ProgressListener`: the failure of one does not affect the others and
+slow ones can run from a background thread (`"threaded": True`).
+
+Tracing
+-------
+A task created while another monitored task runs (e.g. a generator iterated
+by a monitored function) is its child: tasks carry a `trace_id` and a
+`parent_id`. A monitored generator only runs while it produces an element:
+the tasks created by the loop consuming it are not its children (those
+created by the generator it wraps are). `chrome_trace_hook_factory`
+(`$chrome_trace`) writes the finished tasks as a trace event file
+(`trace_path` argument) loadable in a trace viewer.
+
+See :mod:`trace` for more information.
+
+Task trees
+----------
+A generator or code monitor given a `weight` accounts for that many steps of
+the task within which it is created (see Tracing): the progress of the
+parent includes the fractional progress of its running weighted children,
+so that its progress bar and remaining time reflect the nested work. The
+parent holds its running children weakly: an abandoned child stops
+contributing once collected. The `$subtasks` formatter displays the running
+children.
+
+Clocks
+------
+Durations (of the tasks, the notification rules, the estimations, ...) are
+measured with an injectable clock (see :mod:`clock`): the library-wide one
+(:func:`set_clock`) or the one given through the `clock` argument of the
+factories. The clock of the tasks alone can be set with
+:func:`set_task_clock` (e.g. to the :data:`monotonic` clock, which is not the
+default on the legacy interpreters because it is slow there). Besides the
+default clock, a :data:`monotonic` clock, a :class:`CoarseClock` (cached by a
+background thread, for the hottest loops) and a :class:`FakeClock` (for
+deterministic tests) are provided.
+
+See :mod:`clock` for more information.
+
+Live tasks
+----------
+The tasks being run by the monitors are tracked, together with their
+thread. :func:`snapshot_tasks` lists them (name, progress, total, rate,
+elapsed time, thread) and :func:`dump_tasks` writes the list to stderr or to
+a file. A running process can be inspected without restarting it, through a
+signal (:func:`install_dump_signal`, SIGUSR1 by default) or a local UNIX
+socket (:class:`DumpServer`, see `python -m progressmonitor.snapshot`).
+
+See :mod:`snapshot` for more information.
+
+Report digests
+--------------
+A report monitor (:func:`report_with`, :func:`report_this`) given
+`digest=True` batches the reports of its calls: a :class:`ReportDigest`
+sends, per window of `digest_period` seconds or `digest_size` calls, one
+summary per task name with the number of calls and failures, the exceptions,
+the duration statistics and the full reports of the slowest and failed calls
+only (with their arguments summarized). A timer thread sends a window as soon
+as its period is over.
+
+See :mod:`report` for more information.
+
+Watchdog
+--------
+Monitors only notify when the task progresses. A :class:`Watchdog` tracks the
+last progress of the live tasks from a single background thread and issues a
+stall hook (a log line with the stack of the stuck thread, by default) when
+a task has not progressed for a given time. The factories plug a watchdog
+hook whenever a `stall_threshold` argument is supplied.
+
+See :mod:`watchdog` for more information.
+
+Aggregated statistics
+---------------------
+For hot functions, notifying every call is too costly. The aggregated mode
+(`aggregate` argument of the function monitor factories) keeps per-thread
+counters (calls, errors, total/min/max time and latency histogram) which are
+flushed through the callback periodically and at interpreter exit.
+
+See :mod:`stats` for more information.
+
+Sampling
+--------
+Monitoring every task may be too expensive in production. Monitors configured
+with a `sample_rate` (probability to monitor a task) and/or a
+`max_per_second` (maximum number of monitored tasks per second) decide once
+at task creation whether to monitor it. Unsampled tasks get the raw iterable
+or function back. The monitors built by :func:`monitor` and
+:func:`code_monitor` at the same place with the same arguments share their
+sampler. The `$sampling` formatter reports the sampled counts.
+
+See :mod:`sampling` for more information.
+
+Switching off
+-------------
+The monitoring can be switched off globally, either with
+:func:`disable_monitoring` or through the PROGRESSMONITOR_DISABLE environment
+variable. The shortcuts (:func:`monitor_with`, :func:`monitor`,
+:func:`monitor_this`, :func:`code_monitor`, :func:`report_with`, ...) then
+return the iterable, the function or a no-op context manager as is, without
+resolving the configuration: a disabled monitor costs nothing per iteration.
+
 
 Configuration
 -------------
@@ -158,6 +303,7 @@ Logging
 The progress monitor library resorts on logging for:
     - Warning in case of fallback ('progressmonitor.fallback')
     - Warning in case of unknown monitor name ('progressmonitor.config')
+    - Warning in case of stalled task ('progressmonitor.watchdog')
 
 By default, the logging is turned off by setting a logging.NullHandler
 as handler for the library's root logger ('progressmonitor'). To enable those
@@ -170,8 +316,11 @@ __version__ = '1.0'
 __date__ = "08 January 2015"
 
 
-from .monitor import (monitor_generator, monitor_function, monitor_code,
-                      CodeMonitor)
+from .monitor import (monitor_generator, monitor_function, monitor_call,
+                      monitor_code, CodeMonitor, current_task)
+
+from .clock import (get_clock, get_task_clock, set_clock, set_task_clock,
+                    wall_time, monotonic, CoarseClock, FakeClock)
 
 from .rule import (always_notif_rule_factory, periodic_rule_factory,
                    span_rule_factory, rate_rule_factory)
@@ -186,26 +335,56 @@ from .formatter import (taskname_formatter_factory, host_formatter_factory,
                         elapsed_time_formatter_factory,
                         remaining_time_formatter_factory,
                         chunk_formatter_factory,
+                        phase_formatter_factory, subtasks_formatter_factory,
+                        sampling_formatter_factory,
                         string_formatter_factory)
 from .hook import (ProgressListener, callback_hook_factory, set_callback,
-                   formated_hook_factory, report_hook_factory, default_hook)
+                   formated_hook_factory, report_hook_factory, default_hook,
+                   structured_hook_factory, msgpack_encode)
 
 from .callback import (stdout_callback_factory, stderr_callback_factory,
                        overwrite_callback_factory, logging_callback_factory,
-                       store_till_end_callback_factory, multi_callback_factory)
+                       store_till_end_callback_factory, multi_callback_factory,
+                       bounded_store_till_end_callback_factory,
+                       terminal_callback_factory,
+                       buffered_stream_callback_factory,
+                       buffered_stdout_callback_factory,
+                       buffered_stderr_callback_factory,
+                       async_callback_factory, AsyncCallback,
+                       coalescing_callback_factory, get_wants)
 
 from .factory import (monitor_generator_factory, report_factory,
-                      formated_code_monitoring)
+                      formated_code_monitoring, aggregated_function_monitoring,
+                      _cache_sampler)
+
+from .util import (format_duration, format_size, call_with, fallback,
+                   IdProxy, summarize)
+
+from .eventlog import (EventLog, eventlog_hook_factory, read_event_log,
+                       split_runs)
+from .prometheus import PrometheusExporter, prometheus_hook_factory
+from .statsd import StatsdClient, statsd_hook_factory
+from .trace import ChromeTraceExporter, chrome_trace_hook_factory
+from .report import ReportDigest, digest_hook_factory, render_report
+from .snapshot import (snapshot_tasks, dump_tasks, install_dump_signal,
+                       DumpServer)
+from .watchdog import (Watchdog, stall_hook_factory, watchdog_hook_factory)
+
+from .stats import CallStatistics
 
-from .util import (format_duration, format_size, call_with, fallback)
+from .dashboard import Dashboard, dashboard_callback_factory
+
+from .sampling import Sampler
 
 
 from .config import (get_config, get_monitor, parse_dict_config,
-                     parse_file_config)
+                     parse_file_config, enable_monitoring, disable_monitoring,
+                     is_monitoring_enabled)
 
 __all__ = ["monitor", "monitor_this", "code_monitor", "report_this",
            "monitor_with", "report_with", "dict_config", "file_config",
-           "monitor_generator", "monitor_function", "monitor_this",
+           "monitor_generator", "monitor_function", "monitor_call",
+           "monitor_this",
            "monitor_code", "CodeMonitor", "always_notif_rule_factory",
            "periodic_rule_factory", "span_rule_factory", "rate_rule_factory",
            "taskname_formatter_factory", "host_formatter_factory",
@@ -213,15 +392,39 @@ __all__ = ["monitor", "monitor_this", "code_monitor", "report_this",
            "nb_iterations_formatter_factory", "exception_formatter_factory",
            "progressbar_formatter_factory", "completion_formatter_factory",
            "elapsed_time_formatter_factory", "remaining_time_formatter_factory",
-           "chunk_formatter_factory", "string_formatter_factory",
+           "chunk_formatter_factory", "phase_formatter_factory",
+           "subtasks_formatter_factory",
+           "sampling_formatter_factory", "string_formatter_factory",
            "ProgressListener", "callback_hook_factory", "set_callback",
            "formated_hook_factory", "report_hook_factory",
+           "structured_hook_factory", "msgpack_encode",
            "stdout_callback_factory", "stderr_callback_factory",
            "overwrite_callback_factory", "logging_callback_factory",
            "store_till_end_callback_factory", "multi_callback_factory",
-           "format_duration", "format_size", "call_with", "fallback"]
-
-
+           "bounded_store_till_end_callback_factory",
+           "terminal_callback_factory", "buffered_stream_callback_factory",
+           "buffered_stdout_callback_factory",
+           "buffered_stderr_callback_factory", "async_callback_factory",
+           "AsyncCallback", "coalescing_callback_factory", "get_wants",
+           "format_duration", "format_size", "call_with", "fallback",
+           "summarize",
+           "Watchdog", "stall_hook_factory", "watchdog_hook_factory",
+           "EventLog", "eventlog_hook_factory", "read_event_log",
+           "split_runs",
+           "PrometheusExporter", "prometheus_hook_factory",
+           "StatsdClient", "statsd_hook_factory",
+           "ChromeTraceExporter", "chrome_trace_hook_factory", "current_task",
+           "CallStatistics", "aggregated_function_monitoring", "Sampler",
+           "enable_monitoring", "disable_monitoring", "is_monitoring_enabled",
+           "Dashboard", "dashboard_callback_factory", "get_clock",
+           "get_task_clock", "set_clock", "set_task_clock", "wall_time",
+           "monotonic", "CoarseClock", "FakeClock",
+           "snapshot_tasks", "dump_tasks", "install_dump_signal",
+           "DumpServer", "ReportDigest", "digest_hook_factory",
+           "render_report"]
+
+
+import sys
 from functools import partial
 import logging
 logging.getLogger('progressmonitor').addHandler(logging.NullHandler())
@@ -229,6 +432,9 @@ logging.getLogger('progressmonitor').addHandler(logging.NullHandler())
 
 # ============================= SHORTCUTS =============================== #
 
+# Returned by the shortcuts when the monitoring is switched off
+_no_monitoring = IdProxy()
+
 def monitor(**kwargs):
     """
     Return a generator embedder.
@@ -241,6 +447,9 @@ def monitor(**kwargs):
     ------
 
     """
+    if not is_monitoring_enabled():
+        return _no_monitoring
+    _cache_sampler(kwargs, sys._getframe(1))
     return monitor_generator_factory(**kwargs)
 
 
@@ -258,6 +467,8 @@ def monitor_this(hook=default_hook(), task_name=None):
 
     Yes, it's that easy !
     """
+    if not is_monitoring_enabled():
+        return _no_monitoring
 
     def apply_monitoring(function):
         return partial(monitor_function, function, hook, task_name)
@@ -266,18 +477,30 @@ def monitor_this(hook=default_hook(), task_name=None):
 
 
 def code_monitor(**kwargs):
+    if not is_monitoring_enabled():
+        return _no_monitoring
+    _cache_sampler(kwargs, sys._getframe(1))
     return formated_code_monitoring(**kwargs)
 
 
 def report_this(**kwargs):
+    if not is_monitoring_enabled():
+        return _no_monitoring
     return report_factory(**kwargs)
 
 def monitor_with(monitor_name, **kwargs):
+    if not is_monitoring_enabled():
+        return _no_monitoring
     return get_monitor(monitor_name, **kwargs)
 
 
 def report_with(monitor_name, **kwargs):
+    if not is_monitoring_enabled():
+        return _no_monitoring
     conf = get_config(monitor_name, **kwargs)
+    if conf.get("digest", False):
+        # The calls are aggregated under the monitor name
+        conf.setdefault("task_name", monitor_name)
     return report_this(**conf)
 
 
@@ -13,6 +13,21 @@ Callbacks are callable of the form
         The string to process
     last_com : bool (Default : False)
         Whether is it the last message or not
+
+A callback which discards some messages (disabled logger, throttling, ...)
+can tell so beforehand through a `wants` attribute of the form
+    Parameters
+    ----------
+    task : :class:`Task`
+        The task about to be notified
+    last_com : bool
+        Whether is it the last message or not
+    Return
+    ------
+    wants : bool
+        Whether the message would be used
+so that the hooks do not format the messages which would be discarded (see
+:func:`get_wants`).
 """
 
 
@@ -23,12 +38,38 @@ __date__ = "08 January 2015"
 
 import sys
 import os
+import gzip
+import struct
+import atexit
+import weakref
+import tempfile
 from functools import partial
+from collections import deque
+from os.path import commonprefix
+from unicodedata import combining, east_asian_width
+from threading import Lock, Timer, Thread, Event, local
 from logging import getLogger, INFO
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 
 from .util import call_with
+from .clock import get_clock, monotonic
+from .dashboard import dashboard_callback_factory
+
 
 
+def get_wants(callback):
+    """
+    Return
+    ------
+    wants : callable (:class:`Task`, bool) --> bool or None
+        The `wants` predicate of the callback (see the module documentation)
+        or None if the callback uses every message
+    """
+    return getattr(callback, "wants", None)
+
 
 def _writeln(stream, string, last_com=False):
     """
@@ -47,6 +88,16 @@ def _writeln(stream, string, last_com=False):
     stream.write(os.linesep)
     stream.flush()
 
+def _identity(obj):
+    return obj
+
+def _write_buffered(buffer_, stream, string, last_com=False):
+    """
+    Buffers the string (the stream is only referenced so as to outlive the
+    callback, see :class:`StreamBuffer`)
+    """
+    buffer_.write(string, last_com)
+
 def stdout_callback_factory():
     """
     :func:`callback_factory`
@@ -69,6 +120,189 @@ def stderr_callback_factory():
     """
     return partial(_writeln, sys.stderr)
 
+class StreamBuffer(object):
+    """
+    ============
+    StreamBuffer
+    ============
+    A :class:`StreamBuffer` coalesces the messages destined to a stream in
+    memory. The buffer is flushed when it exceeds its size, when the flush
+    interval has elapsed since the first buffered message, on the last
+    message of a task and at interpreter exit.
+
+    All the buffered callbacks of a given stream share the same buffer (see
+    :meth:`get`) so that the order of the messages is preserved. The buffer
+    only holds the stream weakly: the stream is kept alive by the callbacks
+    (see :func:`buffered_stream_callback_factory`).
+
+    Constructor parameters
+    ----------------------
+    stream : :class:`StringIO`
+        The stream to uses
+    buffer_size : int (Default : 8192)
+        The number of characters above which the buffer is flushed
+    flush_interval : float or None (Default : 1.)
+        The maximum time (in seconds) a message stays in the buffer (None
+        for no limit)
+    """
+
+    _buffers = weakref.WeakKeyDictionary()
+    # The buffers of the streams which cannot be referenced weakly, by id
+    # (those streams are kept alive by their buffer)
+    _strong_buffers = dict()
+    _buffers_lock = Lock()
+
+    def __init__(self, stream, buffer_size=8192, flush_interval=1.):
+        try:
+            self._stream_ref = weakref.ref(stream)
+        except TypeError:
+            self._stream_ref = partial(_identity, stream)
+        self._buffer_size = buffer_size
+        self._flush_interval = flush_interval
+        self._chunks = []
+        self._size = 0
+        self._timer = None
+        self._lock = Lock()
+
+    @classmethod
+    def get(cls, stream, buffer_size=8192, flush_interval=1.):
+        """
+        Return the buffer of the given stream (creating it, with the given
+        parameters, if need be)
+
+        Logging
+        -------
+        Issue a logging warning on the logger name "progressmonitor.callback"
+        if the buffer already exists with other parameters (the existing
+        buffer is returned)
+        """
+        with cls._buffers_lock:
+            try:
+                registry, key = cls._buffers, stream
+                buffer_ = registry.get(key, None)
+            except TypeError:
+                registry, key = cls._strong_buffers, id(stream)
+                buffer_ = registry.get(key, None)
+            if buffer_ is None:
+                buffer_ = cls(stream, buffer_size, flush_interval)
+                registry[key] = buffer_
+            elif (buffer_._buffer_size != buffer_size or
+                  buffer_._flush_interval != flush_interval):
+                getLogger("progressmonitor.callback").warning(
+                    "The buffer of %r already exists with buffer_size=%s and "
+                    "flush_interval=%s: the parameters buffer_size=%s and "
+                    "flush_interval=%s are ignored", stream,
+                    buffer_._buffer_size, buffer_._flush_interval,
+                    buffer_size, flush_interval)
+            return buffer_
+
+    @classmethod
+    def flush_all(cls):
+        """
+        Flush all the buffers
+        """
+        with cls._buffers_lock:
+            buffers = (list(cls._buffers.values()) +
+                       list(cls._strong_buffers.values()))
+        for buffer_ in buffers:
+            buffer_.flush()
+
+    def write(self, string, last_com=False):
+        """
+        Buffer the string (followed by a line separator)
+
+        Parameters
+        ----------
+        string : str
+            The string to write
+        last_com : bool (Default : False)
+            Whether is it the last message or not
+        """
+        with self._lock:
+            self._chunks.append(string)
+            self._chunks.append(os.linesep)
+            self._size += len(string) + len(os.linesep)
+            must_flush = last_com or self._size >= self._buffer_size
+            if (not must_flush and self._timer is None and 
+                    self._flush_interval is not None):
+                timer = Timer(self._flush_interval, self.flush)
+                timer.daemon = True
+                self._timer = timer
+                timer.start()
+        if must_flush:
+            self.flush()
+
+    def flush(self):
+        """
+        Write the content of the buffer on the stream and flush it
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._size == 0:
+                return
+            stream = self._stream_ref()
+            if stream is not None:
+                stream.write("".join(self._chunks))
+                stream.flush()
+            self._chunks = []
+            self._size = 0
+
+atexit.register(StreamBuffer.flush_all)
+
+
+def buffered_stream_callback_factory(stream=None, buffer_size=8192, 
+                                     flush_interval=1.):
+    """
+    A :func:`callback_factory` which writes the messages on a stream
+    through a :class:`StreamBuffer` (shared by the callbacks of the stream:
+    the parameters of the first one prevail)
+
+    Parameters
+    ----------
+    stream : :class:`StringIO` or None (Default : None)
+        The stream to uses. If None, stdout is used
+    buffer_size : int (Default : 8192)
+        The number of characters above which the buffer is flushed
+    flush_interval : float or None (Default : 1.)
+        The maximum time (in seconds) a message stays in the buffer (None
+        for no limit)
+
+    Return
+    ------
+    callback : callable
+        a callback issuing on the buffered stream
+    """
+    if stream is None:
+        stream = sys.stdout
+    buffer_ = StreamBuffer.get(stream, buffer_size, flush_interval)
+    return partial(_write_buffered, buffer_, stream)
+
+def buffered_stdout_callback_factory(buffer_size=8192, flush_interval=1.):
+    """
+    :func:`callback_factory` (see :func:`buffered_stream_callback_factory`)
+
+    Return
+    ------
+    callback : callable
+        a callback issuing on the buffered stdout
+    """
+    return buffered_stream_callback_factory(sys.stdout, buffer_size,
+                                            flush_interval)
+
+def buffered_stderr_callback_factory(buffer_size=8192, flush_interval=1.):
+    """
+    :func:`callback_factory` (see :func:`buffered_stream_callback_factory`)
+
+    Return
+    ------
+    callback : callable
+        a callback issuing on the buffered stderr
+    """
+    return buffered_stream_callback_factory(sys.stderr, buffer_size,
+                                            flush_interval)
+
 def overwrite_callback_factory(stream=sys.stdout):
     """
     A :func:`callback_factory` which outputs on a stream and overwrite
@@ -111,6 +345,123 @@ def overwrite_callback_factory(stream=sys.stdout):
 
     return overwrite_callback
 
+def _display_width(text):
+    # The number of terminal columns taken by a unicode string
+    width = 0
+    for char in text:
+        if not combining(char):
+            width += 2 if east_asian_width(char) in "WF" else 1
+    return width
+
+
+def terminal_callback_factory(stream=sys.stdout, refresh_rate=10., 
+                              throttle=1., clock=None):
+    """
+    A :func:`callback_factory` which renders the messages in place on a
+    terminal (provided the message is monoline), writing as few bytes as
+    possible:
+        - identical consecutive messages are dropped;
+        - the frame rate is capped at `refresh_rate` (the last message is
+        always written);
+        - only the part of the message which has changed is rewritten.
+    The byte strings are taken as utf-8: the changes are located on the
+    characters and the cursor moves are counted in terminal columns.
+
+    If the stream is not a terminal, the messages are written on separate
+    lines, at most once every `throttle` seconds (the last message is always
+    written).
+
+    Parameters
+    ----------
+    stream : :class:`StringIO` (Default : stdout)
+        The stream to uses
+    refresh_rate : float or None (Default : 10.)
+        The maximum number of frames per second (None for no limit)
+    throttle : float or None (Default : 1.)
+        The minimum period between two lines if the stream is not a
+        terminal (None for no limit)
+    clock : callable () --> float or None (Default : None)
+        The clock measuring the intervals (see :mod:`clock`). If None, the
+        library-wide clock is used
+
+    Return
+    ------
+    :func:`terminal_callback`
+    """
+    isatty = getattr(stream, "isatty", None)
+    is_terminal = isatty is not None and isatty()
+    if is_terminal:
+        min_interval = 0. if refresh_rate is None else 1./refresh_rate
+    else:
+        min_interval = 0. if throttle is None else throttle
+
+    if clock is None:
+        clock = get_clock()
+    # The string currently displayed and the time of the last rendering
+    shown = [""]
+    last_time = [float("-inf")]
+
+    def wants(task, last_com):
+        return last_com or clock() - last_time[0] >= min_interval
+
+    def terminal_callback(string, last_com=False):
+        """
+        A :func:`callback` which renders the message in place
+
+        Parameters
+        ----------
+        string : str
+            The string to process
+        last_com : bool (Default : False)
+            Whether is it the last message or not
+        """
+        previous = shown[0]
+        if not last_com:
+            if string == previous:
+                return
+            now = clock()
+            if now - last_time[0] < min_interval:
+                return
+            last_time[0] = now
+
+        if not is_terminal:
+            if string != previous:
+                stream.write(string)
+                stream.write(os.linesep)
+                stream.flush()
+            shown[0] = "" if last_com else string
+            return
+
+        # Rewriting the changed suffix, either by moving back the cursor
+        # or from the beginning of the line, whichever is shorter. The
+        # multibyte characters (such as the sub-step blocks) are neither
+        # split nor counted as several columns
+        is_bytes = isinstance(string, str)
+        text = string.decode("utf-8", "replace") if is_bytes else string
+        if isinstance(previous, str):
+            previous = previous.decode("utf-8", "replace")
+        prefix_length = len(commonprefix([previous, text]))
+        suffix = text[prefix_length:]
+        prefix_width = _display_width(text[:prefix_length])
+        nb_back = _display_width(previous[prefix_length:])
+        suffix_width = _display_width(suffix)
+        if nb_back + suffix_width <= prefix_width + suffix_width + 1:
+            frame = u"\b" * nb_back + suffix
+        else:
+            frame = u"\r" + text
+        length_diff = nb_back - suffix_width
+        if length_diff > 0:
+            frame += u" " * length_diff + u"\b" * length_diff
+        if last_com:
+            frame += u"\n"
+            string = ""
+        shown[0] = string
+        stream.write(frame.encode("utf-8") if is_bytes else frame)
+        stream.flush()
+
+    terminal_callback.wants = wants
+    return terminal_callback
+
 def logging_callback_factory(logger_name="", log_level=INFO):
     """
     A :func:`callback_factory` which uses the logging facility
@@ -127,6 +478,10 @@ def logging_callback_factory(logger_name="", log_level=INFO):
     :func:`logging_callback`
     """
     logger = getLogger(logger_name)
+
+    def wants(task, last_com):
+        return logger.isEnabledFor(log_level)
+
     def logging_callback(string, last_com=False):
         """
         A :func:`callback` write the string to a logger
@@ -142,6 +497,7 @@ def logging_callback_factory(logger_name="", log_level=INFO):
         if last_com and hasattr(logger, "flush"):
             logger.flush()
 
+    logging_callback.wants = wants
     return logging_callback
 
 
@@ -178,6 +534,155 @@ def store_till_end_callback_factory(destination=lambda m: None):
     return store_till_end_callback
 
 
+# type ("s" for str, "u" for unicode), size
+_SPILLED_HEADER = struct.Struct("<cI")
+
+def _spill_message(hdl, string):
+    if isinstance(string, unicode):
+        flag, data = "u", string.encode("utf-8")
+    else:
+        flag, data = "s", str(string)
+    hdl.write(_SPILLED_HEADER.pack(flag, len(data)))
+    hdl.write(data)
+
+def _unspill_message(hdl):
+    flag, size = _SPILLED_HEADER.unpack(hdl.read(_SPILLED_HEADER.size))
+    data = hdl.read(size)
+    return data.decode("utf-8") if flag == "u" else data
+
+
+# The spill files not removed yet (they are removed at interpreter exit)
+_spill_paths = set()
+
+
+@atexit.register
+def _remove_spill_files():
+    for path in list(_spill_paths):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    _spill_paths.clear()
+
+
+def _read_spill(path, nb_spilled):
+    # Load the spilled messages back and remove the spill file
+    try:
+        with gzip.open(path, "rb") as hdl:
+            return [_unspill_message(hdl) for _ in xrange(nb_spilled)]
+    finally:
+        _spill_paths.discard(path)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def bounded_store_till_end_callback_factory(destination=lambda m: None,
+                                            keep_first=100, keep_last=1000,
+                                            spill=False, spill_dir=None,
+                                            elision_marker="[... %d messages"
+                                                           " elided ...]"):
+    """
+    A :func:`callback_factory` which stores the messages and send them to
+    the destination at the last message (see
+    :func:`store_till_end_callback_factory`), in bounded memory: only the
+    first `keep_first` and the last `keep_last` messages are kept. The
+    messages in between are either elided (the destination receives a
+    marker with their count instead) or spilled to a compressed temporary
+    file. The spilled messages are read back (and the file removed) at the
+    last message, so that the destination gets a plain list either way.
+
+    The store is emptied once the messages are sent.
+
+    Parameters
+    ----------
+    destination : callable (Default : destination=lambda m: None)
+        A function which takes as input a list of string
+    keep_first : int (Default : 100)
+        The number of first messages to keep
+    keep_last : int (Default : 1000)
+        The number of last messages to keep (in a ring buffer)
+    spill : bool (Default : False)
+        Whether to spill the middle messages to the disk rather than
+        eliding them
+    spill_dir : str or None (Default : None)
+        The directory of the spill file. If None, the default temporary
+        directory is used
+    elision_marker : str (Default : "[... %d messages elided ...]")
+        The message standing for the elided messages (formatted with their
+        count)
+
+    Return
+    ------
+    :func:`bounded_store_till_end_callback`
+    """
+    store = dict()
+
+    def reset():
+        store["head"] = []
+        store["tail"] = deque(maxlen=keep_last)
+        store["nb_elided"] = 0
+        store["spill_path"] = None
+        store["spill_file"] = None
+
+    def elide(string):
+        if spill:
+            if store["spill_file"] is None:
+                fd, path = tempfile.mkstemp(prefix="progressmonitor_",
+                                            suffix=".gz", dir=spill_dir)
+                os.close(fd)
+                # Removed at exit if the last message never comes
+                _spill_paths.add(path)
+                store["spill_path"] = path
+                store["spill_file"] = gzip.open(path, "wb")
+            _spill_message(store["spill_file"], string)
+        store["nb_elided"] += 1
+
+    reset()
+
+    def bounded_store_till_end_callback(string, last_com=False):
+        """
+        A :func:`callback` which stores the first and last messages
+        and send them to the destination at the last message
+
+        Parameters
+        ----------
+        string : str
+            The string to process
+        last_com : bool (Default : False)
+            Whether is it the last message or not
+        """
+        head = store["head"]
+        tail = store["tail"]
+        if len(head) < keep_first:
+            head.append(string)
+        elif keep_last == 0:
+            elide(string)
+        else:
+            if len(tail) == keep_last:
+                # The oldest message is pushed out of the ring
+                elide(tail[0])
+            tail.append(string)
+
+        if last_com:
+            nb_elided = store["nb_elided"]
+            if store["spill_file"] is not None:
+                store["spill_file"].close()
+                messages = list(head)
+                messages.extend(_read_spill(store["spill_path"], nb_elided))
+                messages.extend(tail)
+            else:
+                messages = list(head)
+                if nb_elided > 0:
+                    messages.append(elision_marker % nb_elided)
+                messages.extend(tail)
+            reset()
+            destination(messages)
+
+    return bounded_store_till_end_callback
+
+
 def multi_callback_factory(callback_factories, **kwargs):
     """
     A :func:`callback_factory` which multiplexes the messages
@@ -209,16 +714,361 @@ def multi_callback_factory(callback_factories, **kwargs):
         for callback in callbacks:
             callback(string, last_com)
 
+    all_wants = [get_wants(callback) for callback in callbacks]
+    if None not in all_wants:
+        def wants(task, last_com):
+            for callback_wants in all_wants:
+                if callback_wants(task, last_com):
+                    return True
+            return False
+        multi_callback.wants = wants
     return multi_callback
 
 
+class AsyncCallback(object):
+    """
+    =============
+    AsyncCallback
+    =============
+    A :func:`callback` which pushes the messages in a bounded queue. The
+    queue is drained by a background thread which forwards the messages to
+    another callback, so that slow destinations do not stall the business
+    code.
+
+    Class constants
+    ---------------
+    BLOCK : str
+        Overflow policy: wait for room in the queue
+    DROP_OLDEST : str
+        Overflow policy: discard the oldest message of the queue
+    DROP_INTERMEDIATE : str
+        Overflow policy: discard the new message unless it is the last one
+        of a task (in which case, wait for room)
+
+    Constructor parameters
+    ----------------------
+    callback : :func:`callback`
+        The callback to which the messages are forwarded
+    maxsize : int (Default : 1000)
+        The maximum number of pending messages
+    overflow : str (Default : AsyncCallback.BLOCK)
+        The overflow policy
+    """
+
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    DROP_INTERMEDIATE = "drop_intermediate"
+
+    _instances = weakref.WeakSet()
+
+    def __init__(self, callback, maxsize=1000, overflow=BLOCK):
+        if overflow not in (AsyncCallback.BLOCK, AsyncCallback.DROP_OLDEST,
+                            AsyncCallback.DROP_INTERMEDIATE):
+            raise ValueError("Unknown overflow policy '%s'" % overflow)
+        self._callback = callback
+        wants = get_wants(callback)
+        if wants is not None:
+            self.wants = wants
+        self._queue = queue.Queue(maxsize)
+        self._overflow = overflow
+        self._nb_dropped = 0
+        self._closed = Event()
+        thread = Thread(target=self._run, args=(self._queue, callback,
+                                                self._closed),
+                        name="progressmonitor.async")
+        thread.daemon = True
+        thread.start()
+        AsyncCallback._instances.add(self)
+
+    @property
+    def nb_dropped(self):
+        """
+        Return
+        ------
+        nb_dropped : int
+            The number of messages discarded because of the overflow policy
+        """
+        return self._nb_dropped
+
+    @staticmethod
+    def _run(queue_, callback, closed):
+        # Does not hold a reference to the AsyncCallback so that the latter
+        # can be collected (which stops the thread once the queue is empty)
+        logger = getLogger("progressmonitor.callback")
+        while True:
+            string, last_com = queue_.get()
+            if last_com is None:
+                # Sentinel
+                queue_.task_done()
+                return
+            try:
+                callback(string, last_com)
+            except Exception:
+                logger.exception("Asynchronous callback failure")
+            finally:
+                queue_.task_done()
+            if closed.is_set() and queue_.empty():
+                return
+
+    def __call__(self, string, last_com=False):
+        """
+        A :func:`callback` which queues the message
+
+        Parameters
+        ----------
+        string : str
+            The string to process
+        last_com : bool (Default : False)
+            Whether is it the last message or not
+        """
+        item = (string, last_com)
+        if self._overflow == AsyncCallback.BLOCK:
+            self._queue.put(item)
+            return
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                pass
+            if self._overflow == AsyncCallback.DROP_OLDEST:
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                    self._nb_dropped += 1
+                except queue.Empty:
+                    pass
+            elif not last_com:
+                self._nb_dropped += 1
+                return
+            else:
+                self._queue.put(item)
+                return
+
+    def __del__(self):
+        # Stop the writer thread once the pending messages are forwarded.
+        # The finalizer may run in any thread: it must never block. If the
+        # queue is full, the writer sees the event once it is empty
+        self._closed.set()
+        try:
+            self._queue.put_nowait((None, None))
+        except queue.Full:
+            pass
+
+    def drain(self, timeout=None):
+        """
+        Wait until all the queued messages have been forwarded
+
+        Parameters
+        ----------
+        timeout : float or None (Default : None)
+            The maximum time to wait (in seconds). None for no limit
+
+        Return
+        ------
+        is_drained : bool
+            Whether the queue has been drained
+        """
+        queue_ = self._queue
+        end = None if timeout is None else monotonic() + timeout
+        with queue_.all_tasks_done:
+            while queue_.unfinished_tasks:
+                remaining = None
+                if end is not None:
+                    remaining = end - monotonic()
+                    if remaining <= 0:
+                        return False
+                queue_.all_tasks_done.wait(remaining)
+        return True
+
+    @classmethod
+    def drain_all(cls, timeout=None):
+        """
+        Drain all the living :class:`AsyncCallback` (each one waiting at
+        most `timeout` seconds)
+        """
+        for instance in list(cls._instances):
+            instance.drain(timeout)
+
+atexit.register(AsyncCallback.drain_all, 5.)
+
+
+def async_callback_factory(writer_callback_factory=stdout_callback_factory,
+                           maxsize=1000, overflow=AsyncCallback.BLOCK, 
+                           **kwargs):
+    """
+    A :func:`callback_factory` which forwards the messages to another
+    callback from a background thread (see :class:`AsyncCallback`)
+
+    Parameters
+    ----------
+    writer_callback_factory : :func:`callback_factory` (Default :
+    stdout_callback_factory)
+        The factory of the callback to which the messages are forwarded
+    maxsize : int (Default : 1000)
+        The maximum number of pending messages
+    overflow : str (Default : "block")
+        The overflow policy: "block", "drop_oldest" or "drop_intermediate"
+    kwargs : dict
+        Additionnal arguments for the factory
+
+    Return
+    ------
+    :class:`AsyncCallback`
+    """
+    callback = call_with(writer_callback_factory, kwargs)
+    return AsyncCallback(callback, maxsize, overflow)
+
+
+def coalescing_callback_factory(
+        coalesced_callback_factory=stdout_callback_factory, interval=0.1,
+        use_timer=False, clock=None, **kwargs):
+    """
+    A :func:`callback_factory` which forwards at most one message every
+    `interval` seconds per task to another callback, discarding the
+    superseded messages. The last message of a task is always forwarded
+    immediately.
+
+    The task of a message is the one given to the `wants` attribute of the
+    callback just before the message (see :func:`get_wants`), so that the
+    tasks sharing the callback do not supersede each other's messages.
+
+    Parameters
+    ----------
+    coalesced_callback_factory : :func:`callback_factory` (Default :
+    stdout_callback_factory)
+        The factory of the callback to which the messages are forwarded
+    interval : float (Default : 0.1)
+        The minimum period (in seconds) between two forwarded messages of a
+        task
+    use_timer : bool (Default : False)
+        If True, the latest pending message of a task is forwarded by a
+        timer thread at the end of the interval. Otherwise, it is forwarded
+        by the first message (of any task) after the interval, by the
+        `flush` attribute of the callback or at interpreter exit
+    clock : callable () --> float or None (Default : None)
+        The clock measuring the intervals (see :mod:`clock`). If None, the
+        library-wide clock is used
+    kwargs : dict
+        Additionnal arguments for the factory
+
+    Return
+    ------
+    :func:`coalescing_callback`
+    """
+    callback = call_with(coalesced_callback_factory, kwargs)
+    coalesced_wants = get_wants(callback)
+    if clock is None:
+        clock = get_clock()
+    lock = Lock()
+    source = local()
+    # Per task id: the latest message not forwarded yet and the time at
+    # which the last one was forwarded
+    pending = dict()
+    last_sent = dict()
+    timer = [None]
+    never = float("-inf")
+
+    def forward_due(now):
+        # Forward the pending messages whose interval is over (under the
+        # lock) and return the time before the next one is due, if any
+        next_due = None
+        for key in list(pending):
+            remaining = interval - (now - last_sent.get(key, never))
+            if remaining <= 0:
+                last_sent[key] = now
+                callback(pending.pop(key), False)
+            elif next_due is None or remaining < next_due:
+                next_due = remaining
+        return next_due
+
+    def schedule(delay):
+        # Under the lock
+        if delay is not None and timer[0] is None:
+            timer[0] = Timer(delay, on_timer)
+            timer[0].daemon = True
+            timer[0].start()
+
+    def on_timer():
+        with lock:
+            timer[0] = None
+            schedule(forward_due(clock()))
+
+    def flush():
+        """
+        Forward the pending messages
+        """
+        with lock:
+            now = clock()
+            for key in list(pending):
+                last_sent[key] = now
+                callback(pending.pop(key), False)
+
+    def wants(task, last_com):
+        # Tells the callback which task the message is about
+        source.key = task.id
+        return coalesced_wants is None or coalesced_wants(task, last_com)
+
+    def coalescing_callback(string, last_com=False):
+        """
+        A :func:`callback` which keeps only the latest message of each
+        task and interval
+
+        Parameters
+        ----------
+        string : str
+            The string to process
+        last_com : bool (Default : False)
+            Whether is it the last message or not
+        """
+        key = getattr(source, "key", None)
+        source.key = None
+        with lock:
+            now = clock()
+            if last_com:
+                pending.pop(key, None)
+                last_sent.pop(key, None)
+                callback(string, True)
+            elif now - last_sent.get(key, never) >= interval:
+                pending.pop(key, None)
+                last_sent[key] = now
+                callback(string, False)
+            else:
+                pending[key] = string
+            delay = forward_due(now)
+            if use_timer:
+                schedule(delay)
+
+    coalescing_callback.wants = wants
+    coalescing_callback.flush = flush
+    _flush_at_exit(flush)
+    return coalescing_callback
+
+
+def _flush_at_exit(flush):
+    # Flush at interpreter exit, without keeping the callback alive
+    flush_ref = weakref.ref(flush)
+    def flush_if_alive():
+        flush = flush_ref()
+        if flush is not None:
+            flush()
+    atexit.register(flush_if_alive)
+
+
 __callback_factories__ = {
     "$stdout" : stdout_callback_factory,
     "$stderr" : stderr_callback_factory,
+    "$buffered_stdout" : buffered_stdout_callback_factory,
+    "$buffered_stderr" : buffered_stderr_callback_factory,
     "$overwrite" : overwrite_callback_factory,
+    "$terminal" : terminal_callback_factory,
     "$log" : logging_callback_factory,
     "$store_till_end" : store_till_end_callback_factory,
-    "$multi" : multi_callback_factory
+    "$bounded_store_till_end" : bounded_store_till_end_callback_factory,
+    "$multi" : multi_callback_factory,
+    "$async" : async_callback_factory,
+    "$dashboard" : dashboard_callback_factory,
+    "$coalesce" : coalescing_callback_factory,
 
 }
 
@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+Module :mod:`clock` provides the time sources of the library.
+
+Durations (of tasks, rules, estimations, ...) are measured with a clock: a
+callable returning a time in seconds. The library-wide clock (see
+:func:`set_clock`) defaults to `time.perf_counter` when available. The
+legacy interpreters have no cheap monotonic clock: there, the library-wide
+clock and the clock of the tasks default to `time.time`. The tasks can be
+made immune to the adjustments of the system time with
+`set_task_clock(monotonic)`, at the price of a slower clock. A clock can
+also be injected per monitor through the `clock` argument of the factories.
+
+Timestamps meant for display are wall-clock times: a time read from any
+clock is converted with :func:`wall_time`.
+
+Two special clocks are provided:
+    - :class:`CoarseClock` which is updated by a background thread, for
+    loops so hot that reading the time matters
+    - :class:`FakeClock` which only moves when told to, for deterministic
+    (and fast) tests of rules and estimations
+"""
+
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+import sys
+import time
+import weakref
+from functools import partial
+from threading import Thread, Event, Lock
+
+
+# The id of CLOCK_MONOTONIC differs from one platform to the other
+_CLOCK_MONOTONIC_IDS = (("linux", 1), ("darwin", 6), ("freebsd", 4),
+                        ("openbsd", 3), ("netbsd", 3), ("sunos", 4))
+
+
+def _clock_gettime_monotonic():
+    # Monotonic clock of the legacy interpreters (POSIX only)
+    for prefix, clock_id in _CLOCK_MONOTONIC_IDS:
+        if sys.platform.startswith(prefix):
+            break
+    else:
+        return None
+    try:
+        import ctypes
+        import ctypes.util
+    except ImportError:
+        return None
+
+    class timespec(ctypes.Structure):
+        _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+    library = ctypes.util.find_library("rt") or ctypes.util.find_library("c")
+    try:
+        clock_gettime = ctypes.CDLL(library).clock_gettime
+    except (OSError, AttributeError):
+        return None
+    clock_gettime.argtypes = [ctypes.c_int, ctypes.POINTER(timespec)]
+    byref = ctypes.byref
+
+    def monotonic():
+        # One timespec per call: the clock is shared by the threads
+        spec = timespec()
+        if clock_gettime(clock_id, byref(spec)) != 0:
+            return time.time()
+        return spec.tv_sec + spec.tv_nsec * 1e-9
+
+    if clock_gettime(clock_id, byref(timespec())) != 0:
+        return None
+    return monotonic
+
+
+#: The wall clock, for display timestamps
+wall_clock = time.time
+
+#: A monotonic clock (not affected by the adjustments of the system time).
+#: On the legacy interpreters, it relies on ctypes and is much slower than
+#: `time.time` (use it through a :class:`CoarseClock` in hot loops). It falls
+#: back on `time.time` when the platform does not provide one
+monotonic = getattr(time, "monotonic", None) or _clock_gettime_monotonic() \
+    or time.time
+
+#: The default clock
+default_clock = getattr(time, "perf_counter", None) or time.time
+
+#: The default clock of the tasks
+default_task_clock = default_clock
+
+_clock = [default_clock]
+_task_clock = [default_task_clock]
+# The offsets are held weakly (the clocks may be per monitor) except for
+# the builtin clocks, which cannot be referenced weakly
+_offsets = weakref.WeakKeyDictionary()
+_builtin_offsets = dict()
+_offsets_lock = Lock()
+
+
+def get_clock():
+    """
+    Return
+    ------
+    clock : callable () --> float
+        The library-wide clock
+    """
+    return _clock[0]
+
+
+def get_task_clock():
+    """
+    Return
+    ------
+    clock : callable () --> float
+        The library-wide clock of the tasks
+    """
+    return _task_clock[0]
+
+
+def set_task_clock(clock=None):
+    """
+    Set the library-wide clock of the tasks only
+
+    Parameters
+    ----------
+    clock : callable () --> float or None (Default : None)
+        The new clock. If None, the default clock of the tasks is restored
+
+    Example
+    -------
+    >>> set_task_clock(monotonic)  # Opt in on the legacy interpreters
+    """
+    _task_clock[0] = default_task_clock if clock is None else clock
+
+
+def set_clock(clock=None):
+    """
+    Set the library-wide clock (of the tasks as well)
+
+    Parameters
+    ----------
+    clock : callable () --> float or None (Default : None)
+        The new clock. If None, the default clocks are restored
+
+    Note
+    ----
+    The clock is picked up when the tasks, rules, ... are built
+    """
+    _clock[0] = default_clock if clock is None else clock
+    _task_clock[0] = default_task_clock if clock is None else clock
+
+
+def wall_time(timestamp, clock=None):
+    """
+    Convert a time read from the given clock into a wall-clock timestamp
+
+    Parameters
+    ----------
+    timestamp : float
+        A time read from the clock
+    clock : callable () --> float or None (Default : None)
+        The clock. If None, the library-wide one
+
+    Return
+    ------
+    wall_timestamp : float
+        The corresponding Unix epoch
+    """
+    if clock is None:
+        clock = _clock[0]
+    if clock is wall_clock:
+        return timestamp
+    offsets = _offsets
+    try:
+        offset = offsets.get(clock, None)
+    except TypeError:
+        offsets = _builtin_offsets
+        offset = offsets.get(clock, None)
+    if offset is None:
+        # Computed once per clock: later adjustments of the system time do
+        # not distort the durations
+        with _offsets_lock:
+            offset = offsets.setdefault(clock, wall_clock() - clock())
+    return timestamp + offset
+
+
+class CoarseClock(object):
+    """
+    ===========
+    CoarseClock
+    ===========
+    A :class:`CoarseClock` caches the time of another clock, refreshed by a
+    background thread at a given resolution. Reading it costs an attribute
+    lookup.
+
+    Use :attr:`read` as clock (e.g. `set_clock(CoarseClock().read)`).
+
+    Constructor parameters
+    ----------------------
+    resolution : float (Default : 0.01)
+        The period (in seconds) at which the time is refreshed
+    clock : callable () --> float or None (Default : None)
+        The underlying clock. If None, :data:`monotonic` is used
+    """
+
+    def __init__(self, resolution=0.01, clock=None):
+        if clock is None:
+            clock = monotonic
+        self._clock = clock
+        self.now = clock()
+        # C-level accessor: as cheap as `time.time`
+        self.read = partial(getattr, self, "now")
+        self._stop_event = Event()
+        self._thread = Thread(target=self._run, args=(resolution,),
+                              name="progressmonitor.clock")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _run(self, resolution):
+        while not self._stop_event.wait(resolution):
+            self.now = self._clock()
+
+    def __call__(self):
+        return self.now
+
+    def stop(self):
+        """
+        Stop the background thread (the time does not move anymore)
+        """
+        self._stop_event.set()
+        self._thread.join()
+
+
+class FakeClock(object):
+    """
+    =========
+    FakeClock
+    =========
+    A :class:`FakeClock` only moves when told to (see :meth:`advance`).
+
+    Constructor parameters
+    ----------------------
+    start : float (Default : 0.)
+        The initial time
+
+    Example
+    -------
+    >>> clock = FakeClock()
+    >>> clock.advance(1.5)
+    >>> clock()
+    1.5
+    """
+
+    def __init__(self, start=0.):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, duration):
+        """
+        Move the time forward
+
+        Parameters
+        ----------
+        duration : float
+            The time (in seconds) to move forward
+        """
+        self.now += duration
@@ -24,6 +24,10 @@ The dictionary has the following form:
         <$ccc>: <mod.function_name>,
         ...
     },
+    "hooks": {
+        <$ddd>: <mod.function_name>,
+        ...
+    },
     "generator_monitors": {
         <gen_name>: {
             <args>: <value>,
@@ -55,6 +59,16 @@ rules section (optional)
 formatters section (optional)
     <$ccc> => a string starting with '$' : the shortcut name for the formatter
     factory
+hooks section (optional)
+    <$ddd> => a string starting with '$' : the shortcut name for the hook
+    factory. A monitor uses a hook factory (instead of the formatted string
+    hook) through its 'hook_factory' argument. For instance,
+    "hook_factory": "$json" issues JSON lines events. Additional hooks are
+    given as a list in the 'hook_factories' argument (e.g.
+    "hook_factories": ["$prometheus"]). An additional hook may have its own
+    notification rule and arguments, and run from a background thread (e.g.
+    "hook_factories": [{"hook_factory": "$statsd", "rule_factory":
+    "$periodic", "period": 10, "threaded": true}])
 generator_monitors section (optional)
     <gen_name> => the name of the monitor
         <args> => the name of the argument
@@ -71,6 +85,16 @@ code_monitors section (optional)
 dynamically)
 
 The monitor name have hierarchical structure alike the logging.
+
+Monitoring can be switched off globally with :func:`disable_monitoring` or
+by setting the environment variable PROGRESSMONITOR_DISABLE (to any value but
+'', '0', 'false' or 'no'; the value 'notty' disables monitoring only if the
+standard output is not a terminal). The shortcuts of the package then return
+the business objects untouched, without resolving the configuration.
+
+Monitors whose configuration holds a `sample_rate` and/or a `max_per_second`
+are sampled (see :mod:`sampling`). The sampler is created at the first
+request for the monitor name and shared by the subsequent requests.
 """
 
 
@@ -80,6 +104,8 @@ __version__ = '1.0'
 __date__ = "08 January 2015"
 
 import re
+import os
+import sys
 from ast import literal_eval
 import logging
 
@@ -88,7 +114,56 @@ from .factory import (monitor_function_factory, formated_code_monitoring)
 from .formatter import __formatter_factories__
 from .rule import __rule_factories__
 from .callback import __callback_factories__
-from .util import IdProxy
+from .hook import __hook_factories__
+from .sampling import sampler_factory
+from .util import IdProxy, call_with
+
+# ============================ SWITCH ============================ #
+
+DISABLE_ENV_VARIABLE = "PROGRESSMONITOR_DISABLE"
+
+def _disabled_by_env():
+    value = os.environ.get(DISABLE_ENV_VARIABLE, "").strip().lower()
+    if value in ("", "0", "false", "no"):
+        return False
+    if value == "notty":
+        isatty = getattr(sys.stdout, "isatty", None)
+        return isatty is None or not isatty()
+    return True
+
+_enabled = [not _disabled_by_env()]
+
+def enable_monitoring(enabled=True):
+    """
+    Switch the monitoring on (or off)
+
+    Parameters
+    ----------
+    enabled : bool (Default : True)
+        Whether to enable the monitoring
+
+    Note
+    ----
+    The switch is checked when the monitors are built: functions decorated
+    while the monitoring was off remain unmonitored
+    """
+    _enabled[0] = enabled
+
+def disable_monitoring():
+    """
+    Switch the monitoring off (see :func:`enable_monitoring`)
+    """
+    _enabled[0] = False
+
+def is_monitoring_enabled():
+    """
+    Return
+    ------
+    is_enabled : bool
+        Whether the monitoring is on
+    """
+    return _enabled[0]
+
 
 # ============================ MANAGER ============================ #
 
@@ -105,10 +180,17 @@ class Manager(object):
         if cls._singleton is None:
             cls._singleton = super(Manager, cls).__new__(cls, *args, **kwargs)
             cls._singleton._meta = dict()
+            cls._singleton._samplers = dict()
         return cls._singleton
 
     def add_config(self, monitor_name, conf, monitor_type):
         self._meta[monitor_name] = (conf, monitor_type)
+        # The samplers of the previous configuration are discarded (those
+        # of the descendants as well since they inherit the rates)
+        for key in list(self._samplers):
+            name = key[0]
+            if name == monitor_name or name.startswith(monitor_name + "."):
+                del self._samplers[key]
 
     def _get_ancestors_conf(self, monitor_name):
         unknown = Manager.UNKNOWN_MONITOR
@@ -126,10 +208,28 @@ class Manager(object):
 
 
 
+    def get_sampler(self, monitor_name, conf):
+        # The sampler must outlive the monitors so as to enforce the rates.
+        # The rates are part of the key since they may be overriden by the
+        # arguments of the monitor
+        key = (monitor_name, conf.get("sample_rate", 1.),
+               conf.get("max_per_second", None))
+        sampler = self._samplers.get(key, None)
+        if sampler is None:
+            sampler = call_with(sampler_factory, conf)
+            self._samplers[key] = sampler
+        return sampler
+
     def get_config(self, monitor_name, **kwargs):
         conf, monitor_type = self._get_ancestors_conf(monitor_name)
         if len(kwargs) > 0:
             conf.update(kwargs)
+        if "task_name" not in conf:
+            # The metrics of the tasks are aggregated under the monitor name
+            conf.setdefault("metric_name", monitor_name)
+        if "sampler" not in conf and ("sample_rate" in conf or 
+                                      "max_per_second" in conf):
+            conf["sampler"] = self.get_sampler(monitor_name, conf)
         return conf, monitor_type
 
 
@@ -147,6 +247,7 @@ class Const(object):
     CALLBACK_SEC = "callbacks"
     RULE_SEC = "rules"
     FORMATTER_SEC = "formatters"
+    HOOK_SEC = "hooks"
 
 
 
@@ -185,6 +286,7 @@ def _dict_config_v1(config_dict):
     substit_dict.update(__rule_factories__)
     substit_dict.update(__formatter_factories__)
     substit_dict.update(__callback_factories__)
+    substit_dict.update(__hook_factories__)
 
 
     # ---- Adding the substitutions ---- #
@@ -212,6 +314,14 @@ def _dict_config_v1(config_dict):
                 substit_dict[k] = loaded
                 __callback_factories__[k] = loaded
 
+    # hook factories
+    if Const.HOOK_SEC in config_dict:
+        for k, v in config_dict[Const.HOOK_SEC].iteritems():
+            if k.startswith("$"):
+                loaded = _external_load(v)
+                substit_dict[k] = loaded
+                __hook_factories__[k] = loaded
+
     # ---- Performing the substitutions ---- #
     config_dict = _substitute(config_dict, substit_dict)
 
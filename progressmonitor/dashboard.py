@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Module :mod:`dashboard` provides a terminal renderer for concurrent tasks.
+
+Several tasks overwriting their own line (see `$overwrite`) on the same
+terminal corrupt each other's output. A :class:`Dashboard` owns the stream
+instead: each live task is assigned a line, and all the lines are redrawn in
+place, at a bounded refresh rate, by a single background thread. Finished
+tasks scroll up as permanent lines.
+
+Tasks hand their (monoline) messages to the dashboard through a
+:func:`callback` (see :func:`dashboard_callback_factory`), so that the
+formatter stack is left unchanged. Notifying only records the latest message
+of the task: the cost of the rendering is independent of the notification
+frequency.
+"""
+
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+import sys
+import atexit
+from threading import Thread, Lock, Event
+
+from .util import terminal_width
+
+
+class Dashboard(object):
+    """
+    =========
+    Dashboard
+    =========
+    A :class:`Dashboard` renders the last message of each live task on its
+    own line.
+
+    If the stream is not a terminal, only the last messages of the tasks are
+    written (as permanent lines).
+
+    Constructor parameters
+    ----------------------
+    stream : file or None (Default : None)
+        The stream the dashboard owns. If None, stdout is used
+    refresh_rate : float or None (Default : 10.)
+        The number of redraws per second. If None, no background thread is
+        started and the dashboard must be refreshed explicitly (see
+        :meth:`refresh`)
+    """
+
+    CURSOR_UP = "\x1b[%dA"
+    CLEAR_LINE = "\x1b[K"
+    CLEAR_DOWN = "\x1b[J"
+
+    def __init__(self, stream=None, refresh_rate=10.):
+        if stream is None:
+            stream = sys.stdout
+        self._stream = stream
+        isatty = getattr(stream, "isatty", None)
+        self._is_terminal = isatty is not None and isatty()
+        # Lines are truncated so as not to wrap (which would break the
+        # cursor moves)
+        self._width = terminal_width(stream) - 1
+        self._lock = Lock()
+        self._slots = []
+        self._nb_drawn = 0
+        self._dirty = False
+        self._stop_event = Event()
+        self._thread = None
+        if refresh_rate is not None:
+            self._thread = Thread(target=self._run, args=(1. / refresh_rate,),
+                                  name="progressmonitor.dashboard")
+            self._thread.daemon = True
+            self._thread.start()
+        atexit.register(self.close)
+
+    def new_slot(self):
+        """
+        Return
+        ------
+        slot : list
+            A new line of the dashboard (to be used with :meth:`update`)
+        """
+        slot = ["", False]
+        with self._lock:
+            self._slots.append(slot)
+        return slot
+
+    def update(self, slot, string, last_com=False):
+        """
+        Record the last message of a slot
+
+        Parameters
+        ----------
+        slot : list
+            The slot of the task (see :meth:`new_slot`)
+        string : str
+            The message of the task
+        last_com : bool (Default : False)
+            Whether is it the last message or not
+        """
+        slot[0] = string
+        slot[1] = last_com
+        self._dirty = True
+
+    def _line(self, string):
+        string = string.split("\n", 1)[0]
+        if self._is_terminal and len(string) > self._width > 0:
+            string = string[:self._width]
+        return string
+
+    def refresh(self):
+        """
+        Redraw the dashboard
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            finished = [slot for slot in self._slots if slot[1]]
+            self._slots = [slot for slot in self._slots if not slot[1]]
+            live = list(self._slots)
+
+        chunks = []
+        if not self._is_terminal:
+            for slot in finished:
+                chunks.append(self._line(slot[0]) + "\n")
+        else:
+            if self._nb_drawn > 0:
+                chunks.append(Dashboard.CURSOR_UP % self._nb_drawn)
+            for slot in finished + live:
+                chunks.append("\r" + self._line(slot[0]) +
+                              Dashboard.CLEAR_LINE + "\n")
+            if len(finished) + len(live) < self._nb_drawn:
+                chunks.append(Dashboard.CLEAR_DOWN)
+            self._nb_drawn = len(live)
+        if len(chunks) > 0:
+            self._stream.write("".join(chunks))
+            self._stream.flush()
+
+    def _run(self, period):
+        while not self._stop_event.wait(period):
+            self.refresh()
+
+    def close(self):
+        """
+        Stop the background thread and draw the dashboard one last time
+        """
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None:
+            self._thread = None
+            thread.join()
+        self.refresh()
+
+
+_default_dashboard = [None]
+_default_dashboard_lock = Lock()
+
+def default_dashboard():
+    """
+    Return
+    ------
+    dashboard : :class:`Dashboard`
+        The library-wide dashboard on stdout (created on first use)
+    """
+    with _default_dashboard_lock:
+        if _default_dashboard[0] is None:
+            _default_dashboard[0] = Dashboard()
+    return _default_dashboard[0]
+
+
+def dashboard_callback_factory(dashboard=None):
+    """
+    A :func:`callback_factory` which renders the messages on a
+    :class:`Dashboard`. Each callback owns a line of the dashboard (a new
+    line is taken after the last message of a task)
+
+    Parameters
+    ----------
+    dashboard : :class:`Dashboard` or None (Default : None)
+        The dashboard to use. If None, the library-wide one is used
+
+    Return
+    ------
+    :func:`dashboard_callback`
+    """
+    if dashboard is None:
+        dashboard = default_dashboard()
+    slot = [None]
+
+    def dashboard_callback(string, last_com=False):
+        """
+        A :func:`callback` which records the message on the dashboard
+
+        Parameters
+        ----------
+        string : str
+            The string to process
+        last_com : bool (Default : False)
+            Whether is it the last message or not
+        """
+        if slot[0] is None:
+            slot[0] = dashboard.new_slot()
+        dashboard.update(slot[0], string, last_com)
+        if last_com:
+            slot[0] = None
+
+    return dashboard_callback
@@ -0,0 +1,450 @@
+# -*- coding: utf-8 -*-
+"""
+Module :mod:`eventlog` provides a binary event log for post-mortem analysis.
+
+An :class:`EventLog` is a ring of fixed-size records (task id, timestamp,
+progress, total and status) stored in a memory-mapped file. Appending a
+record only writes into the mapped memory: there is no formatting and no
+system call per event. Since the pages belong to the file, the log survives
+a crash of the process.
+
+The write index is stored in the header of the file and is only advanced
+once the record is complete. Each record also carries its position in the
+log and a checksum: the slot being overwritten when the process died (the
+oldest one, once the ring is full) fails the check and is skipped by the
+reader.
+
+A log reopened by another run goes on where the previous one stopped. Since
+the task ids restart at 0 in each process, the records carry the id of the
+run which wrote them (see :func:`split_runs`), so that the tasks of different
+runs are never merged.
+
+The module doubles as a reader tool:
+    python -m progressmonitor.eventlog <path> [--curves] [--task <id>]
+"""
+
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+import os
+import sys
+import time
+import mmap
+import struct
+from zlib import crc32
+from collections import namedtuple
+from threading import Lock
+
+from .monitor import Task
+from .util import format_duration
+
+
+MAGIC = "PMEVLOG2"
+# magic, record size, capacity, write index
+HEADER = struct.Struct("<8sIIQ")
+HEADER_SIZE = 64
+# position, run id, task id, timestamp, progress, total (-1 if unknown),
+# status; followed by the checksum of those
+RECORD_BODY = struct.Struct("<QQQdqqB3x")
+CHECKSUM = struct.Struct("<I")
+RECORD_SIZE = RECORD_BODY.size + CHECKSUM.size
+
+EventRecord = namedtuple("EventRecord", ["task_id", "timestamp", "progress",
+                                         "total", "status", "run_id"])
+
+
+def _new_run_id():
+    return struct.unpack("<Q", os.urandom(8))[0]
+
+# ============================== EVENT LOG ============================== #
+
+class EventLog(object):
+    """
+    ========
+    EventLog
+    ========
+    An :class:`EventLog` appends fixed-size records into a memory-mapped
+    ring file. Once the ring is full, the oldest records are overwritten.
+
+    Opening an existing log with the same capacity appends to it, under a
+    new run id.
+
+    Constructor parameters
+    ----------------------
+    path : str
+        The path of the log file
+    capacity : int (Default : 65536)
+        The maximum number of records kept in the file
+    """
+
+    def __init__(self, path, capacity=65536):
+        self._path = path
+        size = HEADER_SIZE + capacity * RECORD_SIZE
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0644)
+        try:
+            existing = os.fstat(fd).st_size == size
+            if not existing:
+                os.ftruncate(fd, size)
+            self._mmap = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        self._capacity = capacity
+        self._run_id = _new_run_id()
+        self._lock = Lock()
+        self._index = 0
+        if existing:
+            magic, record_size, capacity_, index = \
+                HEADER.unpack_from(self._mmap, 0)
+            if (magic, record_size, capacity_) == (MAGIC, RECORD_SIZE,
+                                                   capacity):
+                self._index = index
+        HEADER.pack_into(self._mmap, 0, MAGIC, RECORD_SIZE, capacity,
+                         self._index)
+
+    @property
+    def path(self):
+        """
+        Return
+        ------
+        path : str
+            The path of the log file
+        """
+        return self._path
+
+    @property
+    def run_id(self):
+        """
+        Return
+        ------
+        run_id : int
+            The id of the run, written in each record
+        """
+        return self._run_id
+
+    def append(self, task_id, timestamp, progress, total, status):
+        """
+        Append a record to the log
+
+        Parameters
+        ----------
+        task_id : int
+            The id of the task
+        timestamp : float
+            The timestamp of the event
+        progress : int
+            The progress of the task
+        total : int or None
+            The number of steps of the task (None if unknown)
+        status : int
+            The status of the task
+        """
+        if total is None:
+            total = -1
+        with self._lock:
+            if self._mmap is None:
+                return
+            index = self._index
+            offset = HEADER_SIZE + (index % self._capacity) * RECORD_SIZE
+            body = RECORD_BODY.pack(index, self._run_id, task_id, timestamp,
+                                    progress, total, status)
+            end = offset + RECORD_BODY.size
+            self._mmap[offset:end] = body
+            CHECKSUM.pack_into(self._mmap, end, crc32(body) & 0xffffffff)
+            self._index = index + 1
+            # The record is complete: publish it
+            struct.pack_into("<Q", self._mmap, 16, index + 1)
+
+    def flush(self):
+        """
+        Write the log to the disk (only needed to survive a crash of the
+        system, not of the process)
+        """
+        self._mmap.flush()
+
+    def close(self):
+        """
+        Flush and unmap the log (the subsequent records are dropped)
+        """
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.flush()
+                self._mmap.close()
+                self._mmap = None
+
+
+_event_logs = dict()
+_event_logs_lock = Lock()
+
+def get_event_log(path, capacity=65536):
+    """
+    Return
+    ------
+    event_log : :class:`EventLog`
+        The event log of the given path, shared by all the monitors (opened
+        on first use)
+    """
+    with _event_logs_lock:
+        event_log = _event_logs.get(path, None)
+        if event_log is None:
+            event_log = EventLog(path, capacity)
+            _event_logs[path] = event_log
+    return event_log
+
+
+def eventlog_hook_factory(eventlog_path, eventlog_capacity=65536):
+    """
+    Hook factory which appends a record to an :class:`EventLog` on each
+    notification
+
+    Parameters
+    ----------
+    eventlog_path : str
+        The path of the log file
+    eventlog_capacity : int (Default : 65536)
+        The maximum number of records kept in the file
+
+    Return
+    ------
+    :func:`eventlog_hook`
+    """
+    append = get_event_log(eventlog_path, eventlog_capacity).append
+    clock = time.time
+
+    def eventlog_hook(task, exception=None):
+        """
+        :func:`hook` which records the state of the task
+
+        Parameters
+        ----------
+        task : :class:`Task`
+            The monitored task
+        exception : Exception (Default : None)
+            The exception if one occured (None otherwise)
+        """
+        append(task.id, clock(), task.progress, task.nb_steps, task.status)
+
+    return eventlog_hook
+
+
+# ============================== READER ============================== #
+
+def read_event_log(path):
+    """
+    Decode an event log
+
+    Parameters
+    ----------
+    path : str
+        The path of the log file
+
+    Return
+    ------
+    records : list of :class:`EventRecord`
+        The records of the log, from the oldest to the most recent. The
+        records which fail their check (torn by a crash) are skipped
+    """
+    with open(path, "rb") as hdl:
+        data = hdl.read()
+    magic, record_size, capacity, index = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or record_size != RECORD_SIZE:
+        raise ValueError("'%s' is not an event log" % path)
+    first = max(0, index - capacity)
+    records = []
+    for i in xrange(first, index):
+        offset = HEADER_SIZE + (i % capacity) * RECORD_SIZE
+        end = offset + RECORD_BODY.size
+        body = data[offset:end]
+        if len(body) < RECORD_BODY.size or len(data) < end + CHECKSUM.size:
+            break
+        checksum, = CHECKSUM.unpack_from(data, end)
+        if checksum != crc32(body) & 0xffffffff:
+            continue
+        position, run_id, task_id, timestamp, progress, total, status = \
+            RECORD_BODY.unpack(body)
+        if position != i:
+            continue
+        if total < 0:
+            total = None
+        records.append(EventRecord(task_id, timestamp, progress, total,
+                                   status, run_id))
+    return records
+
+
+def split_runs(records):
+    """
+    Split the records of a log per run
+
+    Parameters
+    ----------
+    records : list of :class:`EventRecord`
+        The records of the log
+
+    Return
+    ------
+    runs : list of list of :class:`EventRecord`
+        The records of each run, ordered by first appearance
+    """
+    runs = dict()
+    order = []
+    for record in records:
+        run = runs.get(record.run_id, None)
+        if run is None:
+            run = runs[record.run_id] = []
+            order.append(record.run_id)
+        run.append(record)
+    return [runs[run_id] for run_id in order]
+
+
+def _by_task(records):
+    tasks = dict()
+    for record in records:
+        tasks.setdefault((record.run_id, record.task_id), []).append(record)
+    return tasks
+
+
+def _task_records(records, task_id):
+    # The records of the task in the last run it appears in
+    task_records = [record for record in records if record.task_id == task_id]
+    if len(task_records) > 0:
+        run_id = task_records[-1].run_id
+        task_records = [record for record in task_records
+                        if record.run_id == run_id]
+    return task_records
+
+
+def task_table(records):
+    """
+    Summarize the tasks of a log
+
+    Parameters
+    ----------
+    records : list of :class:`EventRecord`
+        The records of the log
+
+    Return
+    ------
+    table : list of tuple (task_id, first_seen, duration, progress, total,
+    status)
+        One row per task (and run), ordered by first appearance. The status
+        is a string ('ready', 'running', 'done' or 'aborted')
+    """
+    table = []
+    status_names = Task.STATUS_NAMES
+    for (_, task_id), task_records in _by_task(records).iteritems():
+        first, last = task_records[0], task_records[-1]
+        table.append((task_id, first.timestamp,
+                      last.timestamp - first.timestamp, last.progress,
+                      last.total, status_names.get(last.status, "unknown")))
+    table.sort(key=lambda row: row[1])
+    return table
+
+
+def throughput_curve(records, task_id):
+    """
+    Compute the throughput curve of a task
+
+    Parameters
+    ----------
+    records : list of :class:`EventRecord`
+        The records of the log
+    task_id : int
+        The id of the task (in the last run it appears in)
+
+    Return
+    ------
+    curve : list of tuple (elapsed, progress, rate)
+        The elapsed time (in seconds), progress and instantaneous rate (in
+        steps per second) at each record of the task
+    """
+    curve = []
+    start = last_time = last_progress = None
+    for record in _task_records(records, task_id):
+        if start is None:
+            start = last_time = record.timestamp
+            last_progress = record.progress
+        delta_t = record.timestamp - last_time
+        rate = (record.progress - last_progress) / delta_t \
+            if delta_t > 0 else 0.
+        curve.append((record.timestamp - start, record.progress, rate))
+        last_time, last_progress = record.timestamp, record.progress
+    return curve
+
+
+def estimate_remaining_time(records, task_id, decay_rate=0.1):
+    """
+    Replay the estimation of the remaining time (exponential moving
+    average of the speed, as the `$time` formatter does) on the
+    records of a task
+
+    Parameters
+    ----------
+    records : list of :class:`EventRecord`
+        The records of the log
+    task_id : int
+        The id of the task (in the last run it appears in)
+    decay_rate : float 0 <= decay_rate <= 1
+        The decay rate for the exponetial moving average (alpha parameter)
+
+    Return
+    ------
+    remaining_time : float or None
+        The estimated remaining time (in seconds) at the last record of the
+        task. None if it cannot be estimated
+    """
+    avg_speed = None
+    for _, _, rate in throughput_curve(records, task_id)[1:]:
+        if rate > 0:
+            avg_speed = rate if avg_speed is None else \
+                decay_rate * rate + (1 - decay_rate) * avg_speed
+    task_records = _task_records(records, task_id)
+    if avg_speed is None or task_records[-1].total is None:
+        return None
+    last = task_records[-1]
+    return (last.total - last.progress) / avg_speed
+
+
+def main(argv=None):
+    """
+    Print the content of an event log
+    """
+    from argparse import ArgumentParser
+    parser = ArgumentParser(prog="python -m progressmonitor.eventlog",
+                            description="Decode a progressmonitor event log")
+    parser.add_argument("path", help="the event log file")
+    parser.add_argument("--curves", action="store_true",
+                        help="print the throughput curves of the tasks")
+    parser.add_argument("--task", type=int, default=None,
+                        help="restrict the output to the given task")
+    args = parser.parse_args(argv)
+
+    records = read_event_log(args.path)
+    if args.task is not None:
+        records = [r for r in records if r.task_id == args.task]
+    print "%8s %-24s %12s %10s %10s %8s %12s" % \
+        ("task", "first seen", "duration", "progress", "total", "status",
+         "remaining")
+    runs = split_runs(records)
+    for number, run in enumerate(runs):
+        print "Run %d/%d (id %016x)" % (number + 1, len(runs), run[0].run_id)
+        for task_id, first_seen, duration, progress, total, status in \
+                task_table(run):
+            remaining = None
+            if status == "running":
+                remaining = estimate_remaining_time(run, task_id)
+            print "%8d %-24s %12s %10d %10s %8s %12s" % \
+                (task_id, time.ctime(first_seen), format_duration(duration),
+                 progress, "???" if total is None else total, status,
+                 "-" if remaining is None else format_duration(remaining))
+            if args.curves:
+                for elapsed, progress, rate in throughput_curve(run,
+                                                                task_id):
+                    print "%8s %12s %10d %10.2f/s" % \
+                        ("", format_duration(elapsed), progress, rate)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -13,17 +13,241 @@ __date__ = "08 January 2015"
 import time
 from functools import partial
 from string import Formatter
-
-from .util import call_with 
-from .rule import rate_rule_factory
-from .monitor import monitor_generator, monitor_function, monitor_code
-from .hook import formated_hook_factory, report_hook_factory
+from threading import Lock
+
+from .util import call_with, IdProxy
+from .rule import rate_rule_factory, always_notif_rule_factory
+from .monitor import (monitor_generator, monitor_function, monitor_call,
+                      monitor_code)
+from .hook import (formated_hook_factory, report_hook_factory,
+                   ProgressListener)
+from .watchdog import watchdog_hook_factory
+from .report import digest_hook_factory
+from .stats import CallStatistics
+from .sampling import sampler_factory
 from .formatter import __formatter_factories__
 from .callback import (overwrite_callback_factory, stdout_callback_factory)
 
 
 
 
+# ================================ HELPERS ================================= #
+
+def _add_watchdog(hook, kwargs):
+    """
+    Multiplex the given hook with a :func:`watchdog_hook` if a
+    `stall_threshold` is present in the factory arguments
+
+    Parameters
+    ----------
+    hook : :func:`hook`
+        The main hook
+    kwargs : dict
+        The arguments for the factories
+
+    Return
+    ------
+    hook : :func:`hook`
+        The hook to use for the monitor
+    """
+    if kwargs.get("stall_threshold", None) is None:
+        return hook
+    listener = ProgressListener()
+    listener.add_hook(hook)
+    listener.add_hook(call_with(watchdog_hook_factory, kwargs))
+    return listener
+
+
+def _has_hook_rules(kwargs):
+    """
+    Return whether some of the `hook_factories` of the factory arguments
+    come with their own rule (in which case the rules are applied by a
+    :class:`ProgressListener`)
+    """
+    for entry in kwargs.get("hook_factories", None) or ():
+        if hasattr(entry, "get") and entry.get("rule_factory") is not None:
+            return True
+    return False
+
+
+def _set_metric_name(kwargs, monitored=None):
+    """
+    Fill in the `metric_name` argument of the factories: the name under
+    which the metric hooks (e.g. :func:`statsd_hook_factory`) aggregate the
+    tasks of the monitor. It does not depend on the tasks so that the number
+    of metrics stays bounded (the default task names are unique per task)
+
+    Parameters
+    ----------
+    kwargs : dict
+        The arguments for the factories. The `metric_name` defaults to the
+        `task_name` (if any), then to the name of the monitored object
+    monitored : callable, iterator or None (Default : None)
+        The monitored function or generator (None for a code block)
+    """
+    if kwargs.get("metric_name", None) is not None:
+        return
+    name = kwargs.get("task_name", None)
+    if name is None and monitored is not None:
+        name = getattr(monitored, "__name__", type(monitored).__name__)
+    kwargs["metric_name"] = "code" if name is None else name
+
+
+def _build_hook(callback, format_str, formatter_factories, kwargs,
+                rule=None):
+    """
+    Build the hook of a monitor: a :func:`formated_hook_factory` hook or,
+    if a `hook_factory` is present in the factory arguments, the hook it
+    builds around the callback. The hooks built by the `hook_factories` of
+    the factory arguments (if any) are issued alongside and a watchdog hook
+    may be added (see :func:`_add_watchdog`)
+
+    An entry of the `hook_factories` is either a :func:`hook_factory` or a
+    dictionary with
+        - "hook_factory": the :func:`hook_factory`
+        - "rule_factory" (optional): the factory of the rule of the hook
+        - "isolated", "threaded" (optional): see
+        :meth:`ProgressListener.add_hook`
+        - any other argument for the factories of that hook
+
+    Parameters
+    ----------
+    callback : :func:`callback`
+        The callback of the monitor
+    format_str : str
+        The formatting string
+    formatter_factories : dict
+        A mapping placeholder - :func:`formatter_factory` for substitution
+        in the `format_str`
+    kwargs : dict
+        The arguments for the factories
+    rule : :func:`rule` or None (Default : None)
+        The rule of the main hook if the rules are applied per hook (see
+        :func:`_has_hook_rules`)
+
+    Return
+    ------
+    hook : :func:`hook`
+        The hook to use for the monitor
+    """
+    # The hook factories get the callback if they ask for one
+    factory_kwargs = dict(kwargs)
+    factory_kwargs["callback"] = callback
+    hook_factory = kwargs.get("hook_factory", None)
+    if hook_factory is not None:
+        hook = call_with(hook_factory, factory_kwargs)
+    else:
+        # ---- Building the format_mapper ---- #
+        format_mapper = dict()
+        formatters = Formatter()
+        for _, p_holder, _, _ in formatters.parse(format_str):
+            function = formatter_factories[p_holder]
+            format_mapper[p_holder] = call_with(function, kwargs)
+
+        hook = formated_hook_factory(callback, format_str, format_mapper)
+
+    # ---- Additional hooks ---- #
+    hook_factories = kwargs.get("hook_factories", None)
+    if hook_factories:
+        listener = ProgressListener()
+        listener.add_hook(hook, rule if _has_hook_rules(kwargs) else None)
+        for entry in hook_factories:
+            if not hasattr(entry, "get"):
+                listener.add_hook(call_with(entry, factory_kwargs))
+                continue
+            entry_kwargs = dict(factory_kwargs)
+            entry_kwargs.update(entry)
+            rule_factory = entry.get("rule_factory", None)
+            listener.add_hook(call_with(entry["hook_factory"], entry_kwargs),
+                              None if rule_factory is None else
+                              call_with(rule_factory, entry_kwargs),
+                              entry.get("isolated", True),
+                              entry.get("threaded", False))
+        hook = listener
+    return _add_watchdog(hook, kwargs)
+
+
+def _get_sampler(kwargs):
+    """
+    Return the sampler of the monitor (building it if a `sample_rate` or
+    a `max_per_second` is present in the factory arguments). The sampler is
+    stored in the arguments so that the formatters can access it.
+
+    Parameters
+    ----------
+    kwargs : dict
+        The arguments for the factories
+
+    Return
+    ------
+    sampler : :class:`Sampler` or None
+        The sampler or None if every task is to be monitored
+    """
+    if "sampler" not in kwargs:
+        if "sample_rate" not in kwargs and "max_per_second" not in kwargs:
+            return None
+        kwargs["sampler"] = call_with(sampler_factory, kwargs)
+    return kwargs["sampler"]
+
+
+_site_samplers = dict()
+_site_samplers_lock = Lock()
+
+def _cache_sampler(kwargs, frame):
+    """
+    Share the sampler of the monitors built at the same call site with the
+    same sampling arguments. The shortcuts build a monitor per use: without
+    a shared sampler, `max_per_second` would not limit anything.
+
+    Parameters
+    ----------
+    kwargs : dict
+        The arguments for the factories (the sampler is stored there)
+    frame : frame
+        The frame of the code building the monitor
+    """
+    if "sampler" in kwargs or ("sample_rate" not in kwargs and
+                               "max_per_second" not in kwargs):
+        return
+    key = (frame.f_code, frame.f_lineno, kwargs.get("sample_rate", 1.),
+           kwargs.get("max_per_second", None), kwargs.get("clock", None))
+    with _site_samplers_lock:
+        if key not in _site_samplers:
+            _site_samplers[key] = call_with(sampler_factory, kwargs)
+        kwargs["sampler"] = _site_samplers[key]
+
+
+def _function_monitor(function, hook, task_name, kwargs):
+    """
+    Return the monitored version of the function, taking the `weight`,
+    `clock` and `capture` of the factory arguments into account
+    """
+    weight = kwargs.get("weight", None)
+    clock = kwargs.get("clock", None)
+    capture = kwargs.get("capture", "full")
+    if weight is None and clock is None and capture == "full":
+        # Cheapest path
+        return partial(monitor_function, function, hook, task_name)
+    def monitored_function(*args, **fkwargs):
+        return monitor_call(function, hook, args, fkwargs, task_name, weight,
+                            clock, capture)
+    return monitored_function
+
+
+def _sample_function(function, monitored_function, sampler):
+    """
+    Return a function which calls the monitored function for sampled calls
+    and the raw function otherwise
+    """
+    if sampler is None:
+        return monitored_function
+    def sampled_function(*args, **kwargs):
+        if sampler():
+            return monitored_function(*args, **kwargs)
+        return function(*args, **kwargs)
+    return sampled_function
+
+
 # =========================== MONITORING FACTORY ============================ #
 
 def formated_monitoring(generator, 
@@ -69,26 +293,24 @@ def formated_monitoring(generator,
 
     # ---- Choosing the rule ---- #
     rule = call_with(rule_factory, kwargs)
+    _set_metric_name(kwargs, generator)
 
     # ---- Building the callback ---- #
     callback = call_with(callback_factory, kwargs)
 
-    # ---- Building the format_mapper ---- #
-    format_mapper = dict()
-    formatters = Formatter()
-    for _, p_holder, _, _ in formatters.parse(format_str):
-        function = formatter_factories[p_holder]
-        format_mapper[p_holder] = call_with(function, kwargs)
-
-
     # ---- Building the final hook ---- #
-
-    hook = formated_hook_factory(callback, format_str, format_mapper)
+    hook = _build_hook(callback, format_str, formatter_factories, kwargs,
+                       rule)
+    if _has_hook_rules(kwargs):
+        # The rules are applied by the listener
+        rule = always_notif_rule_factory()
 
     # ---- Naming the task ---- #
     task_name = kwargs.get("task_name", None)
 
-    return monitor_generator(generator, hook, task_name, rule)
+    return monitor_generator(generator, hook, task_name, rule,
+                             kwargs.get("weight", None),
+                             kwargs.get("clock", None))
 
 
 def monitor_generator_factory(**kwargs):
@@ -108,6 +330,13 @@ def monitor_generator_factory(**kwargs):
                 The rule to use
             callback_factory : :func:`callback_factory`
                 The callback to use
+            hook_factory : :func:`hook_factory`
+                A factory building the hook from the callback, in place of
+                the formatted string hook (e.g. :func:`structured_hook_factory`)
+            hook_factories : list of :func:`hook_factory` or dict
+                Factories of additional hooks (e.g.
+                :func:`prometheus_hook_factory`), possibly with their own
+                rule (see :func:`_build_hook`)
             other factory arguments
 
     Return
@@ -115,7 +344,10 @@ def monitor_generator_factory(**kwargs):
     A function which expects an iterator/generator to turn it into
     a monitored generator
     """
+    sampler = _get_sampler(kwargs)
     def embed_gen(generator):
+        if sampler is not None and not sampler():
+            return generator
         return formated_monitoring(generator=generator, **kwargs)
     return embed_gen
 
@@ -160,23 +392,14 @@ def formated_function_monitoring(function,
     # ---- Building the callback ---- #
     callback = call_with(callback_factory, kwargs)
 
-    # ---- Building the format_mapper ---- #
-    format_mapper = dict()
-    formatters = Formatter()
-    for _, p_holder, _, _ in formatters.parse(format_str):
-        function_ = formatter_factories[p_holder]
-        format_mapper[p_holder] = call_with(function_, kwargs)
-
-
-
     # ---- Building the final hook ---- #
-
-    hook = formated_hook_factory(callback, format_str, format_mapper)
+    _set_metric_name(kwargs, function)
+    hook = _build_hook(callback, format_str, formatter_factories, kwargs)
 
     # ---- Naming the task ---- #
     task_name = kwargs.get("task_name", None)
 
-    return partial(monitor_function, function, hook, task_name)
+    return _function_monitor(function, hook, task_name, kwargs)
 
 
 def monitor_function_factory(**kwargs):
@@ -196,6 +419,16 @@ def monitor_function_factory(**kwargs):
                 The rule to use
             callback_factory : :func:`callback_factory`
                 The callback to use
+            hook_factory : :func:`hook_factory`
+                A factory building the hook from the callback, in place of
+                the formatted string hook (e.g. :func:`structured_hook_factory`)
+            hook_factories : list of :func:`hook_factory` or dict
+                Factories of additional hooks (e.g.
+                :func:`prometheus_hook_factory`), possibly with their own
+                rule (see :func:`_build_hook`)
+            aggregate : bool
+                Whether to use the aggregated mode (see
+                :func:`aggregated_function_monitoring`)
             other factory arguments
 
     Return
@@ -203,11 +436,58 @@ def monitor_function_factory(**kwargs):
     A function which expects a function to turn it into
     a monitored function
     """
+    sampler = _get_sampler(kwargs)
+    if kwargs.get("aggregate", False):
+        monitoring = aggregated_function_monitoring
+    else:
+        monitoring = formated_function_monitoring
     def embed_func(function):
-        return formated_function_monitoring(function=function, **kwargs)
+        return _sample_function(function,
+                                monitoring(function=function, **kwargs),
+                                sampler)
     return embed_func
 
 
+# -----------------------   Aggregated statistics   ---------------------- #
+
+def aggregated_function_monitoring(function, 
+                                   callback_factory=stdout_callback_factory,
+                                   flush_period=60.,
+                                   **kwargs):
+    """
+    Build a function monitor which aggregates the calls statistics
+    (see :class:`CallStatistics`) instead of notifying each call
+
+    Parameters
+    ----------
+    function : callable
+        The function to monitor
+    callback_factory : :func:`callback_factory` (Default : 
+    stdout_callback_factory)
+        The callback through which the statistics are flushed
+    flush_period : float or None (Default : 60.)
+        The minimum period (in seconds) between two flushes. If None,
+        the statistics are only flushed at interpreter exit
+    kwargs : dict
+        Additionnal arguments for the factories
+
+    Return
+    ------
+    The aggregated function
+    """
+    # ---- Building the callback ---- #
+    callback = call_with(callback_factory, kwargs)
+
+    # ---- Naming the task ---- #
+    task_name = kwargs.get("task_name", None)
+    if task_name is None:
+        task_name = getattr(function, "__name__", str(function))
+
+    statistics = CallStatistics(task_name, callback, flush_period,
+                                kwargs.get("clock"))
+    return statistics.wrap(function)
+
+
 
 # -----------------------         Reports         ---------------------- #
 
@@ -235,7 +515,15 @@ def report_monitor_factory(function,
     subsec_precision : int (Default : 2)
         The number of decimal digits for the second in the time formatting
     kwargs : dict
-        Additionnal arguments for the factories
+        Additionnal arguments for the factories. In particular, `capture`
+        (see :class:`FunctionalTask`): "summary" bounds the memory held by
+        the tasks and the size of the reports; and `digest`: if True, the
+        reports are batched by a :class:`ReportDigest` (configured by
+        `digest_period`, `digest_size`, `nb_slowest`, `nb_failures` and
+        `use_timer`).
+        The digest aggregates the calls by `task_name`, which defaults to
+        the name of the function. A `hook_factory` replaces the report hook
+        and `hook_factories` add hooks (see :func:`_build_hook`)
 
     Return
     ------
@@ -246,13 +534,24 @@ def report_monitor_factory(function,
 
 
     # ---- Building the final hook ---- #
-    hook = report_hook_factory(callback, format_result, format_timestamp, 
-                               subsec_precision)
+    factory_kwargs = dict(kwargs)
+    factory_kwargs.update(format_result=format_result,
+                          format_timestamp=format_timestamp,
+                          subsec_precision=subsec_precision)
+    if factory_kwargs.get("hook_factory", None) is None:
+        factory_kwargs["hook_factory"] = (digest_hook_factory
+                                          if kwargs.get("digest", False)
+                                          else report_hook_factory)
+    _set_metric_name(factory_kwargs, function)
+    hook = _build_hook(callback, None, None, factory_kwargs)
 
     # ---- Naming the task ---- #
     task_name = kwargs.get("task_name", None)
+    if task_name is None and kwargs.get("digest", False):
+        # The digest aggregates the calls by task name
+        task_name = getattr(function, "__name__", str(function))
 
-    return partial(monitor_function, function, hook, task_name)
+    return _function_monitor(function, hook, task_name, kwargs)
 
 def report_factory(**kwargs):
     """
@@ -264,6 +563,14 @@ def report_factory(**kwargs):
         Arguments:
             callback_factory : :func:`callback_factory`
                 The callback to use
+            hook_factory : :func:`hook_factory`
+                A factory building the hook from the callback, in place of
+                the report (or digest) hook (e.g.
+                :func:`structured_hook_factory`)
+            hook_factories : list of :func:`hook_factory` or dict
+                Factories of additional hooks (e.g.
+                :func:`prometheus_hook_factory`), possibly with their own
+                rule (see :func:`_build_hook`)
             format_result : callable
                 A function which transforms the result of the function into
                  a string
@@ -273,6 +580,10 @@ def report_factory(**kwargs):
             subsec_precision : int
                 The number of decimal digits for the second in the time 
                 formatting
+            digest : bool
+                Whether to batch the reports (see :class:`ReportDigest`)
+            digest_period, digest_size, nb_slowest, nb_failures, use_timer :
+                The parameters of the digest
             Additionnal arguments for the factories
 
     Return
@@ -280,8 +591,12 @@ def report_factory(**kwargs):
     A function which expects a function to turn it into
     a monitored function
     """
+    sampler = _get_sampler(kwargs)
     def embed_func(function):
-        return report_monitor_factory(function=function, **kwargs)
+        return _sample_function(function,
+                                report_monitor_factory(function=function,
+                                                       **kwargs),
+                                sampler)
     return embed_func
 
 
@@ -309,12 +624,18 @@ def formated_code_monitoring(format_str="{$elapsed} {$exception}",
     stdout_callback_factory)
         The callback to use
     kwargs : dict
-        Additionnal arguments for the factories
+        Additionnal arguments for the factories (among which `phases`, the
+        names of the phases of the block; see :class:`CodeMonitor`)
 
     Return
     ------
     :func:`code_function`
     """
+    # ---- Sampling ---- #
+    sampler = _get_sampler(kwargs)
+    if sampler is not None and not sampler():
+        return IdProxy()
+
     # ---- Adding the format string ---- #
     kwargs["format_str"] = format_str
 
@@ -322,23 +643,18 @@ def formated_code_monitoring(format_str="{$elapsed} {$exception}",
     # ---- Building the callback ---- #
     callback = call_with(callback_factory, kwargs)
 
-    # ---- Building the format_mapper ---- #
-    format_mapper = dict()
-    formatters = Formatter()
-    for _, p_holder, _, _ in formatters.parse(format_str):
-        function_ = formatter_factories[p_holder]
-        format_mapper[p_holder] = call_with(function_, kwargs)
-
-
-
     # ---- Building the final hook ---- #
-
-    hook = formated_hook_factory(callback, format_str, format_mapper)
+    _set_metric_name(kwargs)
+    hook = _build_hook(callback, format_str, formatter_factories, kwargs)
 
     # ---- Naming the task ---- #
     task_name = kwargs.get("task_name", None)
 
-    return monitor_code(hook, task_name)
+    # ---- Declared phases ---- #
+    phases = kwargs.get("phases", None)
+
+    return monitor_code(hook, task_name, phases, kwargs.get("weight", None),
+                        kwargs.get("clock", None))
 
 
 
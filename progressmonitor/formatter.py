@@ -30,7 +30,6 @@ __version__ = '1.0'
 __date__ = "08 January 2015"
 
 
-import time
 import os
 import math
 try:
@@ -38,7 +37,9 @@ try:
 except ImportError:
     from threading import currentThread as current_thread
     
-from .util import (format_duration, format_size, fallback)
+from .util import (format_duration, format_size, fallback,
+                   terminal_width)
+from .clock import get_clock
 
 
 
@@ -224,9 +225,50 @@ def exception_formatter_factory(subsec_precision=2):
     return exception_formatter
 
 
+# The partial cells of the sub-character resolution, by eighth
+_EIGHTH_BLOCKS = [u"", u"\u258f", u"\u258e", u"\u258d", u"\u258c",
+                  u"\u258b", u"\u258a", u"\u2589"]
+_FULL_BLOCK = u"\u2588"
+# Stands for the percentage while the frames are precomputed
+_PROGRESS_MARK = "\0"
+# The frame tables of the progress bars, shared by the formatters (they are
+# built once per monitored generator)
+_frame_tables = dict()
+# The terminal width, determined once per process
+_terminal_width = []
+
+
+def _progressbar_frames(nb_steps, fill, blank, format, sub_steps):
+    # Return the frames of the progress bar, split around the percentage
+    key = (nb_steps, fill, blank, format, sub_steps)
+    frames = _frame_tables.get(key, None)
+    if frames is not None:
+        return frames
+
+    def split_frame(fill_, blank_):
+        frame = format % {"fill": fill_, "blank": blank_,
+                          "progress": _PROGRESS_MARK}
+        if isinstance(frame, unicode) and not isinstance(format, unicode):
+            frame = frame.encode("utf-8")
+        return frame.split(_PROGRESS_MARK)
+
+    if sub_steps:
+        frames = []
+        for index in xrange(nb_steps * 8 + 1):
+            full, eighths = divmod(index, 8)
+            blank_ = blank * (nb_steps - full - (1 if eighths else 0))
+            frames.append(split_frame(_FULL_BLOCK * full +
+                                      _EIGHTH_BLOCKS[eighths], blank_))
+    else:
+        frames = [split_frame(fill * filled, blank * (nb_steps - filled))
+                  for filled in xrange(nb_steps + 1)]
+    return _frame_tables.setdefault(key, frames)
+
+
 @fallback(nb_iterations_formatter_factory)
 def progressbar_formatter_factory(length, nb_steps=10, fill="=", blank=".",
-    format="[%(fill)s>%(blank)s] %(progress)s%%"):
+    format="[%(fill)s>%(blank)s] %(progress)s%%", sub_steps=False,
+    fixed_width=False):
     """
     Formatter factory
 
@@ -234,8 +276,9 @@ def progressbar_formatter_factory(length, nb_steps=10, fill="=", blank=".",
     ----------
     length : int >= 0
         The size of the iterator
-    nb_steps : int >= 0 (Default : 10)
-        The number of steps in the progress bar
+    nb_steps : int >= 0 or "auto" (Default : 10)
+        The number of steps in the progress bar. If "auto", the bar takes
+        half the width of the terminal (determined once per process)
     fill : str (Defailt : "=")
         The filling char for the progress bar
     blank : str (Default : ".")
@@ -243,6 +286,13 @@ def progressbar_formatter_factory(length, nb_steps=10, fill="=", blank=".",
     format : srt (Default : "[%(fill)s>%(blank)s] %(progress)s%%")
         The format of the progress bar (fill, blank and progress are
         mandatory)
+    sub_steps : bool (Default : False)
+        Whether to fill the bar with Unicode blocks, down to the eighth of
+        a step (`fill` is then ignored). A format such as
+        "|%(fill)s%(blank)s| %(progress)s%%" with a blank " " suits it best
+    fixed_width : bool (Default : False)
+        Whether to pad the percentage so that the bar always has the same
+        width
 
     Return
     ------
@@ -251,10 +301,34 @@ def progressbar_formatter_factory(length, nb_steps=10, fill="=", blank=".",
     Fallback
     --------
     :func:`nb_iterations_formatter_factory`
+
+    Note
+    ----
+    All the frames of the bar are built beforehand (and shared by the
+    formatters with the same parameters) so that formatting is a lookup
+    followed by the formatting of the percentage
     """
     # Length could be derived from the task but that would be to late
     # for the fallback
-    threshold = int(math.ceil(float(length)/nb_steps))
+    length = float(length)
+    prog_format = "%6.2f" if fixed_width else "%.2f"
+    if nb_steps == "auto":
+        if len(_terminal_width) == 0:
+            _terminal_width.append(terminal_width())
+        overhead = len(format % {"fill": "", "blank": "",
+                                 "progress": prog_format % 100})
+        nb_steps = max(1, _terminal_width[0] // 2 - overhead)
+
+    frames = _progressbar_frames(nb_steps, fill, blank, format, sub_steps)
+    if sub_steps:
+        nb_frames = nb_steps * 8
+        threshold = length / nb_frames
+    else:
+        nb_frames = nb_steps
+        threshold = int(math.ceil(length / nb_steps))
+    last_frame = frames[-1]
+    completed = prog_format % 100 if fixed_width else "100"
+
     def progressbar_formatter(task, exception=None):
         """
         Formatter for progress bar
@@ -270,18 +344,14 @@ def progressbar_formatter_factory(length, nb_steps=10, fill="=", blank=".",
         """
         if task.is_completed or length == 0:
             # fill the whole bar
-            fill_ = fill * nb_steps
-            blank_ = ""
-            prog_str = "100"
-        else:
-            # fill must be computed
-            filled = task.progress // threshold
-            fill_ = fill * filled
-            blank_ = blank * (nb_steps - filled)
-            prog_number = (float(task.progress) / length)*100
-            prog_str = "%.2f" % (prog_number)
-
-        return format % {'fill': fill_, 'blank': blank_, 'progress': prog_str}
+            return completed.join(last_frame)
+        # fill must be computed (the progress of the weighted
+        # subtasks is included)
+        progress = task.weighted_progress
+        filled = int(progress // threshold)
+        if filled > nb_frames:
+            filled = nb_frames
+        return (prog_format % (progress / length * 100)).join(frames[filled])
 
     return progressbar_formatter
 
@@ -354,7 +424,8 @@ def elapsed_time_formatter_factory(subsec_precision=2):
 @fallback(elapsed_time_formatter_factory)
 def remaining_time_formatter_factory(length, decay_rate=0.1, 
                                 subsec_precision=2, 
-                                elapsed_time=True, total_time=True):
+                                elapsed_time=True, total_time=True,
+                                clock=None):
     """
     Formatter factory. Estimate the remaining and total time of the task
     by exponential moving average.
@@ -371,6 +442,9 @@ def remaining_time_formatter_factory(length, decay_rate=0.1,
         Whether to indicate the elapsed time
     total_time : bool (Default : True)
         Whether to indicate the total time
+    clock : callable () --> float or None (Default : None)
+        The clock measuring the speed (see :mod:`clock`). If None, the
+        library-wide clock is used
 
     Fallback
     --------
@@ -382,6 +456,8 @@ def remaining_time_formatter_factory(length, decay_rate=0.1,
     """
     # Length could be derived from the task but that would be to late
     # for the fallback
+    if clock is None:
+        clock = get_clock()
     state = dict()
     def remaining_time_formatter(task, exception=None):
         """
@@ -398,20 +474,20 @@ def remaining_time_formatter_factory(length, decay_rate=0.1,
         elapsed time: 4.52s remaining time (estimation): 7.20s total time
         (estimation): 11.72s
         """
-        progress = task.progress
+        progress = task.weighted_progress
         msg = ""
         if progress == 0:
-            state["timestamp"] = time.time()
+            state["timestamp"] = clock()
             state["progress"] = progress
         else:
-            timestamp = time.time()
+            timestamp = clock()
             last_timestamp = state["timestamp"]
             last_progress = state["progress"]
             state["timestamp"] = last_timestamp
             state["progress"] = progress
             if elapsed_time:
                 # Computing elapsed time
-                duration = timestamp - task.timestamp
+                duration = task.duration
                 duration_str = format_duration(duration, subsec_precision)
                 msg += "elapsed time: " + duration_str + " "
             if not (task.is_completed or exception is not None):
@@ -484,6 +560,131 @@ def chunk_formatter_factory(chunk_size, total_size=None):
     return chunck_formatter    
 
 
+def phase_formatter_factory(subsec_precision=2):
+    """
+    Formatter factory for tasks split into phases (see :class:`PhasedTask`)
+
+    Parameters
+    ----------
+    subsec_precision : int (Default : 2)
+        The number of decimal digits for the second in the time formatting
+
+    Return
+    ------
+    :func:`phase_formatter`
+    """
+    def phase_formatter(task, exception=None):
+        """
+        Formatter which indicates the duration of each phase and the
+        estimated remaining time
+
+        Return
+        ------
+        string : str
+            The phase breakdown or an empty string if the task has no phase
+
+        Example
+        -------
+        [2/3] load: 1.20s, compute: 3.40s, save... remaining time
+        (estimation): 2.30s
+        """
+        durations = getattr(task, "phase_durations", None)
+        if durations is None:
+            return ""
+        length = task.nb_steps
+        length = str(length) if length is not None else "???"
+        phases = [name + ": " + format_duration(duration, subsec_precision)
+                  for name, duration in durations]
+        current = task.current_phase
+        if current is not None and exception is None:
+            phases.append(current + "...")
+        msg = "[" + str(task.progress) + "/" + length + "] " + ", ".join(phases)
+        remaining_time = task.remaining_time
+        if remaining_time is not None and current is not None:
+            rem_t_str = format_duration(remaining_time, subsec_precision)
+            msg += " remaining time (estimation): " + rem_t_str
+        return msg
+    return phase_formatter
+
+
+
+def subtasks_formatter_factory(max_depth=None):
+    """
+    Formatter factory for the weighted subtasks (see :class:`Task`)
+
+    Parameters
+    ----------
+    max_depth : int or None (Default : None)
+        The maximum depth of the subtasks to display (None for no limit)
+
+    Return
+    ------
+    :func:`subtasks_formatter`
+    """
+    def describe(task, depth):
+        length = task.nb_steps
+        if length:
+            desc = "%s %.2f%%" % (task.name, 100. * task.weighted_progress /
+                                  length)
+        else:
+            desc = "%s %d/???" % (task.name, task.progress)
+        if max_depth is None or depth < max_depth:
+            children = [describe(child, depth + 1)
+                        for child in task.running_children]
+            if len(children) > 0:
+                desc += " (" + ", ".join(children) + ")"
+        return desc
+
+    def subtasks_formatter(task, exception=None):
+        """
+        Formatter which indicates the progress of the running subtasks
+
+        Return
+        ------
+        string : str
+            The tree of the running subtasks or an empty string if there is
+            none
+
+        Example
+        -------
+        > file_3.csv 45.00% (chunk_2 12.00%)
+        """
+        children = [describe(child, 1) for child in task.running_children]
+        if len(children) == 0:
+            return ""
+        return "> " + ", ".join(children)
+    return subtasks_formatter
+
+
+
+def sampling_formatter_factory(sampler=None):
+    """
+    Formatter factory
+
+    Parameters
+    ----------
+    sampler : :class:`Sampler` or None (Default : None)
+        The sampler of the monitor
+
+    Return
+    ------
+    :func:`sampling_formatter`
+    """
+    def sampling_formatter(task, exception=None):
+        """
+        Formatter indicating how many tasks have been sampled
+
+        Example
+        -------
+        sampled 12/1200 (x100.00)
+        """
+        if sampler is None:
+            return ""
+        return "sampled %d/%d (x%.2f)" % (sampler.nb_sampled, sampler.nb_seen,
+                                          sampler.scale)
+    return sampling_formatter
+
+
 
 
 # ========================= META FORMATTER ========================== #
@@ -545,6 +746,9 @@ __formatter_factories__ = {
     "$time" : remaining_time_formatter_factory,
     "$exception" : exception_formatter_factory,
     "$chunk" : chunk_formatter_factory,
+    "$phases" : phase_formatter_factory,
+    "$subtasks" : subtasks_formatter_factory,
+    "$sampling" : sampling_formatter_factory,
     
 }
 
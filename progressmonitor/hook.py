@@ -29,13 +29,18 @@ __date__ = "08 January 2015"
 
 
 import time
-from .util import (format_duration)
-from .formatter import (string_formatter_factory, host_formatter_factory,
-                        processid_formatter_factory,
-                        threadname_formatter_factory,
-                        taskname_formatter_factory,
+import json
+import struct
+from logging import getLogger
+from .monitor import Task
+from .formatter import (string_formatter_factory,
                         elapsed_time_formatter_factory)
-from .callback import stdout_callback_factory
+from .callback import stdout_callback_factory, AsyncCallback, get_wants
+from .eventlog import eventlog_hook_factory
+from .prometheus import prometheus_hook_factory
+from .statsd import statsd_hook_factory
+from .trace import chrome_trace_hook_factory
+from .report import render_report, digest_hook_factory
 
 
 
@@ -46,13 +51,24 @@ class ProgressListener(object):
     ================
     ProgressListener
     ================
-    A :class:`ProgressListener` can register severals hooks on a monitor
+    A :class:`ProgressListener` can register severals hooks on a monitor.
+
+    Each hook may have its own notification rule, so that each destination
+    is notified (and formats its message) at its own pace. The rules only
+    filter the intermediate notifications: the first and last ones (and
+    those with an exception) always go through. For the rules to see every
+    notification, the monitor should use an always-true rule.
+
+    The failure of a hook does not prevent the other hooks from being
+    notified (unless the hook is not isolated). Slow hooks can be run from
+    a background thread.
     """
 
     def __init__(self):
         self._hooks = []
 
-    def add_hook(self, hook):
+    def add_hook(self, hook, rule=None, isolated=True, threaded=False,
+                 maxsize=1000):
         """
         Add the given hook
 
@@ -60,8 +76,25 @@ class ProgressListener(object):
         ----------
         hook : `hook` function
             The hook to register
+        rule : :func:`rule` or None (Default : None)
+            The notification rule of the hook. If None, the hook gets every
+            notification
+        isolated : bool (Default : True)
+            Whether the exceptions raised by the hook are logged (on the
+            'progressmonitor.hook' logger) rather than propagated
+        threaded : bool (Default : False)
+            Whether to call the hook from a background thread (see
+            :class:`AsyncCallback`). The intermediate notifications are
+            dropped if the hook lags more than `maxsize` notifications
+            behind; the hook sees the task as it is when it is called
+        maxsize : int (Default : 1000)
+            The maximum number of pending notifications of a threaded hook
         """
-        self._hooks.append(hook)
+        if threaded:
+            hook = _threaded_hook(hook, maxsize)
+        elif isolated:
+            hook = _isolated_hook(hook)
+        self._hooks.append((hook, rule))
 
     def hook(self, task, exception=None):
         """
@@ -74,8 +107,11 @@ class ProgressListener(object):
         exception : Exception (Default : None)
             The exception if one occured (None otherwise)
         """
-        for hook in self._hooks:
-            hook(task, exception)
+        is_intermediate = (exception is None and task.progress > 0 and
+                           task.status == Task.RUNNING)
+        for hook, rule in self._hooks:
+            if rule is None or not is_intermediate or rule(task):
+                hook(task, exception)
 
     def __call__(self, task, exception=None):
         """
@@ -91,6 +127,32 @@ class ProgressListener(object):
         self.hook(task, exception)
 
 
+def _isolated_hook(hook):
+    logger = getLogger("progressmonitor.hook")
+
+    def isolated_hook(task, exception=None):
+        try:
+            hook(task, exception)
+        except Exception:
+            logger.exception("Hook failure (task %s)", task.name)
+
+    return isolated_hook
+
+
+def _threaded_hook(hook, maxsize):
+    def forward(notification, is_last):
+        hook(*notification)
+    # The failures are logged by the background thread
+    async_hook = AsyncCallback(forward, maxsize,
+                               AsyncCallback.DROP_INTERMEDIATE)
+
+    def threaded_hook(task, exception=None):
+        async_hook((task, exception),
+                   exception is not None or task.status > Task.RUNNING)
+
+    threaded_hook.drain = async_hook.drain
+    return threaded_hook
+
 
 
 # ============================= CALLBACK HOOKS =============================== #
@@ -111,7 +173,14 @@ def callback_hook_factory(callback, formatter):
     Return
     ------
     :func:`callback_hook`
+
+    Note
+    ----
+    The formatter is not called if the callback does not want the message
+    (see :func:`callback.get_wants`)
     """
+    wants = get_wants(callback)
+
     def callback_hook(task, exception=None):
         """
         func:`hook`
@@ -126,7 +195,10 @@ def callback_hook_factory(callback, formatter):
         exception : Exception (Default : None)
             The exception if one occured (None otherwise)
         """
-        callback(formatter(task, exception))
+        last_com = task.is_completed or exception is not None
+        if wants is not None and not wants(task, last_com):
+            return
+        callback(formatter(task, exception), last_com)
     return callback_hook
 
 def set_callback(callback):
@@ -144,11 +216,19 @@ def set_callback(callback):
     @set_callback(callback_func)
     def formatter():
         pass
+
+    Note
+    ----
+    The formatter is not called (and the hook returns None) if the callback
+    does not want the message (see :func:`callback.get_wants`)
     """
+    wants = get_wants(callback)
 
     def callback_hook(string_hook):
         def apply_hook(task, exception=None):
             last_com = task.is_completed or exception is not None
+            if wants is not None and not wants(task, last_com):
+                return None
             message = string_hook(task, exception)
             callback(message, last_com)
             return message
@@ -219,35 +299,7 @@ def report_hook_factory(callback, format_result=str,
     The issue string is multiline
     """
 
-    layout = """Meta
-====
-Host: {$host}
-Pid: {$pid}
-Thread: {$thread}
-Task name: {$task}
-
-Function
-========
-Name: {_$fname}
-doc: {_$doc}
-Args: {_$fargs}
-Kwargs: {_$fkwargs}
-
-Result
-======
-{_$fresult}
-
-Exception
-=========
-{_$except}
-
-Time
-====
-Started: {_$start}
-Duration : {_$duration}
-    """
-    fillin = dict()
-
+    wants = get_wants(callback)
 
     def report_hook(task, exception=None):
         """
@@ -259,49 +311,190 @@ Duration : {_$duration}
             The monitored task
         exception : Exception (Default : None)
             The exception if one occured (None otherwise)
-
-        Return
-        ------
-        string : str
-            A multiline string report of the function
         """
         # On end only
         if task.is_completed or exception is not None:
-            # Fill in the meta
-            fillin["$host"] = host_formatter_factory()(task, exception)
-            fillin["$pid"] = processid_formatter_factory()(task, exception)
-            fillin["$thread"] = threadname_formatter_factory()(task, exception)
-            fillin["$task"] = taskname_formatter_factory()(task, exception)
-
-            # Fill in the function part
-            func = task.function
-            fillin["_$fname"] = func
-            fillin["_$doc"] = "n/a"
-            if hasattr(func, "__doc__"):
-                fillin["_$doc"] = func.__doc__
-            fillin["_$fargs"] = task.args
-            fillin["_$fkwargs"] = task.kwargs
-
-            # Fill in the results
-            fillin["_$fresult"] = format_result(task.result)
-
-            # Fill in the exception
-            if exception is None:
-                fillin["_$except"] = "None"
-            else:
-                fillin["_$except"] = str(exception)
-
-            # Fill in time
-            fillin["_$start"] = format_timestamp(task.timestamp)
-            fillin["_$duration"] = format_duration(task.duration,
-                                                   subsec_precision)
-
-            callback(layout.format(**fillin))
+            if wants is not None and not wants(task, True):
+                return
+            callback(render_report(task, exception, format_result,
+                                   format_timestamp, subsec_precision), True)
 
     return report_hook
 
 
 
+# ============================ STRUCTURED HOOKS ============================ #
+
+def _msgpack_encode(obj, chunks):
+    # Minimal msgpack encoder for the types of the events (nil, bool, int,
+    # float, str, list, map)
+    if obj is None:
+        chunks.append("\xc0")
+    elif obj is True:
+        chunks.append("\xc3")
+    elif obj is False:
+        chunks.append("\xc2")
+    elif isinstance(obj, (int, long)):
+        if 0 <= obj < 128:
+            chunks.append(chr(obj))
+        elif -32 <= obj < 0:
+            chunks.append(chr(obj & 0xff))
+        elif obj >= 0:
+            chunks.append(struct.pack(">BQ", 0xcf, obj))
+        else:
+            chunks.append(struct.pack(">Bq", 0xd3, obj))
+    elif isinstance(obj, float):
+        chunks.append(struct.pack(">Bd", 0xcb, obj))
+    elif isinstance(obj, basestring):
+        if isinstance(obj, unicode):
+            obj = obj.encode("utf-8")
+        length = len(obj)
+        if length < 32:
+            chunks.append(chr(0xa0 | length))
+        else:
+            chunks.append(struct.pack(">BI", 0xdb, length))
+        chunks.append(obj)
+    elif isinstance(obj, dict):
+        length = len(obj)
+        if length < 16:
+            chunks.append(chr(0x80 | length))
+        else:
+            chunks.append(struct.pack(">BI", 0xdf, length))
+        for key, value in obj.iteritems():
+            _msgpack_encode(key, chunks)
+            _msgpack_encode(value, chunks)
+    elif isinstance(obj, (list, tuple)):
+        length = len(obj)
+        if length < 16:
+            chunks.append(chr(0x90 | length))
+        else:
+            chunks.append(struct.pack(">BI", 0xdd, length))
+        for value in obj:
+            _msgpack_encode(value, chunks)
+    else:
+        _msgpack_encode(str(obj), chunks)
+
+
+def msgpack_encode(obj):
+    """
+    Encode the given object in the msgpack binary format
+
+    Parameters
+    ----------
+    obj : None, bool, int, float, str, list or dict
+        The object to encode
+
+    Return
+    ------
+    encoded : str
+        The msgpack encoding of the object
+
+    Example
+    -------
+    >>> msgpack_encode({"progress": 3})
+    '\\x81\\xa8progress\\x03'
+    """
+    chunks = []
+    _msgpack_encode(obj, chunks)
+    return "".join(chunks)
+
+
+def structured_hook_factory(callback, event_encoding="json", with_rate=True,
+                            with_eta=True):
+    """
+    Hook factory which sends structured events (instead of formatted
+    strings) through the callback.
+
+    The events are dictionaries with the keys
+        - 'id' : the id of the task
+        - 'name' : the name of the task
+        - 'progress' : the progress of the task
+        - 'total' : the number of steps of the task (None if unknown)
+        - 'start' : the creation timestamp of the task
+        - 'time' : the timestamp of the event
+        - 'duration' : the duration of the task so far (in seconds)
+        - 'status' : one of 'ready', 'running', 'done' or 'aborted'
+        - 'exception' : the class name of the exception (None if no
+        exception occured)
+        - 'rate' : the number of steps per second (if `with_rate`)
+        - 'eta' : the estimated remaining time in seconds (if `with_eta`;
+        None if it cannot be estimated)
+
+    Parameters
+    ----------
+    callback : :func:`callback`
+        The callback through which to send the events
+    event_encoding : str in {'json', 'msgpack', 'dict'} (Default : 'json')
+        The encoding of the events. 'json' produces compact JSON lines,
+        'msgpack' a binary msgpack string and 'dict' hands the dictionary
+        over to the callback (which must not keep it: the dictionary is
+        reused from one event to the next)
+    with_rate : bool (Default : True)
+        Whether to include the rate in the events
+    with_eta : bool (Default : True)
+        Whether to include the estimated remaining time in the events
+
+    Return
+    ------
+    :func:`structured_hook`
+    """
+    if event_encoding == "json":
+        encode = json.JSONEncoder(separators=(",", ":")).encode
+    elif event_encoding == "msgpack":
+        encode = msgpack_encode
+    elif event_encoding == "dict":
+        encode = None
+    else:
+        raise ValueError("Unknown event encoding '%s'" % event_encoding)
+    event = dict()
+    status_names = Task.STATUS_NAMES
+    clock = time.time
+    wants = get_wants(callback)
+
+    def structured_hook(task, exception=None):
+        """
+        :func:`hook` which sends a structured event through the callback
+
+        Parameters
+        ----------
+        task : :class:`Task`
+            The monitored task
+        exception : Exception (Default : None)
+            The exception if one occured (None otherwise)
+        """
+        last_com = task.is_completed or exception is not None
+        if wants is not None and not wants(task, last_com):
+            return
+        progress = task.progress
+        total = task.nb_steps
+        duration = task.duration
+        event["id"] = task.id
+        event["name"] = task.name
+        event["progress"] = progress
+        event["total"] = total
+        event["start"] = task.timestamp
+        event["time"] = clock()
+        event["duration"] = duration
+        event["status"] = status_names.get(task.status, "unknown")
+        event["exception"] = None if exception is None else \
+            exception.__class__.__name__
+        rate = progress / duration if duration > 0 else 0.
+        if with_rate:
+            event["rate"] = rate
+        if with_eta:
+            eta = None
+            if total is not None and rate > 0:
+                eta = (total - progress) / rate
+            event["eta"] = eta
+        if encode is None:
+            callback(event, last_com)
+        else:
+            callback(encode(event), last_com)
+
+    return structured_hook
+
+
+
 #----------------------- A default hook for most purposes ---------------------#
 
 def default_hook():
@@ -313,3 +506,14 @@ def default_hook():
         callback(formater(task, exception), last_com)
 
     return actual_hook
+
+
+
+__hook_factories__ = {
+    "$json" : structured_hook_factory,
+    "$eventlog" : eventlog_hook_factory,
+    "$prometheus" : prometheus_hook_factory,
+    "$statsd" : statsd_hook_factory,
+    "$chrome_trace" : chrome_trace_hook_factory,
+    "$digest" : digest_hook_factory,
+}
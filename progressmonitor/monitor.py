@@ -14,9 +14,145 @@ __version__ = '1.0'
 __date__ = "08 January 2015"
 
 
-import time
+from itertools import count
+from weakref import ref, WeakValueDictionary
+from threading import local
+try:
+    from thread import get_ident
+except ImportError:
+    from threading import get_ident
 
 from .rule import always_notif_rule_factory
+from .clock import wall_time, _task_clock
+from .util import summarize, Summary
+
+
+# ========================== TRACING CONTEXT ========================== #
+# The tasks being run (the innermost last) are kept in a stack per thread.
+# The stacks are registered (weakly, by thread id) so that the tasks being
+# run in any thread can be inspected (see :mod:`snapshot`) without any
+# registration per call. The tasks which are suspended while running (the
+# generators) are registered (weakly, by object id) as well
+
+_live_tasks = dict()
+_thread_stacks = WeakValueDictionary()
+_task_ids = count()
+
+
+class _TaskStack(list):
+    # A list which can be referenced weakly
+    __slots__ = ("__weakref__",)
+
+
+class _ActiveTasks(local):
+    def __init__(self):
+        self.stack = _TaskStack()
+        _thread_stacks[get_ident()] = self.stack
+
+_active_tasks = _ActiveTasks()
+
+
+def current_task():
+    """
+    Return
+    ------
+    task : :class:`Task` or None
+        The innermost task being run in the current thread (None if no
+        task is running)
+    """
+    stack = _active_tasks.stack
+    return stack[-1] if stack else None
+
+
+def activate_task(task):
+    """
+    Make the given task the current one (the parent of the tasks created
+    until it is deactivated) and register it as live until it is
+    deactivated, even while it is not current
+
+    Parameters
+    ----------
+    task : :class:`Task`
+        The task being run
+    """
+    _active_tasks.stack.append(task)
+    _live_tasks[id(task)] = (ref(task), get_ident())
+
+
+def deactivate_task(task):
+    """
+    Remove the given task from the running ones
+
+    Parameters
+    ----------
+    task : :class:`Task`
+        The task which is over
+
+    Note
+    ----
+    Interleaved generators do not finish in the reverse order of their
+    creation: the task is removed wherever it stands
+    """
+    _live_tasks.pop(id(task), None)
+    _pop_task(task)
+
+
+def _pop_task(task):
+    # Remove the task from the current ones (if it stands there)
+    stack = _active_tasks.stack
+    if stack and stack[-1] is task:
+        stack.pop()
+    else:
+        for index, other in enumerate(stack):
+            if other is task:
+                del stack[index]
+                break
+
+
+def live_tasks():
+    """
+    Return
+    ------
+    tasks : list of (:class:`Task`, int)
+        The tasks being run in any thread, together with the id of the
+        thread running them, by creation order
+
+    Note
+    ----
+    No lock is taken so that this function can be called from a signal
+    handler
+    """
+    tasks = dict()
+    for key, entry in list(_live_tasks.items()):
+        task = entry[0]()
+        if task is None:
+            # Abandoned task (its id may have been recycled meanwhile)
+            if _live_tasks.get(key) is entry:
+                _live_tasks.pop(key, None)
+        else:
+            tasks[task.id] = (task, entry[1])
+    for thread_id, stack in _thread_stacks.items():
+        for task in list(stack):
+            tasks[task.id] = (task, thread_id)
+    return [tasks[task_id] for task_id in sorted(tasks)]
+
+class _ChildRef(ref):
+    # The weak reference of a parent to a running weighted child, together
+    # with the contribution of the child to the progress of the parent
+    __slots__ = ("task_id", "parent", "contribution")
+
+
+def _drop_child(entry):
+    # An abandoned child does not contribute to its parent anymore
+    parent = entry.parent()
+    if parent is None or parent._running_children is None:
+        return
+    if parent._running_children.get(entry.task_id) is entry:
+        del parent._running_children[entry.task_id]
+        parent._children_progress -= entry.contribution
+        entry.contribution = 0.
+        if parent._parent is not None:
+            parent._propagate()
 
 # ============================== TASK ============================== #
 class Task(object):
@@ -26,11 +162,8 @@ class Task(object):
     ====
     A :class:`Task` represents a task composed of several steps
 
-
-    Class attributes
-    ----------------
-    nb_tasks : int
-        The number of already created tasks (not thread-safe)
+    The ids of the tasks are drawn from a counter shared by all the tasks:
+    the n-th task created has id n-1
 
     Class constants
     ---------------
@@ -42,37 +175,100 @@ class Task(object):
         State of a completed task
     ABORTED : int
         State of a aborted task
+    STATUS_NAMES : dict
+        A mapping state - short name ('ready', 'running', 'done', 'aborted')
 
 
     Constructor parameters
     ----------------------
     nb_steps : int or None
         The number of step before completion. Supply None is this is unknown
-    name : str
-        The name of the task
+    name : str or None (Default : None)
+        The name of the task. If None, a default name is built (on first
+        access)
+    weight : float or None (Default : None)
+        The number of steps of the parent task this task accounts for. If
+        not None, the progress of the task is aggregated into the parent
+        one (see :attr:`weighted_progress`)
+    parent : :class:`Task` or None (Default : None)
+        The task whose progress this one contributes to (only meaningful
+        with a weight). If None, the current task is used
+    clock : callable () --> float or None (Default : None)
+        The clock measuring the durations (see :mod:`clock`). If None, the
+        library-wide task clock is used (see :func:`get_task_clock`)
+
+    The task created while another one is running (see :func:`current_task`)
+    is its child: it shares its trace id and records its id as parent id.
+
+    Weighted children contribute to the progress of their parent: the
+    parent progress is its own progress, plus the weights of the children
+    finished since its last update, plus the fraction of the weights of the
+    running children. The aggregation is incremental: each update of a
+    child is propagated to its ancestors (O(depth)).
     """
 
-    nb_tasks = 0
+    # Tasks may be created per call: no instance dictionary
+    __slots__ = ("_id", "_name", "_nb_steps", "_progress", "_status",
+                 "_end_time", "_start_time", "_trace_id", "_parent_id",
+                 "_weight", "_parent", "_entry", "_children_progress",
+                 "_finished_weight", "_running_children", "_clock",
+                 "__weakref__")
 
     READY = 0
     RUNNING = 1
     DONE = 2
     ABORTED = 3
 
-    def __init__(self, nb_steps, name=None):
+    STATUS_NAMES = {READY: "ready", RUNNING: "running", DONE: "done",
+                    ABORTED: "aborted"}
 
-        self._id = Task.nb_tasks
-        Task.nb_tasks += 1
+    def __init__(self, nb_steps, name=None, weight=None, parent=None,
+                 clock=None):
 
-        if name is None:
-            name = "Unnamed_task."+str(self._id)
+        # Not a class attribute: setting one invalidates the attribute
+        # cache of the task classes
+        self._id = next(_task_ids)
         self._name = name
 
         self._nb_steps = nb_steps
         self._progress = 0
         self._status = Task.READY
         self._end_time = None
-        self._start_time = time.time()
+        if clock is None:
+            clock = _task_clock[0]
+        self._clock = clock
+        self._start_time = clock()
+
+        if parent is None:
+            stack = _active_tasks.stack
+            if stack:
+                parent = stack[-1]
+        if parent is None:
+            self._trace_id = self._id
+            self._parent_id = None
+        else:
+            self._trace_id = parent.trace_id
+            self._parent_id = parent.id
+
+        # Weighted aggregation
+        self._weight = weight
+        self._children_progress = 0.
+        self._finished_weight = 0.
+        self._running_children = None
+        if weight is None or parent is None:
+            self._parent = None
+            self._entry = None
+        else:
+            self._parent = parent
+            # The parent holds its running children weakly
+            entry = _ChildRef(self, _drop_child)
+            entry.task_id = self._id
+            entry.parent = ref(parent)
+            entry.contribution = 0.
+            self._entry = entry
+            if parent._running_children is None:
+                parent._running_children = dict()
+            parent._running_children[self._id] = entry
 
     @property
     def id(self):
@@ -84,6 +280,27 @@ class Task(object):
         """
         return self._id
 
+    @property
+    def trace_id(self):
+        """
+        Return
+        ------
+        trace_id : int
+            The id of the root task of the tree the task belongs to
+        """
+        return self._trace_id
+
+    @property
+    def parent_id(self):
+        """
+        Return
+        ------
+        parent_id : int or None
+            The id of the task which was running when the task was created
+            (None for a root task)
+        """
+        return self._parent_id
+
     @property
     def name(self):
         """
@@ -92,6 +309,8 @@ class Task(object):
         name : str
             The name of the task
         """
+        if self._name is None:
+            self._name = "Unnamed_task." + str(self._id)
         return self._name
 
     @property
@@ -132,7 +351,7 @@ class Task(object):
         if self._status == Task.DONE or self._status == Task.ABORTED:
             return self._end_time - self._start_time
         else:
-            return time.time() - self._start_time
+            return self._clock() - self._start_time
 
     @property
     def progress(self):
@@ -144,6 +363,64 @@ class Task(object):
         """
         return self._progress
 
+    @property
+    def weight(self):
+        """
+        Return
+        ------
+        weight : float or None
+            The number of steps of the parent task this task accounts for
+            (None if the task is not aggregated)
+        """
+        return self._weight
+
+    @property
+    def weighted_progress(self):
+        """
+        Return
+        ------
+        weighted_progress : int or float
+            The progress including the contributions of the weighted
+            children (see :class:`Task`), bounded by the number of steps
+        """
+        extra = self._finished_weight + self._children_progress
+        if extra == 0:
+            return self._progress
+        progress = self._progress + extra
+        if self._nb_steps is not None and progress > self._nb_steps:
+            return self._nb_steps
+        return progress
+
+    @property
+    def running_children(self):
+        """
+        Return
+        ------
+        running_children : list of :class:`Task`
+            The weighted children which are not over yet
+        """
+        if self._running_children is None:
+            return []
+        children = [entry() for entry in self._running_children.values()]
+        return sorted((child for child in children if child is not None),
+                      key=lambda t: t.id)
+
+    def _propagate(self):
+        # Push the contribution of the task up to the root
+        task = self
+        parent = task._parent
+        while parent is not None:
+            if task._status == Task.RUNNING and task._nb_steps:
+                contribution = task._weight * \
+                    min(1., float(task.weighted_progress) / task._nb_steps)
+            else:
+                contribution = 0.
+            entry = task._entry
+            parent._children_progress += contribution - entry.contribution
+            entry.contribution = contribution
+            task = parent
+            parent = task._parent
+
     @property
     def is_completed(self):
         """
@@ -160,9 +437,9 @@ class Task(object):
         Return
         ------
         timestamp : float
-            The timestamp of the creation time
+            The timestamp (Unix epoch) of the creation time
         """
-        return self._start_time
+        return wall_time(self._start_time, self._clock)
 
     def __str__(self):
         length = self.nb_steps
@@ -192,9 +469,7 @@ class ProgressableTask(Task):
     A :class:`Task` which can be run.
     """
 
-    def __init__(self, nb_steps, name=None):
-        Task.__init__(self, nb_steps, name)
-
+    __slots__ = ()
 
     def start(self):
         """
@@ -203,7 +478,7 @@ class ProgressableTask(Task):
         self._progress = 0
         self._status = Task.RUNNING
         self._end_time = None
-        self._start_time = time.time()
+        self._start_time = self._clock()
 
 
     def update(self, progress):
@@ -223,7 +498,12 @@ class ProgressableTask(Task):
         if self._status > Task.RUNNING:
             return self.is_completed
         self._status = Task.RUNNING
+        if progress != self._progress:
+            # The finished children are accounted for by the progress
+            self._finished_weight = 0.
         self._progress = progress
+        if self._parent is not None:
+            self._propagate()
         if self._nb_steps is None:
             return False
 
@@ -242,7 +522,13 @@ class ProgressableTask(Task):
             self._status = Task.DONE
         else:
             self._status = Task.ABORTED
-        self._end_time = time.time()
+        self._end_time = self._clock()
+        parent = self._parent
+        if parent is not None:
+            parent._running_children.pop(self._id, None)
+            if finished:
+                parent._finished_weight += self._weight
+            self._propagate()
 
 
     def __enter__(self):
@@ -268,10 +554,45 @@ class FunctionalTask(ProgressableTask):
     ==============
 
     A :class:`ProgressableTask` for monitoring functions.
+
+    The arguments and the result are kept according to the capture policy.
+    Apart from "full", the policies are applied when the task is closed, so
+    that the task does not keep the payloads alive once over:
+        - "full": the arguments and the result are kept as is
+        - "summary": they are replaced by bounded summaries (see
+        :func:`util.summarize`)
+        - "weakref": they are held through weak references (those which do
+        not support weak references are summarized); a collected object
+        reads as "<collected>"
+        - "none": they are not kept at all (they read as None)
+
+    Constructor parameters
+    ----------------------
+    function : callable
+        The monitored function
+    args : tuple
+        The positional arguments of the call
+    kwargs : dict
+        The keyword arguments of the call
+    capture : str (Default : "full")
+        The capture policy: "none", "weakref", "summary" or "full"
+    (see :class:`ProgressableTask` for the other parameters)
     """
 
-    def __init__(self, function, args, kwargs, name=None):
-        ProgressableTask.__init__(self, 1, name)
+    CAPTURE_POLICIES = ("none", "weakref", "summary", "full")
+
+    __slots__ = ("_function", "_args", "_kwargs", "_result", "_is_set",
+                 "_capture")
+
+    def __init__(self, function, args, kwargs, name=None, weight=None,
+                 parent=None, clock=None, capture="full"):
+        Task.__init__(self, 1, name, weight, parent, clock)
+        if capture != "full":
+            if capture == "none":
+                args = kwargs = None
+            elif capture not in FunctionalTask.CAPTURE_POLICIES:
+                raise ValueError("Unknown capture policy: " + str(capture))
+        self._capture = capture
         self._function = function
         self._args = args
         self._kwargs = kwargs
@@ -282,18 +603,29 @@ class FunctionalTask(ProgressableTask):
     def function(self):
         return self._function
 
+    @property
+    def capture(self):
+        return self._capture
+
     @property
     def args(self):
+        if self._capture == "weakref" and self._args is not None:
+            return tuple(_resolve(arg) for arg in self._args)
         return self._args
 
     @property
     def kwargs(self):
+        if self._capture == "weakref" and self._kwargs is not None:
+            return dict((key, _resolve(value))
+                        for key, value in self._kwargs.items())
         return self._kwargs
 
     @property
     def result(self):
         if not self._is_set:
             raise TypeError("Result not set yet.")
+        if self._capture == "weakref":
+            return _resolve(self._result)
         return self._result
 
     @result.setter
@@ -301,15 +633,183 @@ class FunctionalTask(ProgressableTask):
         if self._is_set:
             raise TypeError("Result can only be set once.")
         self._is_set = True
-        self._result = result
+        if self._capture != "none":
+            self._result = result
+
+    def close(self, finished=True):
+        ProgressableTask.close(self, finished)
+        capture = self._capture
+        if capture == "full":
+            return
+        elif capture == "summary":
+            release = summarize
+        elif capture == "weakref":
+            release = _weaken
+        else:
+            return
+        if self._args is not None:
+            self._args = tuple(release(arg) for arg in self._args)
+        if self._kwargs is not None:
+            self._kwargs = dict((key, release(value))
+                                for key, value in self._kwargs.items())
+        if self._is_set:
+            self._result = release(self._result)
 
     @property
     def is_result_set(self):
         return self._is_set
 
 
+def _weaken(value):
+    # Weak reference to the value if possible, summary otherwise
+    if isinstance(value, (ref, Summary)):
+        return value
+    try:
+        return ref(value)
+    except TypeError:
+        return summarize(value)
+
+
+def _resolve(value):
+    if isinstance(value, ref):
+        value = value()
+        if value is None:
+            return Summary("<collected>")
+    return value
+
+
+class PhasedTask(ProgressableTask):
+    """
+    ==========
+    PhasedTask
+    ==========
+
+    A :class:`ProgressableTask` made of successive phases, each of which is
+    closed by a lap. Each lap counts for one step.
+
+    The durations of the phases of the previous run (if the task is
+    restarted) are kept so as to estimate the remaining time.
+
+    Constructor parameters
+    ----------------------
+    phases : list of str or None (Default : None)
+        The names of the phases, if known beforehand
+    name : str
+        The name of the task
+    """
+
+    __slots__ = ("_phases", "_laps", "_history")
 
+    def __init__(self, phases=None, name=None, weight=None, parent=None,
+                 clock=None):
+        nb_steps = None if phases is None else len(phases)
+        Task.__init__(self, nb_steps, name, weight, parent, clock)
+        self._phases = phases
+        self._laps = []
+        self._history = dict()
 
+    def start(self):
+        """
+        (Re)Start the task
+        """
+        self._history.update(self.phase_durations)
+        self._laps = []
+        ProgressableTask.start(self)
+
+    def lap(self, phase_name=None):
+        """
+        Close the current phase
+
+        Parameters
+        ----------
+        phase_name : str or None (Default : None)
+            The name of the phase. If None, the declared name (or a default
+            one) is used
+
+        Return
+        ------
+        done : boolean
+            True if the task is completed, False otherwise
+        """
+        self._laps.append((phase_name, self._clock()))
+        return self.update(len(self._laps))
+
+    def _phase_name(self, index):
+        if self._phases is not None and index < len(self._phases):
+            return self._phases[index]
+        return "phase." + str(index)
+
+    @property
+    def phases(self):
+        """
+        Return
+        ------
+        phases : list of str or None
+            The declared phases
+        """
+        return self._phases
+
+    @property
+    def current_phase(self):
+        """
+        Return
+        ------
+        phase_name : str or None
+            The name of the running phase (None if the task is not running)
+        """
+        if self._status != Task.RUNNING:
+            return None
+        return self._phase_name(len(self._laps))
+
+    @property
+    def phase_durations(self):
+        """
+        Return
+        ------
+        phase_durations : list of (str, float)
+            The name and duration (in seconds) of the completed phases
+        """
+        durations = []
+        last = self._start_time
+        for index, (phase_name, timestamp) in enumerate(self._laps):
+            if phase_name is None:
+                phase_name = self._phase_name(index)
+            durations.append((phase_name, timestamp - last))
+            last = timestamp
+        return durations
+
+    @property
+    def remaining_time(self):
+        """
+        Estimate the remaining time from the durations of the phases of
+        the previous run or, failing that, from the mean duration of the
+        completed phases
+
+        Return
+        ------
+        remaining_time : float or None
+            The estimated remaining time (in seconds) or None if it cannot
+            be estimated
+        """
+        if self._phases is None:
+            return None
+        durations = self.phase_durations
+        nb_laps = len(durations)
+        mean = None
+        if nb_laps > 0:
+            mean = sum(d for _, d in durations) / nb_laps
+        remaining = 0.
+        for phase_name in self._phases[nb_laps:]:
+            estimate = self._history.get(phase_name, mean)
+            if estimate is None:
+                return None
+            remaining += estimate
+        if self._status == Task.RUNNING and nb_laps < len(self._phases):
+            # Time already spent in the current phase
+            last = self._laps[-1][1] if nb_laps > 0 else self._start_time
+            remaining -= min(self._clock() - last,
+                             self._history.get(self._phases[nb_laps], mean))
+        return remaining
 
 
 
@@ -317,7 +817,8 @@ class FunctionalTask(ProgressableTask):
 # ============================ PROGRESS MONITOR ============================ #
 
 def monitor_generator(generator, hook, task_name=None, 
-                      should_notify=always_notif_rule_factory()):
+                      should_notify=always_notif_rule_factory(), weight=None,
+                      clock=None):
 
     """
     Generator decorator for monitoring progress on another generator.
@@ -336,6 +837,11 @@ def monitor_generator(generator, hook, task_name=None,
     should_notify : callable (:class:`Task`) --> bool
         The notification rule. A function which takes as input the task
         and decide whether to notify (return True) or not (return False)
+    weight : float or None (Default : None)
+        The number of steps of the current task this one accounts for (see
+        :class:`Task`). If None, the progress is not aggregated
+    clock : callable () --> float or None (Default : None)
+        The clock of the task. If None, the library-wide task clock is used
 
     Yield
     -----
@@ -352,8 +858,17 @@ def monitor_generator(generator, hook, task_name=None,
         pass
 
     # Creating the task
+    task = ProgressableTask(length, task_name, weight, clock=clock)
+    # The tasks created while iterating are children of this one. The
+    # task is only current while the generator runs: it must not be the
+    # parent of what the consumer does between two iterations (nor stay
+    # current if the generator is left unfinished). It is thus taken off
+    # the stack at each yield and put back on resumption, on the stack of
+    # the thread resuming it (the only per-iteration cost: a list pop and
+    # append)
+    activate_task(task)
+    stack = _active_tasks.stack
     try:
-        task = ProgressableTask(length, task_name)
         task.start()
         progress = 0
         # Log the start of the task
@@ -368,7 +883,13 @@ def monitor_generator(generator, hook, task_name=None,
                 if should_notify(task):
                     hook(task)
             # Yield the element
+            if stack and stack[-1] is task:
+                stack.pop()
+            else:
+                _pop_task(task)
             yield elem
+            stack = _active_tasks.stack
+            stack.append(task)
             # Increment the progress
             progress += 1
         # Ends the task
@@ -381,6 +902,8 @@ def monitor_generator(generator, hook, task_name=None,
         # Notify last progress
         hook(task, excep)
         raise
+    finally:
+        deactivate_task(task)
 
 
 
@@ -415,8 +938,11 @@ def monitor_function(function, hook, task_name=None, *args, **kwargs):
     ---------
     Exceptions are not swallowed
     """
-    # Task will only last one call
+    # The body of monitor_call with the default options: this is the
+    # per-call path of the decorators, one frame is worth saving
     task = FunctionalTask(function, args, kwargs, task_name)
+    stack = _active_tasks.stack
+    stack.append(task)
     try:
         #Initial hook call
         hook(task, None)
@@ -435,6 +961,77 @@ def monitor_function(function, hook, task_name=None, *args, **kwargs):
         # Notify last progress
         hook(task, excep)
         raise
+    finally:
+        if stack and stack[-1] is task:
+            stack.pop()
+        else:
+            _pop_task(task)
+
+    return result
+
+
+def monitor_call(function, hook, args=(), kwargs=None, task_name=None,
+                 weight=None, clock=None, capture="full"):
+    """
+    Monitor a call of the given function (see :func:`monitor_function`)
+
+    Parameters
+    ----------
+    function : callable
+        The function to monitor
+    hook : callable (:class:`Task`, [exception])
+        A hook on which to register progress
+    args : tuple (Default : ())
+        The positional arguments to call the function with
+    kwargs : dict or None (Default : None)
+        The keyword arguments to call the function with
+    task_name : str or None (Default : None)
+        The  name of the task. If None, a default name will be provided
+    weight : float or None (Default : None)
+        The number of steps of the current task this one accounts for (see
+        :class:`Task`). If None, the progress is not aggregated
+    clock : callable () --> float or None (Default : None)
+        The clock of the task. If None, the library-wide task clock is used
+    capture : str (Default : "full")
+        How the task keeps the arguments and the result: "none", "weakref",
+        "summary" or "full" (see :class:`FunctionalTask`)
+
+    Return
+    ------
+    result :
+        The result of the function(*args, **kwargs) call
+    """
+    if kwargs is None:
+        kwargs = dict()
+    # Task will only last one call
+    task = FunctionalTask(function, args, kwargs, task_name, weight, None,
+                          clock, capture)
+    # The call is current (hence live) while it runs: no registration
+    stack = _active_tasks.stack
+    stack.append(task)
+    try:
+        #Initial hook call
+        hook(task, None)
+
+        result = function(*args, **kwargs)
+        task.result = result
+        # Ends the task
+        task.update(1)
+        task.close(True)
+        # Notify last progress
+        hook(task, None)
+
+    except Exception as excep:
+        # Ends the task
+        task.close(False)
+        # Notify last progress
+        hook(task, excep)
+        raise
+    finally:
+        if stack and stack[-1] is task:
+            stack.pop()
+        else:
+            _pop_task(task)
 
     return result
 
@@ -459,6 +1056,13 @@ class CodeMonitor(object):
         case an error occured
     task_name : str or None (Default : None)
         The  name of the task. If None, a default name will be provided
+    phases : list of str or None (Default : None)
+        The names of the phases of the block, if known beforehand
+    weight : float or None (Default : None)
+        The number of steps of the current task this one accounts for (see
+        :class:`Task`). If None, the progress is not aggregated
+    clock : callable () --> float or None (Default : None)
+        The clock of the task. If None, the library-wide task clock is used
 
     Exception
     ---------
@@ -470,22 +1074,66 @@ class CodeMonitor(object):
         # compute stuff
 
     Yes, it's that easy !
+
+    The block can be split into phases with :meth:`lap`:
+
+    with CodeMonitor(hook=hook, phases=["load", "compute"]) as cm:
+        # load stuff
+        cm.lap()
+        # compute stuff
+
+    The last phase is closed when leaving the block. Without phases, the
+    block is a single step :class:`ProgressableTask`.
     """
 
-    def __init__(self, hook, task_name=None):
+    def __init__(self, hook, task_name=None, phases=None, weight=None,
+                 clock=None):
         self._hooks = [hook]
-        self.task = ProgressableTask(1, task_name)
+        if phases is None:
+            self.task = ProgressableTask(1, task_name, weight, clock=clock)
+        else:
+            self.task = PhasedTask(phases, task_name, weight, clock=clock)
 
     def add_hooks(self, hook):
         self._hooks.append(hook)
 
     def start(self):
         self.task.start()
+        activate_task(self.task)
+        try:
+            for hook in self._hooks:
+                hook(self.task, None)
+        except Exception:
+            # The block will not run (nor stop the task)
+            self.task.close(False)
+            deactivate_task(self.task)
+            raise
+
+    def lap(self, phase_name=None):
+        """
+        Close the current phase and notify the hooks
+
+        Parameters
+        ----------
+        phase_name : str or None (Default : None)
+            The name of the phase. If None, the declared name (or a default
+            one) is used
+
+        Exception
+        ---------
+        ValueError
+            If the phases of the block were not declared
+        """
+        if not isinstance(self.task, PhasedTask):
+            raise ValueError("The phases of the block must be declared "
+                             "(see `phases`)")
+        self.task.lap(phase_name)
         for hook in self._hooks:
             hook(self.task, None)
 
     def stop(self, finished=True, exception=None):
         self.task.close(finished)
+        deactivate_task(self.task)
         for hook in self._hooks:
             hook(self.task, exception)
 
@@ -495,6 +1143,12 @@ class CodeMonitor(object):
 
     def __exit__(self, type, value, traceback):
         if value is None:
+            # Closing the last phase (or the single step)
+            task = self.task
+            if not isinstance(task, PhasedTask):
+                task.update(task.nb_steps)
+            elif task.nb_steps is None or task.progress < task.nb_steps:
+                task.lap()
             is_done = ((self.task.nb_steps is None) or 
                        (self.task.progress >= self.task.nb_steps))
             self.stop(is_done)
@@ -505,7 +1159,7 @@ class CodeMonitor(object):
         return False
 
 
-def monitor_code(hook, task_name=None):
+def monitor_code(hook, task_name=None, phases=None, weight=None, clock=None):
     """
     Provide a context manager to monitor code blocks.
 
@@ -518,6 +1172,13 @@ def monitor_code(hook, task_name=None):
         case an error occured
     task_name : str or None (Default : None)
         The  name of the task. If None, a default name will be provided
+    phases : list of str or None (Default : None)
+        The names of the phases of the block, if known beforehand
+    weight : float or None (Default : None)
+        The number of steps of the current task this one accounts for (see
+        :class:`Task`). If None, the progress is not aggregated
+    clock : callable () --> float or None (Default : None)
+        The clock of the task. If None, the library-wide task clock is used
 
     Return
     ------
@@ -525,4 +1186,4 @@ def monitor_code(hook, task_name=None):
         the context manager
     """
     # Provided for aesthetic reasons
-    return CodeMonitor(hook, task_name)
+    return CodeMonitor(hook, task_name, phases, weight, clock)
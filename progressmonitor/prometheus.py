@@ -0,0 +1,396 @@
+# -*- coding: utf-8 -*-
+"""
+Module :mod:`prometheus` exposes the monitored tasks as Prometheus metrics.
+
+A :class:`PrometheusExporter` serves the metrics in the Prometheus text
+format from a small threaded HTTP server bound to localhost. Tasks are
+registered by a :func:`hook` (see :func:`prometheus_hook_factory`) on their
+first notification, under the name of their monitor. The series are
+labelled by that name only (not by task), so that their number stays
+bounded: the progress, total, completion ratio, duration and status of the
+latest task of each monitor are read from the task itself at scrape time,
+so that the exporter adds no cost to the iterations, and the number of
+running tasks of each monitor is exposed alongside.
+
+The exporter also exposes the exception counts of the tasks, the number and
+durations of completed tasks, and the call counts and latencies of the
+functions monitored in aggregated mode (see :mod:`stats`).
+"""
+
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+import socket
+import weakref
+from collections import namedtuple
+from threading import Thread, Lock
+from logging import getLogger
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from SocketServer import ThreadingMixIn
+
+from .monitor import Task
+from .stats import all_statistics
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_TaskSnapshot = namedtuple("_TaskSnapshot", ["id", "progress", "nb_steps",
+                                             "duration", "status"])
+
+
+def _escape(value):
+    if isinstance(value, unicode):
+        value = value.encode("utf-8")
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"")\
+        .replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join("%s=\"%s\"" % (key, _escape(value))
+                          for key, value in sorted(labels.items())) + "}"
+
+
+def _task_snapshot(task):
+    # Finished tasks are kept as snapshots so as not to retain the
+    # arguments and results of the functions
+    return _TaskSnapshot(task.id, task.progress, task.nb_steps, task.duration,
+                         Task.STATUS_NAMES.get(task.status, "unknown"))
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class PrometheusExporter(object):
+    """
+    ==================
+    PrometheusExporter
+    ==================
+    A :class:`PrometheusExporter` collects tasks and serves their metrics.
+
+    The tasks are exposed under a name (that of their monitor). Live tasks
+    are held through weak references; a snapshot of the latest task of each
+    name is kept once it has finished (unless a newer one runs).
+
+    Constructor parameters
+    ----------------------
+    host : str (Default : "127.0.0.1")
+        The address the HTTP server binds to
+    port : int (Default : 9464)
+        The port of the HTTP server (0 to pick a free one)
+    """
+
+    def __init__(self, host="127.0.0.1", port=9464):
+        self._address = (host, port)
+        self._lock = Lock()
+        # task id --> (weak reference to the task, name)
+        self._live = dict()
+        # name --> weak reference to the latest task or snapshot of it
+        self._latest = dict()
+        self._exceptions = dict()
+        self._completions = dict()
+        self._server = None
+        self._thread = None
+
+    @property
+    def port(self):
+        """
+        Return
+        ------
+        port : int
+            The port the server listens to (the requested one if the server
+            is not started)
+        """
+        if self._server is not None:
+            return self._server.server_address[1]
+        return self._address[1]
+
+    def register(self, task, name="task"):
+        """
+        Expose the given task
+
+        Parameters
+        ----------
+        task : :class:`Task`
+            The task to expose
+        name : str (Default : "task")
+            The name under which the task is exposed (the task names would
+            make the number of series unbounded)
+        """
+        with self._lock:
+            ref = weakref.ref(task)
+            self._live[task.id] = (ref, name)
+            self._latest[name] = ref
+
+    def is_registered(self, task):
+        """
+        Return
+        ------
+        is_registered : bool
+            Whether the given task is exposed as a live task
+        """
+        return task.id in self._live
+
+    def finish(self, task, exception=None, name="task"):
+        """
+        Record the end of the given task
+
+        Parameters
+        ----------
+        task : :class:`Task`
+            The finished task
+        exception : Exception (Default : None)
+            The exception if one occured (None otherwise)
+        name : str (Default : "task")
+            The name under which the task is exposed and counted
+        """
+        with self._lock:
+            self._live.pop(task.id, None)
+            latest = self._latest.get(name, None)
+            if isinstance(latest, weakref.ref):
+                latest = latest()
+            if not isinstance(latest, Task) or latest.id == task.id:
+                # Unless a newer task of the same name is running
+                self._latest[name] = _task_snapshot(task)
+            if task.status == Task.DONE and exception is None:
+                count, total = self._completions.get(name, (0, 0.))
+                self._completions[name] = (count + 1, total + task.duration)
+            if exception is not None:
+                key = (name, exception.__class__.__name__)
+                self._exceptions[key] = self._exceptions.get(key, 0) + 1
+
+    def _snapshot(self):
+        with self._lock:
+            running = dict()
+            for task_id, (ref, name) in list(self._live.items()):
+                if ref() is None:
+                    # Abandoned task
+                    del self._live[task_id]
+                else:
+                    running[name] = running.get(name, 0) + 1
+            tasks = []
+            for name, latest in list(self._latest.items()):
+                if isinstance(latest, weakref.ref):
+                    task = latest()
+                    if task is None:
+                        # Abandoned task
+                        del self._latest[name]
+                        continue
+                    latest = _task_snapshot(task)
+                tasks.append((name, latest))
+            tasks.sort()
+            return (tasks, running, dict(self._exceptions),
+                    dict(self._completions))
+
+    def render(self):
+        """
+        Return
+        ------
+        metrics : str
+            The metrics in the Prometheus text format
+        """
+        tasks, running, exceptions, completions = self._snapshot()
+        lines = []
+
+        def family(name, metric_type, doc):
+            lines.append("# HELP %s %s" % (name, doc))
+            lines.append("# TYPE %s %s" % (name, metric_type))
+
+        family("progressmonitor_tasks_running", "gauge",
+               "The number of running tasks")
+        for name, count in sorted(running.items()):
+            lines.append("progressmonitor_tasks_running%s %d" %
+                         (_labels(name=name), count))
+        family("progressmonitor_task_progress", "gauge",
+               "The progress of the latest task")
+        for name, task in tasks:
+            lines.append("progressmonitor_task_progress%s %d" %
+                         (_labels(name=name), task.progress))
+        family("progressmonitor_task_total", "gauge",
+               "The number of steps of the latest task (if known)")
+        for name, task in tasks:
+            if task.nb_steps is not None:
+                lines.append("progressmonitor_task_total%s %d" %
+                             (_labels(name=name), task.nb_steps))
+        family("progressmonitor_task_completion_ratio", "gauge",
+               "The progress over the number of steps of the latest task")
+        for name, task in tasks:
+            if task.nb_steps:
+                lines.append("progressmonitor_task_completion_ratio%s %r" %
+                             (_labels(name=name),
+                              float(task.progress) / task.nb_steps))
+        family("progressmonitor_task_duration_seconds", "gauge",
+               "The duration of the latest task so far")
+        for name, task in tasks:
+            lines.append("progressmonitor_task_duration_seconds%s %r" %
+                         (_labels(name=name), task.duration))
+        family("progressmonitor_task_status", "gauge",
+               "The status of the latest task")
+        for name, task in tasks:
+            lines.append("progressmonitor_task_status%s 1" %
+                         _labels(name=name, status=task.status))
+
+        family("progressmonitor_task_exceptions_total", "counter",
+               "The number of tasks interrupted by an exception")
+        for (name, exception), count in sorted(exceptions.items()):
+            lines.append("progressmonitor_task_exceptions_total%s %d" %
+                         (_labels(name=name, exception=exception), count))
+        family("progressmonitor_task_completed_total", "counter",
+               "The number of successfully completed tasks")
+        for name, (count, _) in sorted(completions.items()):
+            lines.append("progressmonitor_task_completed_total%s %d" %
+                         (_labels(name=name), count))
+        family("progressmonitor_task_completed_seconds_total", "counter",
+               "The cumulated duration of the successfully completed tasks")
+        for name, (_, total) in sorted(completions.items()):
+            lines.append("progressmonitor_task_completed_seconds_total%s %r" %
+                         (_labels(name=name), total))
+
+        all_stats = sorted((stats.snapshot() for stats in all_statistics()),
+                           key=lambda stats: stats["name"])
+        family("progressmonitor_function_calls_total", "counter",
+               "The number of calls of the aggregated functions")
+        for stats in all_stats:
+            lines.append("progressmonitor_function_calls_total%s %d" %
+                         (_labels(function=stats["name"]), stats["calls"]))
+        family("progressmonitor_function_errors_total", "counter",
+               "The number of failed calls of the aggregated functions")
+        for stats in all_stats:
+            lines.append("progressmonitor_function_errors_total%s %d" %
+                         (_labels(function=stats["name"]), stats["errors"]))
+        family("progressmonitor_function_latency_seconds", "histogram",
+               "The latency of the aggregated functions")
+        for stats in all_stats:
+            histogram = stats["histogram"]
+            last = max([i for i, count in enumerate(histogram) if count > 0]
+                       or [0])
+            cumulated = 0
+            for i in xrange(last + 1):
+                cumulated += histogram[i]
+                lines.append("progressmonitor_function_latency_seconds_bucket"
+                             "%s %d" % (_labels(function=stats["name"],
+                                                le=repr((2 ** i) * 1e-6)),
+                                        cumulated))
+            lines.append("progressmonitor_function_latency_seconds_bucket"
+                         "%s %d" % (_labels(function=stats["name"],
+                                            le="+Inf"), stats["calls"]))
+            lines.append("progressmonitor_function_latency_seconds_sum%s %r" %
+                         (_labels(function=stats["name"]), stats["total"]))
+            lines.append("progressmonitor_function_latency_seconds_count"
+                         "%s %d" % (_labels(function=stats["name"]),
+                                    stats["calls"]))
+        lines.append("")
+        return "\n".join(lines)
+
+    def start(self):
+        """
+        Start the HTTP server (in a background thread)
+        """
+        if self._server is not None:
+            return
+        exporter = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = exporter.render()
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = _ThreadingHTTPServer(self._address, MetricsHandler)
+        self._thread = Thread(target=self._server.serve_forever,
+                              name="progressmonitor.prometheus")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the HTTP server
+        """
+        server, thread = self._server, self._thread
+        self._server = self._thread = None
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+
+_default_exporters = dict()
+_default_exporters_lock = Lock()
+
+def default_exporter(port=9464):
+    """
+    Return
+    ------
+    exporter : :class:`PrometheusExporter`
+        The library-wide exporter listening to the given port (created and
+        started on first use). If the port cannot be bound, a warning is
+        logged ('progressmonitor.prometheus') and the exporter collects the
+        tasks without serving them
+    """
+    with _default_exporters_lock:
+        exporter = _default_exporters.get(port, None)
+        if exporter is None:
+            exporter = PrometheusExporter(port=port)
+            try:
+                exporter.start()
+            except (socket.error, IOError) as error:
+                # Monitoring must not break the monitored code
+                getLogger("progressmonitor.prometheus").warning(
+                    "Cannot serve the metrics on port %s: %s", port, error)
+            _default_exporters[port] = exporter
+    return exporter
+
+
+def prometheus_hook_factory(exporter=None, prometheus_port=9464,
+                            metric_name=None):
+    """
+    Hook factory which exposes the notified tasks through a
+    :class:`PrometheusExporter`
+
+    Parameters
+    ----------
+    exporter : :class:`PrometheusExporter` or None (Default : None)
+        The exporter to use. If None, the library-wide exporter of the given
+        port is used
+    prometheus_port : int (Default : 9464)
+        The port of the library-wide exporter
+    metric_name : str or None (Default : None)
+        The `name` label of the series of the tasks (filled in by the
+        monitor factories with the task, function or monitor name). If None,
+        "task" is used
+
+    Return
+    ------
+    :func:`prometheus_hook`
+    """
+    if exporter is None:
+        exporter = default_exporter(prometheus_port)
+    if metric_name is None:
+        metric_name = "task"
+
+    def prometheus_hook(task, exception=None):
+        """
+        :func:`hook` which registers the task to the exporter
+
+        Parameters
+        ----------
+        task : :class:`Task`
+            The monitored task
+        exception : Exception (Default : None)
+            The exception if one occured (None otherwise)
+        """
+        if exception is not None or task.status > Task.RUNNING:
+            exporter.finish(task, exception, metric_name)
+        elif not exporter.is_registered(task):
+            exporter.register(task, metric_name)
+
+    return prometheus_hook
@@ -0,0 +1,443 @@
+# -*- coding: utf-8 -*-
+"""
+Module :mod:`report` renders the reports of the monitored functions.
+
+:func:`render_report` renders the report of one call (see
+:func:`hook.report_hook_factory`). For functions called thousands of times,
+one report per call is too much (think of a logging handler sending emails):
+a :class:`ReportDigest` aggregates the calls per task name over a time or
+count window and issues a single summary per window, with the number of
+calls and failures, the exceptions, the duration statistics and the full
+reports of the slowest calls. The reports are only rendered at digest time,
+and only for the calls which end up in the digest; the arguments of those
+calls are summarized (see :func:`util.summarize`) as soon as they are
+retained.
+"""
+
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+import time
+import atexit
+import weakref
+from heapq import heappush, heappushpop
+from itertools import count
+from threading import Lock, Timer
+
+from .util import format_duration, summarize
+from .clock import get_clock
+from .stats import format_latency
+from .formatter import (host_formatter_factory, processid_formatter_factory,
+                        threadname_formatter_factory,
+                        taskname_formatter_factory)
+
+
+_LAYOUT = """Meta
+====
+Host: {$host}
+Pid: {$pid}
+Thread: {$thread}
+Task name: {$task}
+
+Function
+========
+Name: {_$fname}
+doc: {_$doc}
+Args: {_$fargs}
+Kwargs: {_$fkwargs}
+
+Result
+======
+{_$fresult}
+
+Exception
+=========
+{_$except}
+
+Time
+====
+Started: {_$start}
+Duration : {_$duration}
+    """
+
+
+def render_report(task, exception=None, format_result=str,
+                  format_timestamp=time.ctime, subsec_precision=2):
+    """
+    Render the report of a function call
+
+    Parameters
+    ----------
+    task : :class:`FunctionalTask`
+        The task of the call
+    exception : Exception (Default : None)
+        The exception if one occured (None otherwise)
+    format_result : callable (Default : str)
+        A function which transforms the result of the function into a string
+    format_timestamp : callable (Default : time.ctime)
+        A function which transforms the Unix epoch into a date+time string
+    subsec_precision : int (Default : 2)
+        The number of decimal digits for the second in the time formatting
+
+    Return
+    ------
+    string : str
+        A multiline string report of the call
+    """
+    fillin = dict()
+    # Fill in the meta
+    fillin["$host"] = host_formatter_factory()(task, exception)
+    fillin["$pid"] = processid_formatter_factory()(task, exception)
+    fillin["$thread"] = threadname_formatter_factory()(task, exception)
+    fillin["$task"] = taskname_formatter_factory()(task, exception)
+
+    # Fill in the function part
+    func = task.function
+    fillin["_$fname"] = func
+    fillin["_$doc"] = "n/a"
+    if hasattr(func, "__doc__"):
+        fillin["_$doc"] = func.__doc__
+    fillin["_$fargs"] = task.args
+    fillin["_$fkwargs"] = task.kwargs
+
+    # Fill in the results (there is none if the call failed)
+    fillin["_$fresult"] = "n/a"
+    if task.is_result_set:
+        fillin["_$fresult"] = format_result(task.result)
+
+    # Fill in the exception
+    if exception is None:
+        fillin["_$except"] = "None"
+    else:
+        fillin["_$except"] = str(exception)
+
+    # Fill in time
+    fillin["_$start"] = format_timestamp(task.timestamp)
+    fillin["_$duration"] = format_duration(task.duration, subsec_precision)
+
+    return _LAYOUT.format(**fillin)
+
+
+def _exception_summary(exception, max_length=80):
+    message = str(exception)
+    if len(message) > max_length:
+        message = message[:max_length - 3] + "..."
+    return "%s: %s" % (exception.__class__.__name__, message)
+
+
+class _RetainedCall(object):
+    # What the report of a retained call needs, with the arguments
+    # summarized: the task (and its arguments) is not kept until the digest
+
+    __slots__ = ("id", "name", "function", "args", "kwargs", "result",
+                 "is_result_set", "timestamp", "duration")
+
+    def __init__(self, task):
+        self.id = task.id
+        self.name = task.name
+        self.function = task.function
+        args, kwargs = task.args, task.kwargs
+        self.args = None if args is None else tuple(summarize(arg)
+                                                    for arg in args)
+        self.kwargs = None if kwargs is None else \
+            dict((key, summarize(value)) for key, value in kwargs.items())
+        self.is_result_set = task.is_result_set
+        self.result = task.result if self.is_result_set else None
+        self.timestamp = task.timestamp
+        self.duration = task.duration
+
+
+class _DigestEntry(object):
+    # The aggregated calls of one task name
+
+    __slots__ = ("nb_calls", "nb_failures", "total", "minimum", "maximum",
+                 "first", "last", "slowest", "failures", "exceptions")
+
+    def __init__(self):
+        self.nb_calls = 0
+        self.nb_failures = 0
+        self.total = 0.
+        self.minimum = float("inf")
+        self.maximum = 0.
+        self.first = None
+        self.last = None
+        # min-heap of (duration, sequence number, call, exception)
+        self.slowest = []
+        self.failures = []
+        self.exceptions = dict()
+
+
+_all_digests = weakref.WeakSet()
+
+
+class ReportDigest(object):
+    """
+    ============
+    ReportDigest
+    ============
+    A :class:`ReportDigest` aggregates the completed calls per task name and
+    sends one digest through the callback per window. A window is closed
+    when `digest_period` seconds have elapsed or `digest_size` calls have
+    been added, whichever comes first. The size is checked when a call is
+    added; the period as well, and by a timer thread (if `use_timer`) so
+    that the last window is not held back until the next call. The pending
+    calls are also sent at interpreter exit.
+
+    Only the slowest and first failed calls are kept, with their arguments
+    summarized (see :func:`util.summarize`) whatever the capture policy of
+    the tasks, so that the memory is bounded whatever the size of the
+    window.
+
+    Constructor parameters
+    ----------------------
+    callback : :func:`callback`
+        The callback through which the digests are sent
+    digest_period : float or None (Default : 60.)
+        The maximum duration (in seconds) of a window (None for no limit)
+    digest_size : int or None (Default : 1000)
+        The maximum number of calls of a window (None for no limit)
+    nb_slowest : int (Default : 3)
+        The number of slowest calls (per task name) whose report is included
+    nb_failures : int (Default : 3)
+        The number of failed calls (per task name) whose report is included
+    format_result : callable (Default : str)
+        A function which transforms the result of the function into a string
+    format_timestamp : callable (Default : time.ctime)
+        A function which transforms the Unix epoch into a date+time string
+    subsec_precision : int (Default : 2)
+        The number of decimal digits for the second in the time formatting
+    clock : callable () --> float or None (Default : None)
+        The clock measuring the windows (see :mod:`clock`). If None, the
+        library-wide clock is used
+    use_timer : bool (Default : True)
+        Whether a timer thread sends the digest when the period of a window
+        is over. Otherwise, an expired window is only sent by the next call,
+        :meth:`flush_expired`, :meth:`flush` or at interpreter exit
+    """
+
+    def __init__(self, callback, digest_period=60., digest_size=1000,
+                 nb_slowest=3, nb_failures=3, format_result=str,
+                 format_timestamp=time.ctime, subsec_precision=2,
+                 clock=None, use_timer=True):
+        self._callback = callback
+        self._period = digest_period
+        self._size = digest_size
+        self._nb_slowest = nb_slowest
+        self._nb_failures = nb_failures
+        self._format_result = format_result
+        self._format_timestamp = format_timestamp
+        self._subsec_precision = subsec_precision
+        self._clock = get_clock() if clock is None else clock
+        self._use_timer = use_timer and digest_period is not None
+        self._timer = None
+        self._lock = Lock()
+        self._sequence = count()
+        self._reset()
+        _all_digests.add(self)
+
+    def _reset(self):
+        self._entries = dict()
+        self._nb_calls = 0
+        self._window_end = None
+        if self._period is not None:
+            self._window_end = self._clock() + self._period
+
+    def add(self, task, exception=None):
+        """
+        Add a finished call to the digest (sending the digest if the window
+        is over)
+
+        Parameters
+        ----------
+        task : :class:`FunctionalTask`
+            The task of the call
+        exception : Exception (Default : None)
+            The exception if one occured (None otherwise)
+        """
+        duration = task.duration
+        timestamp = task.timestamp
+        with self._lock:
+            entry = self._entries.get(task.name)
+            if entry is None:
+                entry = _DigestEntry()
+                entry.first = timestamp
+                self._entries[task.name] = entry
+            entry.nb_calls += 1
+            entry.total += duration
+            entry.minimum = min(entry.minimum, duration)
+            entry.maximum = max(entry.maximum, duration)
+            entry.last = timestamp
+            slowest = entry.slowest
+            call = None
+            if len(slowest) < self._nb_slowest or \
+                    (self._nb_slowest > 0 and duration > slowest[0][0]):
+                call = _RetainedCall(task)
+                item = (duration, next(self._sequence), call, exception)
+                if len(slowest) < self._nb_slowest:
+                    heappush(slowest, item)
+                else:
+                    heappushpop(slowest, item)
+            if exception is not None:
+                entry.nb_failures += 1
+                summary = _exception_summary(exception)
+                entry.exceptions[summary] = \
+                    entry.exceptions.get(summary, 0) + 1
+                if len(entry.failures) < self._nb_failures:
+                    if call is None:
+                        call = _RetainedCall(task)
+                    entry.failures.append((call, exception))
+            self._nb_calls += 1
+            is_over = ((self._size is not None and
+                        self._nb_calls >= self._size) or
+                       self._is_expired())
+            if not is_over and self._nb_calls == 1 and self._use_timer:
+                self._schedule()
+        if is_over:
+            self.flush()
+
+    def _is_expired(self):
+        # Under the lock
+        return self._window_end is not None and \
+            self._clock() >= self._window_end
+
+    def _schedule(self):
+        # Under the lock. The timer does not keep the digest alive
+        if self._timer is None:
+            delay = max(0., self._window_end - self._clock())
+            self._timer = Timer(delay, _on_timer, (weakref.ref(self),))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush_expired(self):
+        """
+        Send the digest of the pending calls if the period of the window is
+        over (and open a new window)
+
+        Return
+        ------
+        sent : bool
+            Whether the digest was sent
+        """
+        with self._lock:
+            if self._nb_calls == 0 or not self._is_expired():
+                return False
+            entries = self._entries
+            self._reset()
+        self._callback(self.render(entries), False)
+        return True
+
+    def render(self, entries):
+        """
+        Render a digest
+
+        Parameters
+        ----------
+        entries : dict
+            A mapping task name - aggregated calls
+
+        Return
+        ------
+        string : str
+            The multiline digest
+        """
+        sections = []
+        report = lambda task, exception: render_report(
+            task, exception, self._format_result, self._format_timestamp,
+            self._subsec_precision)
+        # The retained calls are rendered as the tasks they come from
+        for name in sorted(entries, key=str):
+            entry = entries[name]
+            lines = ["Digest of %s: %d calls (%d failed) from %s to %s" %
+                     (name, entry.nb_calls, entry.nb_failures,
+                      self._format_timestamp(entry.first),
+                      self._format_timestamp(entry.last)),
+                     "Duration: total %s mean %s min %s max %s" %
+                     (format_duration(entry.total, self._subsec_precision),
+                      format_latency(entry.total / entry.nb_calls),
+                      format_latency(entry.minimum),
+                      format_latency(entry.maximum))]
+            if entry.nb_failures > 0:
+                lines.extend(["", "Exceptions", "----------"])
+                for summary, nb in sorted(entry.exceptions.items(),
+                                          key=lambda item: -item[1]):
+                    lines.append("%d x %s" % (nb, summary))
+            lines.extend(["", "Slowest calls", "-------------"])
+            for _, _, call, exception in sorted(entry.slowest, reverse=True):
+                lines.append(report(call, exception))
+            if entry.nb_failures > 0:
+                lines.extend(["", "Failed calls", "------------"])
+                for call, exception in entry.failures:
+                    lines.append(report(call, exception))
+            sections.append("\n".join(lines))
+        return "\n\n".join(sections)
+
+    def flush(self, last_com=False):
+        """
+        Send the digest of the pending calls (if any) and open a new window
+
+        Parameters
+        ----------
+        last_com : bool (Default : False)
+            Whether is it the last message or not
+        """
+        with self._lock:
+            entries = self._entries
+            self._reset()
+        if len(entries) > 0:
+            self._callback(self.render(entries), last_com)
+
+
+def _on_timer(digest_ref):
+    digest = digest_ref()
+    if digest is None:
+        return
+    with digest._lock:
+        digest._timer = None
+    if not digest.flush_expired():
+        # The clock may lag behind the timer: wait for the end of the window
+        with digest._lock:
+            if digest._nb_calls > 0:
+                digest._schedule()
+
+
+@atexit.register
+def _flush_at_exit():
+    for digest in list(_all_digests):
+        digest.flush(True)
+
+
+def digest_hook_factory(callback, digest_period=60., digest_size=1000,
+                        nb_slowest=3, nb_failures=3, format_result=str,
+                        format_timestamp=time.ctime, subsec_precision=2,
+                        clock=None, use_timer=True):
+    """
+    Return a :func:`digest_hook` which adds the finished calls to a
+    :class:`ReportDigest` (see the latter for the parameters)
+
+    Return
+    ------
+    :func:`digest_hook`
+    """
+    digest = ReportDigest(callback, digest_period, digest_size, nb_slowest,
+                          nb_failures, format_result, format_timestamp,
+                          subsec_precision, clock, use_timer)
+
+    def digest_hook(task, exception=None):
+        """
+        :func:`hook` which adds the call to the digest once it is over
+
+        Parameters
+        ----------
+        task : :class:`FunctionalTask`
+            The monitored task
+        exception : Exception (Default : None)
+            The exception if one occured (None otherwise)
+        """
+        if task.is_completed or exception is not None:
+            digest.add(task, exception)
+
+    digest_hook.digest = digest
+    return digest_hook
@@ -26,9 +26,8 @@ __copyright__ = "3-clause BSD License"
 __version__ = '1.0'
 __date__ = "08 January 2015"
 
-import time
-
 from .util import fallback
+from .clock import get_clock
 
 # =========================== NOTIFICATION RULES =========================== #
 
@@ -49,7 +48,7 @@ def always_notif_rule_factory():
         return True
     return true
 
-def periodic_rule_factory(period):
+def periodic_rule_factory(period, clock=None):
     """
     Return a notification rule which indicates whether to notify or not base
     on the time elapsed since the last notification.
@@ -58,12 +57,17 @@ def periodic_rule_factory(period):
     ----------
     period : float
         The minimum period between two notification (in seconds)
+    clock : callable () --> float or None (Default : None)
+        The clock measuring the period (see :mod:`clock`). If None, the
+        library-wide clock is used
 
     Return
     ------
     periodic_notif_rule
     """
-    last_update = [time.time()]
+    if clock is None:
+        clock = get_clock()
+    last_update = [clock()]
     def periodic_notif_rule(_):
         """
         Notification rule based on the elapsed time since the last notification
@@ -73,7 +77,7 @@ def periodic_rule_factory(period):
         should_notify : boolean
             Whether to notify
         """
-        now = time.time()
+        now = clock()
         if (now - last_update[0]) >= period:
             last_update[0] = now
             return True
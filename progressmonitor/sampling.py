@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Module :mod:`sampling` provides the sampling policy for monitors.
+
+Monitoring every call of a request handler, for instance, may be too
+expensive in production. A :class:`Sampler` decides, once at task creation,
+whether the task is monitored. Unsampled tasks are handed the raw iterable
+or function back, without any wrapping.
+
+The sampler counts the tasks it has seen and sampled so that aggregated
+figures can be scaled back (see the `$sampling` formatter).
+"""
+
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+from random import random
+from threading import Lock
+
+from .clock import get_clock
+
+
+class Sampler(object):
+    """
+    =======
+    Sampler
+    =======
+    A :class:`Sampler` decides whether a task should be monitored. Calling
+    the sampler returns True if the task is sampled, False otherwise.
+
+    The rate window is shared by the threads (it is protected by a lock);
+    the counters are not thread-safe: they are meant for reporting.
+
+    Constructor parameters
+    ----------------------
+    sample_rate : float 0 <= sample_rate <= 1 (Default : 1.)
+        The probability for a task to be monitored
+    max_per_second : int or None (Default : None)
+        The maximum number of tasks monitored per second (None for no limit)
+    clock : callable () --> float or None (Default : None)
+        The clock measuring the rate windows (see :mod:`clock`). If None, the
+        library-wide clock is used
+    """
+
+    def __init__(self, sample_rate=1., max_per_second=None, clock=None):
+        self._sample_rate = sample_rate
+        self._max_per_second = max_per_second
+        self._clock = get_clock() if clock is None else clock
+        self._nb_seen = 0
+        self._nb_sampled = 0
+        self._window_start = float("-inf")
+        self._window_count = 0
+        self._lock = Lock()
+
+    @property
+    def nb_seen(self):
+        """
+        Return
+        ------
+        nb_seen : int
+            The number of tasks submitted to the sampler
+        """
+        return self._nb_seen
+
+    @property
+    def nb_sampled(self):
+        """
+        Return
+        ------
+        nb_sampled : int
+            The number of monitored tasks
+        """
+        return self._nb_sampled
+
+    @property
+    def scale(self):
+        """
+        Return
+        ------
+        scale : float
+            The factor by which to multiply the figures of the monitored
+            tasks to estimate those of all the tasks
+        """
+        if self._nb_sampled == 0:
+            return 0.
+        return float(self._nb_seen) / self._nb_sampled
+
+    def __call__(self):
+        """
+        Return
+        ------
+        is_sampled : bool
+            Whether the task should be monitored
+        """
+        self._nb_seen += 1
+        if self._sample_rate < 1 and random() >= self._sample_rate:
+            return False
+        if self._max_per_second is not None:
+            with self._lock:
+                now = self._clock()
+                if now - self._window_start >= 1:
+                    self._window_start = now
+                    self._window_count = 0
+                if self._window_count >= self._max_per_second:
+                    return False
+                self._window_count += 1
+        self._nb_sampled += 1
+        return True
+
+
+def sampler_factory(sample_rate=1., max_per_second=None, clock=None):
+    """
+    Sampler factory
+
+    Parameters
+    ----------
+    sample_rate : float 0 <= sample_rate <= 1 (Default : 1.)
+        The probability for a task to be monitored
+    max_per_second : int or None (Default : None)
+        The maximum number of tasks monitored per second (None for no limit)
+    clock : callable () --> float or None (Default : None)
+        The clock measuring the rate windows (see :mod:`clock`). If None, the
+        library-wide clock is used
+
+    Return
+    ------
+    sampler : :class:`Sampler` or None
+        The sampler or None if every task is to be monitored
+    """
+    if sample_rate >= 1 and max_per_second is None:
+        return None
+    return Sampler(sample_rate, max_per_second, clock)
+
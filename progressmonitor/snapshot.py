@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+Module :mod:`snapshot` tells what a running process is working on.
+
+The live tasks (see :func:`monitor.live_tasks`) are found on the stacks of
+the tasks being run by each thread, and among the generators, which register
+themselves (weakly) when they start and end: nothing is registered per
+iteration nor per monitored call. A snapshot of the live tasks (name,
+progress, total, rate, elapsed time and thread) can be taken at any time with
+:func:`snapshot_tasks` and dumped:
+    - on demand, with :func:`dump_tasks`
+    - on a signal (SIGUSR1 by default), with :func:`install_dump_signal`
+    - to the clients of a local UNIX socket, with a :class:`DumpServer`
+
+The module doubles as a client of the latter:
+    python -m progressmonitor.snapshot <socket path>
+"""
+
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+import os
+import sys
+import time
+import socket
+import signal
+import threading
+from collections import namedtuple
+from threading import Thread
+from SocketServer import ThreadingMixIn, StreamRequestHandler
+try:
+    # Missing where there are no UNIX sockets (e.g. Windows)
+    from SocketServer import UnixStreamServer
+except ImportError:
+    UnixStreamServer = None
+
+from .monitor import Task, live_tasks
+from .util import format_duration
+
+
+TaskSummary = namedtuple("TaskSummary", ["id", "name", "progress", "total",
+                                         "rate", "elapsed", "thread_id",
+                                         "thread_name", "parent_id",
+                                         "status"])
+
+
+def snapshot_tasks():
+    """
+    Return
+    ------
+    summaries : list of :class:`TaskSummary`
+        The summaries of the tasks being run, by creation order. The rate is
+        the mean number of steps per second
+
+    Note
+    ----
+    No lock is taken so that this function can be called from a signal
+    handler
+    """
+    # The registry of the threading module is read directly:
+    # threading.enumerate takes a lock
+    threads = dict(getattr(threading, "_active", {}))
+    summaries = []
+    for task, thread_id in live_tasks():
+        elapsed = task.duration
+        progress = task.progress
+        rate = progress / elapsed if elapsed > 0 else 0.
+        thread = threads.get(thread_id)
+        summaries.append(TaskSummary(
+            task.id, str(task.name), progress, task.nb_steps, rate, elapsed,
+            thread_id, "???" if thread is None else thread.name,
+            task.parent_id, Task.STATUS_NAMES.get(task.status, "unknown")))
+    return summaries
+
+
+def format_snapshot(summaries):
+    """
+    Format a snapshot as a table
+
+    Parameters
+    ----------
+    summaries : list of :class:`TaskSummary`
+        The snapshot (see :func:`snapshot_tasks`)
+
+    Return
+    ------
+    string : str
+        The table, one line per task (plus a header)
+
+    Example
+    -------
+    progressmonitor snapshot of process 4242 (Mon Oct 19 10:34:02 2026)
+      task name                  progress    total        rate    elapsed ...
+        12 load                       341     1000     68.20/s      5.00s ...
+    """
+    lines = ["progressmonitor snapshot of process %d (%s)" %
+             (os.getpid(), time.ctime()),
+             "%6s %-24s %10s %10s %12s %10s %8s %s" %
+             ("task", "name", "progress", "total", "rate", "elapsed",
+              "parent", "thread")]
+    for summary in summaries:
+        lines.append("%6d %-24s %10d %10s %10.2f/s %10s %8s %s" %
+                     (summary.id, summary.name, summary.progress,
+                      "???" if summary.total is None else summary.total,
+                      summary.rate, format_duration(summary.elapsed),
+                      "-" if summary.parent_id is None else summary.parent_id,
+                      summary.thread_name))
+    if len(summaries) == 0:
+        lines.append("(no task is running)")
+    lines.append("")
+    return "\n".join(lines)
+
+
+def dump_tasks(path=None, stream=None):
+    """
+    Write a snapshot of the live tasks
+
+    Parameters
+    ----------
+    path : str or None (Default : None)
+        The file to which the snapshot is appended. If None, the snapshot is
+        written to the stream
+    stream : file or None (Default : None)
+        The stream to write to if no path is given. If None, stderr is used
+
+    Return
+    ------
+    string : str
+        The dumped snapshot
+    """
+    string = format_snapshot(snapshot_tasks())
+    if path is not None:
+        with open(path, "a") as hdl:
+            hdl.write(string)
+    else:
+        if stream is None:
+            stream = sys.stderr
+        stream.write(string)
+        stream.flush()
+    return string
+
+
+def install_dump_signal(signum=None, path=None):
+    """
+    Dump the live tasks (see :func:`dump_tasks`) whenever the process
+    receives the given signal (e.g. kill -USR1 <pid>)
+
+    Parameters
+    ----------
+    signum : int or None (Default : None)
+        The signal. If None, SIGUSR1 is used
+    path : str or None (Default : None)
+        The file to which the snapshots are appended. If None, they are
+        written to stderr
+
+    Return
+    ------
+    previous_handler :
+        The handler previously installed for that signal
+
+    Exception
+    ---------
+    ValueError
+        If not called from the main thread
+    """
+    if signum is None:
+        signum = signal.SIGUSR1
+
+    def dump_handler(signum, frame):
+        try:
+            dump_tasks(path)
+        except (IOError, OSError):
+            # Inspection must not break the process
+            pass
+
+    return signal.signal(signum, dump_handler)
+
+
+if UnixStreamServer is not None:
+    class _ThreadingUnixServer(ThreadingMixIn, UnixStreamServer):
+        daemon_threads = True
+
+
+class _DumpHandler(StreamRequestHandler):
+    def handle(self):
+        self.wfile.write(format_snapshot(snapshot_tasks()))
+
+
+class DumpServer(object):
+    """
+    ==========
+    DumpServer
+    ==========
+    A :class:`DumpServer` sends a snapshot of the live tasks to each client
+    connecting to a local UNIX socket (see :func:`main` for a client).
+
+    Constructor parameters
+    ----------------------
+    path : str
+        The path of the socket (replaced if it exists)
+
+    Note
+    ----
+    Only available where the platform has UNIX sockets (:meth:`start`
+    raises a RuntimeError otherwise: use :func:`dump_tasks` instead)
+    """
+
+    def __init__(self, path):
+        self._path = path
+        self._server = None
+        self._thread = None
+
+    @property
+    def path(self):
+        """
+        Return
+        ------
+        path : str
+            The path of the socket
+        """
+        return self._path
+
+    def start(self):
+        """
+        Start listening (in a background thread)
+        """
+        if self._server is not None:
+            return
+        if UnixStreamServer is None:
+            raise RuntimeError("Cannot serve the snapshots on '%s': this "
+                               "platform has no UNIX sockets (use "
+                               "dump_tasks() instead)" % self._path)
+        if os.path.exists(self._path):
+            os.unlink(self._path)
+        self._server = _ThreadingUnixServer(self._path, _DumpHandler)
+        self._thread = Thread(target=self._server.serve_forever,
+                              name="progressmonitor.snapshot")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop listening and remove the socket
+        """
+        server, thread = self._server, self._thread
+        self._server = self._thread = None
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+            if os.path.exists(self._path):
+                os.unlink(self._path)
+
+
+def fetch_snapshot(path, timeout=5.):
+    """
+    Fetch the snapshot served by a :class:`DumpServer`
+
+    Parameters
+    ----------
+    path : str
+        The path of the socket
+    timeout : float (Default : 5.)
+        The maximum time (in seconds) to wait for the server
+
+    Return
+    ------
+    string : str
+        The snapshot
+    """
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(timeout)
+    try:
+        client.connect(path)
+        chunks = []
+        while True:
+            chunk = client.recv(4096)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        client.close()
+    return "".join(chunks)
+
+
+def main(argv=None):
+    """
+    Print the snapshot served on a UNIX socket
+    """
+    from argparse import ArgumentParser
+    parser = ArgumentParser(prog="python -m progressmonitor.snapshot",
+                            description="Print the tasks a process is "
+                                        "working on")
+    parser.add_argument("path", help="the socket of the process")
+    args = parser.parse_args(argv)
+    sys.stdout.write(fetch_snapshot(args.path))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
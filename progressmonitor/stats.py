@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+Module :mod:`stats` provides an aggregated monitoring mode for functions.
+
+Instead of issuing a hook call (and usually a formatted message) on every
+invocation, a :class:`CallStatistics` keeps per-function counters (number of
+calls and errors, total/min/max time and a latency histogram). The counters
+live in compact per-thread structures so that the calls do not contend on a
+lock. They are merged and sent through a :func:`callback` periodically and
+at interpreter exit.
+
+This makes a lightweight named profiler suitable for hot functions.
+"""
+
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+import atexit
+import weakref
+from functools import wraps
+from threading import local, Lock
+
+from .util import format_duration
+from .clock import get_clock
+
+
+# Indices in the per-thread counters
+_CALLS = 0
+_ERRORS = 1
+_TOTAL = 2
+_MIN = 3
+_MAX = 4
+_HISTOGRAM = 5
+
+# Enough buckets for any duration expressed as a 64 bits number of
+# microseconds
+NB_BUCKETS = 65
+
+_all_statistics = weakref.WeakSet()
+
+
+def format_latency(duration):
+    """
+    Format a (short) duration expressed in seconds as string
+
+    Parameters
+    ----------
+    duration : float
+        a duration in seconds
+
+    Return
+    ------
+    formated : str
+        the given duration formated
+
+    Example
+    -------
+    >>> format_latency(0.0000123)
+    '12.3us'
+    >>> format_latency(0.0123)
+    '12.30ms'
+    >>> format_latency(12.3)
+    '12.30s'
+    """
+    if duration < 1e-3:
+        return "%.1fus" % (duration * 1e6)
+    if duration < 1:
+        return "%.2fms" % (duration * 1e3)
+    return format_duration(duration)
+
+
+class CallStatistics(object):
+    """
+    ==============
+    CallStatistics
+    ==============
+    A :class:`CallStatistics` aggregates the calls of a function.
+
+    The latency histogram has :data:`NB_BUCKETS` buckets. Bucket i counts
+    the calls which lasted less than 2**i microseconds (and at least
+    2**(i-1) microseconds).
+
+    The counters are cumulative: each flush reports the statistics since the
+    creation of the object.
+
+    Constructor parameters
+    ----------------------
+    name : str
+        The name of the monitored function
+    callback : :func:`callback` or None (Default : None)
+        The callback through which the statistics are flushed. If None,
+        the statistics are only available through :meth:`snapshot`
+    flush_period : float or None (Default : 60.)
+        The minimum period (in seconds) between two flushes. The period is
+        checked at the end of the calls. If None, the statistics are only
+        flushed at interpreter exit
+    clock : callable () --> float or None (Default : None)
+        The clock measuring the latencies (see :mod:`clock`). If None, the
+        library-wide clock is used
+    """
+
+    def __init__(self, name, callback=None, flush_period=60., clock=None):
+        self._name = name
+        self._callback = callback
+        self._flush_period = flush_period
+        self._clock = get_clock() if clock is None else clock
+        self._local = local()
+        self._lock = Lock()
+        self._counters = []
+        self._next_flush = None
+        if flush_period is not None:
+            self._next_flush = self._clock() + flush_period
+        _all_statistics.add(self)
+
+    @property
+    def name(self):
+        """
+        Return
+        ------
+        name : str
+            The name of the monitored function
+        """
+        return self._name
+
+    def _thread_counters(self):
+        counters = [0, 0, 0., float("inf"), 0., [0] * NB_BUCKETS]
+        with self._lock:
+            self._counters.append(counters)
+        self._local.counters = counters
+        return counters
+
+    def wrap(self, function):
+        """
+        Return an aggregated version of the given function
+
+        Parameters
+        ----------
+        function : callable
+            The function to monitor
+
+        Return
+        ------
+        aggregated : callable
+            The monitored function
+        """
+        thread_local = self._local
+        thread_counters = self._thread_counters
+        clock = self._clock
+
+        # Indices are inlined (see _CALLS, _ERRORS, ...) to spare global
+        # lookups on each call
+        @wraps(function)
+        def aggregated(*args, **kwargs):
+            try:
+                counters = thread_local.counters
+            except AttributeError:
+                counters = thread_counters()
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            except Exception:
+                counters[1] += 1
+                raise
+            finally:
+                end = clock()
+                duration = end - start
+                counters[0] += 1
+                counters[2] += duration
+                if duration < counters[3]:
+                    counters[3] = duration
+                if duration > counters[4]:
+                    counters[4] = duration
+                counters[5][int(duration * 1e6).bit_length()] += 1
+                next_flush = self._next_flush
+                if next_flush is not None and end >= next_flush:
+                    self.flush()
+
+        return aggregated
+
+    def snapshot(self):
+        """
+        Merge the per-thread counters
+
+        Return
+        ------
+        statistics : dict
+            A dictionary with the keys 'name', 'calls', 'errors', 'total',
+            'min', 'max', 'mean' and 'histogram'
+        """
+        calls = errors = 0
+        total = maximum = 0.
+        minimum = float("inf")
+        histogram = [0] * NB_BUCKETS
+        with self._lock:
+            all_counters = list(self._counters)
+        for counters in all_counters:
+            calls += counters[_CALLS]
+            errors += counters[_ERRORS]
+            total += counters[_TOTAL]
+            minimum = min(minimum, counters[_MIN])
+            maximum = max(maximum, counters[_MAX])
+            for i, count in enumerate(counters[_HISTOGRAM]):
+                histogram[i] += count
+        if calls == 0:
+            minimum = 0.
+        return {"name": self._name, "calls": calls, "errors": errors,
+                "total": total, "min": minimum, "max": maximum,
+                "mean": total / calls if calls > 0 else 0.,
+                "histogram": histogram}
+
+    def format(self):
+        """
+        Return
+        ------
+        string : str
+            The formatted statistics
+
+        Example
+        -------
+        mult: 1200 calls (3 errors) total: 1.23s mean: 1.03ms min: 0.91ms
+        max: 3.10ms latency: <1.0ms: 1150 <2.0ms: 49 <4.0ms: 1
+        """
+        stats = self.snapshot()
+        msg = "%s: %d calls (%d errors) total: %s" % \
+              (stats["name"], stats["calls"], stats["errors"],
+               format_duration(stats["total"]))
+        if stats["calls"] > 0:
+            msg += " mean: " + format_latency(stats["mean"])
+            msg += " min: " + format_latency(stats["min"])
+            msg += " max: " + format_latency(stats["max"])
+            buckets = ["<" + format_latency((2 ** i) * 1e-6) + ": " + str(c)
+                       for i, c in enumerate(stats["histogram"]) if c > 0]
+            msg += " latency: " + " ".join(buckets)
+        return msg
+
+    def flush(self, last_com=False):
+        """
+        Send the statistics through the callback
+
+        Parameters
+        ----------
+        last_com : bool (Default : False)
+            Whether is it the last message or not
+        """
+        if self._flush_period is not None:
+            self._next_flush = self._clock() + self._flush_period
+        if self._callback is not None:
+            self._callback(self.format(), last_com)
+
+
+def all_statistics():
+    """
+    Return
+    ------
+    statistics : list of :class:`CallStatistics`
+        The living :class:`CallStatistics`
+    """
+    return list(_all_statistics)
+
+
+@atexit.register
+def _flush_at_exit():
+    for statistics in all_statistics():
+        statistics.flush(True)
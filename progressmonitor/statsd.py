@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+Module :mod:`statsd` sends the progress of the tasks as StatsD metrics.
+
+A :class:`StatsdClient` batches the metrics in memory and packs as many of
+them as possible in each UDP datagram (up to the MTU). The batch is sent
+when it is full and periodically by a background thread. The address of the
+server is resolved once (when the client is built, then by the background
+thread until it succeeds), the socket is non-blocking and every network
+error is swallowed: the metrics are a best effort and never slow down nor
+break the monitored code.
+
+The :func:`statsd_hook_factory` hook sends, for the tasks of a monitor
+named 'name' (the `task_name` of the monitor, its name in the configuration
+or the name of the monitored function)
+    - <prefix>.name.progress : a gauge with the progress of the task
+    - <prefix>.name.completed : a counter of the completed tasks
+    - <prefix>.name.failed : a counter of the tasks which raised an
+    exception
+    - <prefix>.name.duration : a timer with the duration of the tasks (in
+    milliseconds)
+"""
+
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+import re
+import socket
+import atexit
+from threading import Thread, Lock, Event
+
+from .monitor import Task
+
+
+_INVALID_CHARS = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+class StatsdClient(object):
+    """
+    ============
+    StatsdClient
+    ============
+    A :class:`StatsdClient` batches StatsD metrics into UDP datagrams.
+
+    Constructor parameters
+    ----------------------
+    host : str (Default : "127.0.0.1")
+        The host of the StatsD server
+    port : int (Default : 8125)
+        The port of the StatsD server
+    mtu : int (Default : 1432)
+        The maximum size of a datagram (in bytes)
+    flush_interval : float or None (Default : 1.)
+        The period (in seconds) at which the batch is sent. If None, no
+        background thread is started and the batch is only sent when full,
+        on :meth:`flush` and at interpreter exit
+
+    The metrics sent while the address of the server is not resolved (or if
+    no socket can be created) are dropped.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8125, mtu=1432,
+                 flush_interval=1.):
+        self._host = host
+        self._port = port
+        self._address = None
+        self._mtu = mtu
+        try:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._socket.setblocking(0)
+        except (socket.error, IOError):
+            self._socket = None
+        self._resolve()
+        self._lock = Lock()
+        self._batch = []
+        self._size = 0
+        self._nb_dropped = 0
+        self._stop_event = Event()
+        self._thread = None
+        if flush_interval is not None:
+            self._thread = Thread(target=self._run, args=(flush_interval,),
+                                  name="progressmonitor.statsd")
+            self._thread.daemon = True
+            self._thread.start()
+        atexit.register(self.close)
+
+    @property
+    def nb_dropped(self):
+        """
+        Return
+        ------
+        nb_dropped : int
+            The number of datagrams which could not be sent
+        """
+        return self._nb_dropped
+
+    def _resolve(self):
+        # Name resolution blocks: never done on the path of the metrics
+        if self._socket is None:
+            return
+        try:
+            self._address = socket.getaddrinfo(self._host, self._port,
+                                               socket.AF_INET,
+                                               socket.SOCK_DGRAM)[0][4]
+        except (socket.error, IOError, IndexError):
+            self._address = None
+
+    def _send(self, datagram):
+        address = self._address
+        if address is None:
+            self._nb_dropped += 1
+            return
+        try:
+            self._socket.sendto(datagram, address)
+        except (socket.error, IOError):
+            self._nb_dropped += 1
+
+    def send(self, metric):
+        """
+        Add a metric to the batch (sending the batch if it is full)
+
+        Parameters
+        ----------
+        metric : str
+            The StatsD metric (e.g. "jobs.download.progress:12|g")
+        """
+        datagram = None
+        with self._lock:
+            size = len(metric) + (1 if self._size > 0 else 0)
+            if self._size + size > self._mtu and self._size > 0:
+                datagram = "\n".join(self._batch)
+                self._batch = []
+                self._size = 0
+                size = len(metric)
+            self._batch.append(metric)
+            self._size += size
+        if datagram is not None:
+            self._send(datagram)
+
+    def flush(self):
+        """
+        Send the batch
+        """
+        with self._lock:
+            if self._size == 0:
+                return
+            datagram = "\n".join(self._batch)
+            self._batch = []
+            self._size = 0
+        self._send(datagram)
+
+    def _run(self, period):
+        while not self._stop_event.wait(period):
+            if self._address is None:
+                self._resolve()
+            self.flush()
+
+    def close(self):
+        """
+        Stop the background thread and send the batch
+        """
+        self._stop_event.set()
+        thread = self._thread
+        if thread is not None:
+            self._thread = None
+            thread.join()
+        self.flush()
+
+
+_clients = dict()
+_clients_lock = Lock()
+
+def get_statsd_client(host="127.0.0.1", port=8125):
+    """
+    Return
+    ------
+    client : :class:`StatsdClient`
+        The client of the given server, shared by all the monitors (created
+        on first use)
+    """
+    with _clients_lock:
+        client = _clients.get((host, port), None)
+        if client is None:
+            client = StatsdClient(host, port)
+            _clients[(host, port)] = client
+    return client
+
+
+def statsd_hook_factory(statsd_host="127.0.0.1", statsd_port=8125,
+                        statsd_prefix="progressmonitor", statsd_client=None,
+                        metric_name=None):
+    """
+    Hook factory which sends the progress of the task as StatsD metrics
+
+    Parameters
+    ----------
+    statsd_host : str (Default : "127.0.0.1")
+        The host of the StatsD server
+    statsd_port : int (Default : 8125)
+        The port of the StatsD server
+    statsd_prefix : str (Default : "progressmonitor")
+        The prefix of the metric names
+    statsd_client : :class:`StatsdClient` or None (Default : None)
+        The client to use. If None, the shared client of the given server is
+        used
+    metric_name : str or None (Default : None)
+        The name of the metrics, after the prefix (filled in by the monitor
+        factories with the task, function or monitor name). If None, the
+        metrics are named after the prefix only. The task names are not
+        used: unnamed tasks would each create new metrics
+
+    Return
+    ------
+    :func:`statsd_hook`
+    """
+    if statsd_client is None:
+        statsd_client = get_statsd_client(statsd_host, statsd_port)
+    send = statsd_client.send
+    prefix = statsd_prefix
+    if metric_name is not None:
+        prefix += "." + _INVALID_CHARS.sub("_", str(metric_name))
+
+    def statsd_hook(task, exception=None):
+        """
+        :func:`hook` which sends the metrics of the task
+
+        Parameters
+        ----------
+        task : :class:`Task`
+            The monitored task
+        exception : Exception (Default : None)
+            The exception if one occured (None otherwise)
+        """
+        try:
+            send("%s.progress:%d|g" % (prefix, task.progress))
+            if exception is not None:
+                send("%s.failed:1|c" % prefix)
+            elif task.status == Task.DONE:
+                send("%s.completed:1|c" % prefix)
+            else:
+                return
+            send("%s.duration:%d|ms" % (prefix, task.duration * 1000))
+        except Exception:
+            # Metrics must not break the monitored code
+            pass
+
+    return statsd_hook
@@ -8,10 +8,34 @@ __copyright__ = "3-clause BSD License"
 __version__ = '1.0'
 __date__ = "15 January 2015"
 
-from nose.tools import assert_equal
+import os
+import logging
+from nose.tools import assert_equal, assert_in
 
 from progressmonitor.callback import (store_till_end_callback_factory,
-                                      multi_callback_factory)
+                                      multi_callback_factory,
+                                      terminal_callback_factory,
+                                      buffered_stream_callback_factory,
+                                      async_callback_factory, AsyncCallback,
+                                      coalescing_callback_factory,
+                                      bounded_store_till_end_callback_factory,
+                                      logging_callback_factory, get_wants)
+import progressmonitor.callback as callback_module
+from progressmonitor.hook import callback_hook_factory
+from progressmonitor.monitor import monitor_generator
+from progressmonitor.clock import FakeClock
+
+
+class FakeTerminal(object):
+    def __init__(self, isatty=True):
+        self._isatty = isatty
+        self.frames = []
+    def isatty(self):
+        return self._isatty
+    def write(self, string):
+        self.frames.append(string)
+    def flush(self):
+        pass
 
 
 def test_ste():
@@ -24,7 +48,45 @@ def test_ste():
     for msg in msgs[:-1]:
         stecb(msg)
     stecb(msgs[-1], True)
-    
+
+
+def test_bounded_ste():
+    received = []
+    callback = bounded_store_till_end_callback_factory(received.append,
+                                                       keep_first=2,
+                                                       keep_last=3)
+    for i in xrange(10):
+        callback(str(i), i == 9)
+    assert_equal(received[0], ["0", "1", "[... 5 messages elided ...]",
+                               "7", "8", "9"])
+    # The store is emptied once the messages are sent
+    callback("a")
+    callback("b", True)
+    assert_equal(received[1], ["a", "b"])
+
+    spilled = []
+    def destination(messages):
+        spilled.append(messages)
+    callback = bounded_store_till_end_callback_factory(destination,
+                                                       keep_first=1,
+                                                       keep_last=2,
+                                                       spill=True)
+    msgs = ["line %d\nof a report" % i for i in xrange(6)] + [u"\xe9t\xe9"]
+    for msg in msgs[:-1]:
+        callback(msg)
+    callback(msgs[-1], True)
+    assert_equal(spilled, [msgs])
+    # The spill file is removed once read back
+    assert_equal(callback_module._spill_paths, set())
+
+    # Pending spill file (the last message never comes)
+    for msg in msgs:
+        callback(msg)
+    pending = list(callback_module._spill_paths)
+    assert_equal(len(pending), 1)
+    callback_module._remove_spill_files()
+    assert_equal(os.path.exists(pending[0]), False)
+
 def test_mcf():
 
     msgs = ["aaa", "bbb", "ccc"]
@@ -48,4 +110,220 @@ def test_mcf():
     for i in xrange(len(msgs)):
         assert_equal(msgs[i], l1[i])
         assert_equal(msgs[i], l2[i])
-        
\ No newline at end of file
+
+
+def test_terminal():
+    stream = FakeTerminal()
+    cb = terminal_callback_factory(stream, refresh_rate=None)
+    cb("[=>  ] 10.00%")
+    cb("[=>  ] 10.00%")
+    cb("[=>  ] 12.50%")
+    cb("[==> ] 50.00% elapsed")
+    cb("done", True)
+    assert_equal(stream.frames, ["[=>  ] 10.00%", "\b\b\b\b\b2.50%",
+                                 "\r[==> ] 50.00% elapsed",
+                                 "\rdone" + " " * 17 + "\b" * 17 + "\n"])
+
+def test_terminal_utf8():
+    stream = FakeTerminal()
+    cb = terminal_callback_factory(stream, refresh_rate=None)
+    # Sub-step blocks: 3 bytes, one column each
+    cb("[\xe2\x96\x88\xe2\x96\x8f ] 55%")
+    cb("[\xe2\x96\x88\xe2\x96\x8e ] 55%")
+    cb("[\xe2\x96\x88\xe2\x96\x8e ] 56%")
+    cb("ok", True)
+    assert_equal(stream.frames, ["[\xe2\x96\x88\xe2\x96\x8f ] 55%",
+                                 "\r[\xe2\x96\x88\xe2\x96\x8e ] 55%",
+                                 "\b\b6%",
+                                 "\rok" + " " * 7 + "\b" * 7 + "\n"])
+
+def test_terminal_throttle():
+    stream = FakeTerminal(isatty=False)
+    cb = terminal_callback_factory(stream, throttle=3600)
+    for msg in msgs_gen(10):
+        cb(msg)
+    cb("end", True)
+    assert_equal("".join(stream.frames).split(), ["0", "end"])
+
+def msgs_gen(length):
+    for i in xrange(length):
+        yield str(i)
+
+
+def test_buffered():
+    stream = FakeTerminal()
+    cb1 = buffered_stream_callback_factory(stream, buffer_size=10,
+                                           flush_interval=None)
+    cb2 = buffered_stream_callback_factory(stream)
+    cb1("a")
+    cb2("b")
+    assert_equal(stream.frames, [])
+    cb1("cccccc")
+    assert_equal(stream.frames, ["a\nb\ncccccc\n".replace("\n", os.linesep)])
+    cb2("d", True)
+    assert_equal(len(stream.frames), 2)
+
+
+def test_buffer_registry():
+    import gc
+    import weakref
+    from progressmonitor.callback import StreamBuffer
+    warnings = []
+    class Handler(logging.Handler):
+        def emit(self, record):
+            warnings.append(record.getMessage())
+    logger = logging.getLogger("progressmonitor.callback")
+    handler = Handler()
+    logger.addHandler(handler)
+    gc.collect()
+    nb_buffers = len(StreamBuffer._buffers)
+    try:
+        stream = FakeTerminal()
+        cb = buffered_stream_callback_factory(stream, buffer_size=10)
+        buffered_stream_callback_factory(stream, buffer_size=10)
+        assert_equal(warnings, [])
+        buffered_stream_callback_factory(stream, buffer_size=20)
+        assert_equal(len(warnings), 1)
+    finally:
+        logger.removeHandler(handler)
+    cb("a", True)
+    assert_equal(len(stream.frames), 1)
+    # The registry does not keep the streams alive
+    reference = weakref.ref(stream)
+    del stream, cb
+    gc.collect()
+    assert_equal(reference(), None)
+    assert_equal(len(StreamBuffer._buffers), nb_buffers)
+
+
+def test_async():
+    from threading import Event
+    received = []
+    gate = Event()
+    def slow_cb_factory():
+        def slow_cb(string, last_com=False):
+            gate.wait()
+            received.append((string, last_com))
+        return slow_cb
+
+    cb = async_callback_factory(slow_cb_factory, maxsize=2,
+                                overflow=AsyncCallback.DROP_INTERMEDIATE)
+    for msg in ["a", "b", "c", "d"]:
+        cb(msg)
+    assert_equal(cb.nb_dropped >= 1, True)
+    gate.set()
+    cb("e", True)
+    assert_equal(cb.drain(5), True)
+    assert_equal(received[0], ("a", False))
+    assert_equal(received[-1], ("e", True))
+    assert_equal(len(received) + cb.nb_dropped, 5)
+
+
+def test_async_finalizer():
+    import threading
+    received = []
+    gate = threading.Event()
+    def slow_cb(string, last_com=False):
+        gate.wait()
+        received.append(string)
+
+    threads = set(threading.enumerate())
+    cb = AsyncCallback(slow_cb, maxsize=1)
+    writer, = [t for t in threading.enumerate() if t not in threads]
+    cb("a")
+    cb("b")
+    # The queue is full: collecting the callback must not block
+    del cb
+    gate.set()
+    writer.join(5)
+    assert_equal(received, ["a", "b"])
+    assert_equal(writer.is_alive(), False)
+
+
+def test_coalescing():
+    import time
+    received = []
+    def cb_factory():
+        def cb(string, last_com=False):
+            received.append((string, last_com))
+        return cb
+
+    cb = coalescing_callback_factory(cb_factory, interval=3600)
+    for msg in ["a", "b", "c"]:
+        cb(msg)
+    cb("d", True)
+    assert_equal(received, [("a", False), ("d", True)])
+
+    del received[:]
+    cb = coalescing_callback_factory(cb_factory, interval=0.05,
+                                     use_timer=True)
+    for msg in ["a", "b", "c"]:
+        cb(msg)
+    time.sleep(0.2)
+    assert_equal(received, [("a", False), ("c", False)])
+
+    # Without timer, the pending message is kept until flushed
+    del received[:]
+    cb = coalescing_callback_factory(cb_factory, interval=3600)
+    cb("a")
+    cb("b")
+    cb.flush()
+    assert_equal(received, [("a", False), ("b", False)])
+
+
+def test_coalescing_tasks():
+    received = []
+    def cb_factory():
+        def cb(string, last_com=False):
+            received.append(string)
+        return cb
+
+    def formatter(task, exception=None):
+        return "%s:%d" % (task.name, task.progress)
+
+    clock = FakeClock()
+    callback = coalescing_callback_factory(cb_factory, interval=1.,
+                                           clock=clock)
+    hook = callback_hook_factory(callback, formatter)
+    # Two tasks interleaved on the same callback
+    first = monitor_generator(xrange(3), hook, "first")
+    second = monitor_generator(xrange(3), hook, "second")
+    for _ in xrange(3):
+        next(first)
+        next(second)
+        clock.advance(0.4)
+    assert_equal(received, ["first:0", "second:0"])
+    # The last message of the first task neither drops nor replaces the
+    # pending message of the second one (which is due by then)
+    assert_equal(list(first), [])
+    assert_equal(received[2:], ["first:2", "second:2"])
+    assert_equal(list(second), [])
+    assert_equal(received[4:], ["second:2"])
+
+
+def test_wants():
+    formatted = []
+    def formatter(task, exception=None):
+        formatted.append(task.progress)
+        return str(task.progress)
+
+    logger = logging.getLogger("progressmonitor.test.wants")
+    logger.setLevel(logging.WARNING)
+    callback = logging_callback_factory("progressmonitor.test.wants",
+                                        logging.INFO)
+    hook = callback_hook_factory(callback, formatter)
+    assert_equal(list(monitor_generator(xrange(3), hook)), range(3))
+    # The logger is disabled: nothing is formatted
+    assert_equal(formatted, [])
+
+    clock = FakeClock()
+    stream = FakeTerminal()
+    callback = coalescing_callback_factory(
+        terminal_callback_factory, stream=stream, refresh_rate=None,
+        interval=1., clock=clock)
+    hook = callback_hook_factory(callback, formatter)
+    for i in monitor_generator(xrange(5), hook):
+        clock.advance(0.5)
+    # The latest message of each task is kept: every message is formatted
+    assert_equal(formatted, [0, 0, 1, 2, 3, 4, 4])
+    assert_equal(get_wants(store_till_end_callback_factory()), None)
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+test queen
+"""
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+import time
+
+from nose.tools import assert_equal
+
+import gc
+import weakref
+from threading import Thread
+
+from progressmonitor.clock import (FakeClock, CoarseClock, wall_time,
+                                   get_clock, set_clock, default_clock,
+                                   get_task_clock, set_task_clock,
+                                   default_task_clock, monotonic)
+from progressmonitor.monitor import (ProgressableTask, PhasedTask,
+                                     monitor_generator)
+from progressmonitor.rule import periodic_rule_factory
+from progressmonitor.formatter import remaining_time_formatter_factory
+from progressmonitor.util import format_duration
+
+
+def test_periodic_rule():
+    clock = FakeClock()
+    rule = periodic_rule_factory(2., clock=clock)
+    decisions = []
+    for _ in xrange(6):
+        clock.advance(1.)
+        decisions.append(rule(None))
+    assert_equal(decisions, [False, True, False, True, False, True])
+
+
+def test_task_duration():
+    clock = FakeClock(10.)
+    task = ProgressableTask(4, clock=clock)
+    clock.advance(3.)
+    task.start()
+    clock.advance(2.)
+    assert_equal(task.duration, 2.)
+    task.close(True)
+    clock.advance(5.)
+    assert_equal(task.duration, 2.)
+
+    phased = PhasedTask(["load", "compute"], clock=clock)
+    phased.start()
+    clock.advance(1.)
+    phased.lap("load")
+    clock.advance(1.)
+    assert_equal(phased.duration, 2.)
+
+
+def test_monitor_generator_clock():
+    clock = FakeClock()
+    durations = []
+    def hook(task, exception=None):
+        durations.append(task.duration)
+    for _ in monitor_generator(xrange(3), hook, clock=clock):
+        clock.advance(1.)
+    assert_equal(durations, [0., 0., 1., 2., 3.])
+
+
+def test_remaining_time():
+    clock = FakeClock()
+    formatter = remaining_time_formatter_factory(10, decay_rate=1.,
+                                                 total_time=False,
+                                                 clock=clock)
+    task = ProgressableTask(10, clock=clock)
+    task.start()
+    assert_equal(formatter(task), "")
+    clock.advance(1.)
+    task.update(2)
+    assert_equal(formatter(task), "elapsed time: %s remaining time "
+                                  "(estimation): %s" % (format_duration(1.),
+                                                        format_duration(4.)))
+
+
+def test_library_clock():
+    clock = FakeClock(100.)
+    set_clock(clock)
+    try:
+        assert_equal(get_clock(), clock)
+        assert_equal(get_task_clock(), clock)
+        task = ProgressableTask(1)
+        clock.advance(1.)
+        assert_equal(task.duration, 1.)
+    finally:
+        set_clock()
+    assert_equal(get_clock(), default_clock)
+    assert_equal(get_task_clock(), default_task_clock)
+    # The clock of the tasks alone
+    set_task_clock(monotonic)
+    try:
+        assert_equal(get_task_clock(), monotonic)
+        assert_equal(get_clock(), default_clock)
+    finally:
+        set_task_clock()
+    assert_equal(get_task_clock(), default_task_clock)
+
+
+def test_monotonic():
+    # Concurrent readers never see a mixed up (decreasing) time
+    def read(times):
+        last = monotonic()
+        for _ in range(2000):
+            now = monotonic()
+            times.append(now >= last)
+            last = now
+
+    results = [[] for _ in range(4)]
+    threads = [Thread(target=read, args=(times,)) for times in results]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(all(times) for times in results)
+    assert monotonic() > 0
+
+
+def test_wall_time():
+    clock = FakeClock(5.)
+    now = time.time()
+    assert abs(wall_time(5., clock) - now) < 1.
+    # The offset is computed once per clock
+    clock.advance(10.)
+    assert abs(wall_time(15., clock) - now - 10.) < 1.
+    task = ProgressableTask(1)
+    assert abs(task.timestamp - now) < 1.
+    # The offsets do not keep the clocks alive
+    reference = weakref.ref(clock)
+    del clock
+    gc.collect()
+    assert_equal(reference(), None)
+
+
+def test_coarse_clock():
+    source = FakeClock()
+    clock = CoarseClock(resolution=0.001, clock=source)
+    try:
+        source.advance(1.)
+        for _ in xrange(1000):
+            if clock.read() == 1.:
+                break
+            time.sleep(0.001)
+        assert_equal(clock(), 1.)
+    finally:
+        clock.stop()
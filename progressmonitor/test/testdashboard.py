@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+test queen
+"""
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+from nose.tools import assert_equal
+
+from progressmonitor.dashboard import Dashboard, dashboard_callback_factory
+
+
+class FakeStream(object):
+    def __init__(self, isatty=True):
+        self._isatty = isatty
+        self.frames = []
+    def isatty(self):
+        return self._isatty
+    def write(self, string):
+        self.frames.append(string)
+    def flush(self):
+        pass
+
+
+def test_dashboard():
+    stream = FakeStream()
+    dashboard = Dashboard(stream, refresh_rate=None)
+    cb1 = dashboard_callback_factory(dashboard)
+    cb2 = dashboard_callback_factory(dashboard)
+    cb1("task 1: 10%")
+    cb1("task 1: 20%")
+    cb2("task 2: 50%")
+    dashboard.refresh()
+    assert_equal(stream.frames[-1],
+                 "\rtask 1: 20%\x1b[K\n\rtask 2: 50%\x1b[K\n")
+    # Nothing changed
+    dashboard.refresh()
+    assert_equal(len(stream.frames), 1)
+
+    cb2("task 2: done", True)
+    cb1("task 1: 30%")
+    dashboard.refresh()
+    assert_equal(stream.frames[-1],
+                 "\x1b[2A\rtask 2: done\x1b[K\n\rtask 1: 30%\x1b[K\n")
+    cb1("task 1: done", True)
+    dashboard.close()
+    assert_equal(stream.frames[-1],
+                 "\x1b[1A\rtask 1: done\x1b[K\n")
+
+
+def test_dashboard_no_terminal():
+    stream = FakeStream(isatty=False)
+    dashboard = Dashboard(stream, refresh_rate=None)
+    cb = dashboard_callback_factory(dashboard)
+    cb("task: 10%")
+    dashboard.refresh()
+    cb("task: done", True)
+    dashboard.refresh()
+    assert_equal(stream.frames, ["task: done\n"])
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+test queen
+"""
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+import os
+import sys
+import shutil
+import struct
+import tempfile
+from cStringIO import StringIO
+
+from nose.tools import assert_equal
+
+from progressmonitor.monitor import Task
+from progressmonitor.eventlog import (EventLog, read_event_log, task_table,
+                                      throughput_curve, split_runs,
+                                      estimate_remaining_time, main,
+                                      eventlog_hook_factory, HEADER_SIZE)
+from progressmonitor.factory import monitor_generator_factory
+from progressmonitor.rule import span_rule_factory
+
+
+def _with_tmp_dir(test):
+    def wrapped():
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            test(tmp_dir)
+        finally:
+            shutil.rmtree(tmp_dir)
+    wrapped.__name__ = test.__name__
+    return wrapped
+
+
+@_with_tmp_dir
+def test_ring(tmp_dir):
+    path = os.path.join(tmp_dir, "ring.log")
+    log = EventLog(path, capacity=4)
+    for i in xrange(6):
+        log.append(1, float(i), i, 10, Task.RUNNING)
+    # Not closed: the records are readable as after a crash
+    records = read_event_log(path)
+    assert_equal([r.progress for r in records], [2, 3, 4, 5])
+    log.close()
+
+    # Reopening appends, under another run
+    log = EventLog(path, capacity=4)
+    log.append(2, 6., 0, None, Task.ABORTED)
+    log.append(1, 7., 0, 10, Task.RUNNING)
+    log.close()
+    records = read_event_log(path)
+    assert_equal([(r.task_id, r.progress) for r in records],
+                 [(1, 4), (1, 5), (2, 0), (1, 0)])
+    assert_equal(records[2].total, None)
+    assert_equal([len(run) for run in split_runs(records)], [2, 2])
+    assert_equal(split_runs(records)[1][0].run_id, log.run_id)
+    # The task 1 of both runs are not merged
+    assert_equal([(row[0], row[3]) for row in task_table(records)],
+                 [(1, 5), (2, 0), (1, 0)])
+    assert_equal(throughput_curve(records, 1), [(0., 0, 0.)])
+
+
+@_with_tmp_dir
+def test_torn_record(tmp_dir):
+    path = os.path.join(tmp_dir, "torn.log")
+    log = EventLog(path, capacity=4)
+    for i in xrange(4):
+        log.append(1, float(i), i, 10, Task.RUNNING)
+    log.close()
+    # A crash while the oldest slot was being overwritten
+    with open(path, "r+b") as hdl:
+        hdl.seek(HEADER_SIZE + 24)
+        hdl.write(struct.pack("<d", 4.))
+    records = read_event_log(path)
+    assert_equal([r.progress for r in records], [1, 2, 3])
+
+
+@_with_tmp_dir
+def test_reader(tmp_dir):
+    path = os.path.join(tmp_dir, "reader.log")
+    log = EventLog(path, capacity=16)
+    for i in xrange(5):
+        log.append(7, 100. + i, 2 * i, 20, Task.RUNNING)
+    log.close()
+    records = read_event_log(path)
+    assert_equal(task_table(records), [(7, 100., 4., 8, 20, "running")])
+    assert_equal(throughput_curve(records, 7)[-1], (4., 8, 2.))
+    assert_equal(estimate_remaining_time(records, 7), 6.)
+
+    stdout = sys.stdout
+    sys.stdout = StringIO()
+    try:
+        main([path, "--curves"])
+        output = sys.stdout.getvalue()
+    finally:
+        sys.stdout = stdout
+    assert_equal(len(output.splitlines()), 8)
+
+
+@_with_tmp_dir
+def test_eventlog_hook(tmp_dir):
+    path = os.path.join(tmp_dir, "hook.log")
+    embed = monitor_generator_factory(hook_factory=eventlog_hook_factory,
+                                      eventlog_path=path,
+                                      rule_factory=span_rule_factory, span=2)
+    assert_equal(list(embed(xrange(5))), range(5))
+    records = read_event_log(path)
+    assert_equal([r.progress for r in records], [0, 2, 4, 4])
+    assert_equal(records[-1].status, Task.DONE)
@@ -12,7 +12,9 @@ from cStringIO import StringIO
 import sys
 from nose.tools import assert_equal
 
-from progressmonitor import monitor_with
+from progressmonitor import (monitor_with, report_with, code_monitor,
+                             monitor_this, dict_config,
+                             enable_monitoring, disable_monitoring)
 from progressmonitor.formatter import (nb_iterations_formatter_factory, 
                                        exception_formatter_factory)
 from progressmonitor.hook import callback_hook_factory
@@ -78,4 +80,25 @@ def test_fail_monitor_with_code():
         with monitor_with("None"):
             for _ in monitor_with("None")(xrange(length)):
                 sys.stdout.write(".")
-    assert_equal(result, str(output))   
\ No newline at end of file
+    assert_equal(result, str(output))
+
+
+def test_disabled_monitoring():
+    dict_config({"version": 1, 
+                 "generator_monitors": {"disabled_gen": {"rate": 0.1}}})
+    data = range(10)
+    def function():
+        pass
+    disable_monitoring()
+    try:
+        assert_equal(monitor_with("disabled_gen")(data) is data, True)
+        assert_equal(monitor_with("disabled_gen")(function) is function, True)
+        assert_equal(monitor_this()(function) is function, True)
+        assert_equal(report_with("disabled_gen")(function) is function, True)
+        with Capturing() as output:
+            with code_monitor():
+                pass
+        assert_equal(str(output), "")
+    finally:
+        enable_monitoring()
+    assert_equal(monitor_with("disabled_gen")(data) is data, False)
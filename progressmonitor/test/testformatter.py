@@ -14,7 +14,8 @@ from nose.tools import assert_equal
 
 from progressmonitor.monitor import monitor_generator
 from progressmonitor.formatter import (nb_iterations_formatter_factory, 
-                                       exception_formatter_factory)
+                                       exception_formatter_factory,
+                                       progressbar_formatter_factory)
 from progressmonitor.hook import callback_hook_factory
 from progressmonitor.callback import stdout_callback_factory
 
@@ -106,6 +107,53 @@ def test_exception():
             pass
     is_true(output[-1].startswith("Aborted after"))
 
-
-
+def test_progressbar():
+    with Capturing() as output:
+        hook = get_hook(progressbar_formatter_factory(4, nb_steps=4))
+        for _ in monitor_generator(xrange(4), hook):
+            pass
+    assert_equal(output[2:], ["[=>...] 25.00%", "[==>..] 50.00%",
+                              "[===>.] 75.00%", "[====>] 100%"])
+
+    formatter = progressbar_formatter_factory(
+        16, nb_steps=2, blank=" ", sub_steps=True, fixed_width=True,
+        format="|%(fill)s%(blank)s| %(progress)s%%")
+    bars = []
+    for _ in monitor_generator(xrange(16), lambda task, exception=None:
+                               bars.append(formatter(task))):
+        pass
+    assert_equal(bars[3], "|\xe2\x96\x8e |  12.50%")
+    assert_equal(bars[11], "|\xe2\x96\x88\xe2\x96\x8e|  62.50%")
+    assert_equal(bars[-1], "|\xe2\x96\x88\xe2\x96\x88| 100.00%")
+
+
+def test_progressbar_shared_frames():
+    import progressmonitor.formatter as formatter_module
+    widths = []
+    def terminal_width():
+        widths.append(80)
+        return 80
+    previous = formatter_module.terminal_width
+    formatter_module.terminal_width = terminal_width
+    del formatter_module._terminal_width[:]
+    try:
+        formatters = [progressbar_formatter_factory(length, nb_steps="auto")
+                      for length in (10, 20)]
+    finally:
+        formatter_module.terminal_width = previous
+    # The terminal is only queried once and the frames are built once
+    assert_equal(widths, [80])
+    table = formatter_module._frame_tables[(29, "=", ".",
+                                            "[%(fill)s>%(blank)s] "
+                                            "%(progress)s%%", False)]
+    assert_equal(len(table), 30)
+    assert_equal(formatter_module._progressbar_frames(
+        29, "=", ".", "[%(fill)s>%(blank)s] %(progress)s%%", False) is table,
+        True)
+    for formatter in formatters:
+        bars = []
+        for _ in monitor_generator(xrange(2), lambda task, exception=None:
+                                   bars.append(formatter(task))):
+            pass
+        assert_equal(len(bars[-1]), 37)
 
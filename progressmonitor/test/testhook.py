@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+test queen
+"""
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+import json
+
+from nose.tools import assert_equal
+
+from progressmonitor.hook import (structured_hook_factory, msgpack_encode,
+                                  ProgressListener)
+from progressmonitor.monitor import monitor_generator, ProgressableTask
+from progressmonitor.factory import monitor_generator_factory
+from progressmonitor.rule import span_rule_factory
+from progressmonitor import dict_config, monitor_with
+
+
+def _events_callback_factory(events, decode=json.loads):
+    def callback_factory():
+        def callback(string, last_com=False):
+            events.append((decode(string), last_com))
+        return callback
+    return callback_factory
+
+
+def test_json_events():
+    events = []
+    embed = monitor_generator_factory(
+        hook_factory=structured_hook_factory,
+        callback_factory=_events_callback_factory(events),
+        rule_factory=span_rule_factory, span=2, task_name="json_task")
+    assert_equal(list(embed(xrange(4))), range(4))
+    assert_equal([e["progress"] for e, _ in events], [0, 2, 3])
+    assert_equal([e["status"] for e, _ in events],
+                 ["running", "running", "done"])
+    assert_equal([last_com for _, last_com in events], [False, False, True])
+    event = events[-1][0]
+    assert_equal(event["name"], "json_task")
+    assert_equal(event["total"], 4)
+    assert_equal("rate" in event and "eta" in event, True)
+    assert_equal(event["exception"], None)
+
+
+def test_exception_event():
+    events = []
+    hook = structured_hook_factory(_events_callback_factory(events)(),
+                                   with_rate=False, with_eta=False)
+    embed = monitor_generator_factory(hook_factory=lambda callback: hook,
+                                      rule_factory=span_rule_factory,
+                                      span=10)
+    def failing_generator():
+        yield 0
+        raise KeyError(1)
+    try:
+        for _ in embed(failing_generator()):
+            pass
+    except KeyError:
+        pass
+    event, last_com = events[-1]
+    assert_equal(last_com, True)
+    assert_equal(event["exception"], "KeyError")
+    assert_equal("rate" in event or "eta" in event, False)
+
+
+def test_msgpack():
+    assert_equal(msgpack_encode([None, True, False, 5, -3]),
+                 "\x95\xc0\xc3\xc2\x05\xfd")
+    assert_equal(msgpack_encode(300), "\xcf" + "\x00" * 6 + "\x01\x2c")
+    assert_equal(msgpack_encode(1.5), "\xcb\x3f\xf8" + "\x00" * 6)
+    assert_equal(msgpack_encode("a" * 40), "\xdb\x00\x00\x00\x28" + "a" * 40)
+
+
+def test_hook_config():
+    events = []
+    dict_config({"version": 1,
+                 "generator_monitors": {
+                     "json_gen": {"hook_factory": "$json",
+                                  "event_encoding": "dict",
+                                  "callback_factory":
+                                      _events_callback_factory(
+                                          events, decode=dict),
+                                  "span": 5}}})
+    assert_equal(list(monitor_with("json_gen")(xrange(5))), range(5))
+    assert_equal([e["progress"] for e, _ in events], [0, 4])
+
+
+def _progress_hook_factory(progresses):
+    def hook_factory():
+        def progress_hook(task, exception=None):
+            progresses.append(task.progress)
+        return progress_hook
+    return hook_factory
+
+
+def test_listener_rules():
+    every, spanned, threaded = [], [], []
+    def failing_hook(task, exception=None):
+        raise RuntimeError("Broken destination")
+
+    listener = ProgressListener()
+    listener.add_hook(_progress_hook_factory(every)())
+    listener.add_hook(failing_hook)
+    listener.add_hook(_progress_hook_factory(spanned)(),
+                      rule=span_rule_factory(2))
+    listener.add_hook(_progress_hook_factory(threaded)(), threaded=True)
+    assert_equal(list(monitor_generator(xrange(5), listener)), range(5))
+    listener._hooks[-1][0].drain()
+
+    assert_equal(every, [0, 0, 1, 2, 3, 4, 4])
+    # The first and last notifications always go through
+    assert_equal(spanned, [0, 0, 2, 4, 4])
+    # The threaded hook sees the task as it is when it is called
+    assert_equal(len(threaded), len(every))
+    assert_equal(threaded[-1], 4)
+
+    listener = ProgressListener()
+    listener.add_hook(failing_hook, isolated=False)
+    try:
+        listener(ProgressableTask(1))
+        raise AssertionError("The failure should be propagated")
+    except RuntimeError:
+        pass
+
+
+def test_hook_rules_factory():
+    events = []
+    spanned = []
+    embed = monitor_generator_factory(
+        hook_factory=structured_hook_factory,
+        callback_factory=_events_callback_factory(events),
+        rule_factory=span_rule_factory, span=3,
+        hook_factories=[{"hook_factory": _progress_hook_factory(spanned),
+                         "rule_factory": span_rule_factory, "span": 2}])
+    assert_equal(list(embed(xrange(7))), range(7))
+    assert_equal([event["progress"] for event, _ in events],
+                 [0, 0, 3, 6, 6])
+    assert_equal(spanned, [0, 0, 2, 4, 6, 6])
@@ -8,10 +8,15 @@ __copyright__ = "3-clause BSD License"
 __version__ = '1.0'
 __date__ = "15 January 2015"
 
-from nose.tools import assert_equal
+import gc
+
+from nose.tools import assert_equal, assert_raises
 
 from progressmonitor.monitor import (ProgressableTask, monitor_generator, 
-                                     monitor_function, monitor_code, Task)
+                                     monitor_function, monitor_code, Task,
+                                     monitor_call, current_task)
+from progressmonitor.util import summarize
+from progressmonitor.clock import FakeClock
 
 
 def except_hook(task, exception=None):
@@ -91,8 +96,10 @@ def test_monitor_code():
         if task.progress == 1:
             assert_equal(task.is_completed, True)
 
-    with monitor_code(hook_):
-        pass
+    with monitor_code(hook_) as cm:
+        assert_equal(cm.task.nb_steps, 1)
+        assert_raises(ValueError, cm.lap)
+    assert_equal(cm.task.is_completed, True)
 
 
 
@@ -106,3 +113,143 @@ def test_monitor_code_err():
 
 
 
+
+
+def test_monitor_code_laps():
+    progresses = []
+    def hook_(task, exception=None):
+        assert_equal(exception, None)
+        progresses.append(task.progress)
+
+    clock = FakeClock()
+    with monitor_code(hook_, phases=["load", "compute", "save"],
+                      clock=clock) as cm:
+        assert_equal(cm.task.current_phase, "load")
+        clock.advance(1.)
+        cm.lap()
+        clock.advance(2.)
+        cm.lap("compute")
+        assert_equal(cm.task.current_phase, "save")
+        clock.advance(3.)
+
+    task = cm.task
+    assert_equal(progresses, [0, 1, 2, 3])
+    assert_equal(task.is_completed, True)
+    assert_equal([name for name, _ in task.phase_durations],
+                 ["load", "compute", "save"])
+
+    # Estimation from the previous run
+    task.start()
+    assert_equal(task.remaining_time, 6.)
+    clock.advance(.5)
+    assert_equal(task.remaining_time, 5.5)
+    task.lap()
+    assert_equal(task.remaining_time, 5.)
+
+
+def test_weighted_progress():
+    outer_progresses = []
+    def nop_hook(task, exception=None):
+        pass
+    def inner_hook(task, exception=None):
+        outer = task_tree["outer"]
+        outer_progresses.append(outer.weighted_progress)
+        assert_equal(outer.running_children, [task] if
+                     task.status == Task.RUNNING else [])
+
+    task_tree = dict()
+    def outer_hook(task, exception=None):
+        task_tree["outer"] = task
+
+    def process_files():
+        for file_ in range(2):
+            # Each file is one step of the outer task
+            for _ in monitor_generator(range(4), inner_hook, "inner",
+                                       weight=1):
+                pass
+            yield file_
+
+    for _ in monitor_generator(process_files(), outer_hook, "outer"):
+        pass
+    # The inner notifications are issued at the start, at progress 0, 1, 2,
+    # 3 and at the end of the task
+    assert_equal(outer_progresses, [0, 0, 0.25, 0.5, 0.75, 1,
+                                    1, 1, 1.25, 1.5, 1.75, 2])
+
+    # Deeper trees and explicit parents
+    root = ProgressableTask(1)
+    middle = ProgressableTask(2, weight=1, parent=root)
+    leaf = ProgressableTask(4, weight=1, parent=middle)
+    for task in (root, middle, leaf):
+        task.start()
+    leaf.update(2)
+    assert_equal(middle.weighted_progress, 0.5)
+    assert_equal(root.weighted_progress, 0.25)
+    leaf.close(False)
+    assert_equal(root.weighted_progress, 0)
+
+    # Abandoned children are not kept alive by their parent
+    child = ProgressableTask(4, weight=1, parent=root)
+    child.start()
+    child.update(2)
+    assert_equal(root.weighted_progress, 0.5)
+    del child
+    gc.collect()
+    assert_equal(root.running_children, [middle])
+    assert_equal(root.weighted_progress, 0)
+
+
+def test_failing_code_hook():
+    def hook(task, exception=None):
+        raise ValueError()
+    code_monitor = monitor_code(hook, "failing")
+    assert_raises(ValueError, code_monitor.__enter__)
+    assert_equal(current_task(), None)
+    assert_equal(code_monitor.task.status, Task.ABORTED)
+
+
+def test_summarize():
+    big = bytearray(50 * 1024 * 1024)
+    assert_equal(summarize(big), "<bytearray len=52428800>")
+    assert_equal(summarize([big, 1]), "<list len=2> [<bytearray len=52428800>"
+                                      ", 1]")
+    del big
+    payload = _Payload(10)
+    assert_equal(summarize(payload), object.__repr__(payload))
+    assert_equal(summarize(10 ** 1000), "<long bits=3322>")
+    assert_equal(summarize(u"x" * 10 ** 6).startswith("<unicode len=1000000>"),
+                 True)
+    summary = summarize(dict((i, [i]) for i in xrange(10 ** 5)))
+    assert_equal(summary.startswith("<dict len=100000> {"), True)
+    assert_equal(len(summary) < 100, True)
+
+
+class _Payload(object):
+    def __init__(self, size):
+        self.data = range(size)
+
+
+def test_capture():
+    tasks = []
+    def hook(task, exception=None):
+        tasks.append(task)
+    def compute(size, scale=1):
+        return range(size * scale)
+
+    assert_equal(monitor_call(compute, hook, (1000,), {"scale": 2},
+                              capture="summary"), range(2000))
+    task = tasks[-1]
+    assert_equal(str(task.result), "<list len=2000> [0, 1, 2, 3, 4, 5, ...]")
+    assert_equal(str(task.args), "(1000,)")
+    assert_equal(str(task.kwargs), "{'scale': 2}")
+
+    monitor_call(compute, hook, (10,), capture="none")
+    assert_equal((tasks[-1].args, tasks[-1].kwargs, tasks[-1].result),
+                 (None, None, None))
+
+    payload = _Payload(10)
+    monitor_call(_Payload, hook, (10,), capture="weakref")
+    assert_equal(str(tasks[-1].result), "<collected>")
+    monitor_call(lambda x: x, hook, (payload,), capture="weakref")
+    assert_equal(tasks[-1].result is payload, True)
+    assert_equal(tasks[-1].args[0] is payload, True)
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+test queen
+"""
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+import socket
+import urllib2
+
+from nose.tools import assert_equal, assert_in
+
+from progressmonitor.prometheus import (PrometheusExporter,
+                                        prometheus_hook_factory)
+from progressmonitor.factory import (monitor_generator_factory,
+                                     monitor_function_factory)
+from progressmonitor.rule import span_rule_factory
+from progressmonitor.monitor import ProgressableTask
+
+
+def _silent_callback_factory():
+    def callback(string, last_com=False):
+        pass
+    return callback
+
+
+def test_exporter():
+    exporter = PrometheusExporter(port=0)
+    embed = monitor_generator_factory(hook_factories=[prometheus_hook_factory],
+                                      exporter=exporter,
+                                      callback_factory=_silent_callback_factory,
+                                      rule_factory=span_rule_factory, span=2,
+                                      task_name="prom_gen")
+    gen = embed(xrange(10))
+    for x in gen:
+        if x == 4:
+            break
+    metrics = exporter.render()
+    assert_in('progressmonitor_task_progress{name="prom_gen"} 4\n', metrics)
+    assert_in('progressmonitor_task_completion_ratio{name="prom_gen"} 0.4\n',
+              metrics)
+    assert_in('progressmonitor_task_status{name="prom_gen",status="running"}'
+              ' 1\n', metrics)
+    assert_in('progressmonitor_tasks_running{name="prom_gen"} 1\n', metrics)
+
+    def fail():
+        raise KeyError()
+    embed = monitor_function_factory(hook_factories=[prometheus_hook_factory],
+                                     exporter=exporter,
+                                     callback_factory=_silent_callback_factory,
+                                     format_str="{$elapsed}",
+                                     task_name="prom_func")
+    try:
+        embed(fail)()
+    except KeyError:
+        pass
+    metrics = exporter.render()
+    assert_in('progressmonitor_task_exceptions_total{exception="KeyError",'
+              'name="prom_func"} 1\n', metrics)
+    # Failed tasks are not counted as completed
+    assert_equal('progressmonitor_task_completed_total{name="prom_func"}' in
+                 metrics, False)
+
+    # Unnamed tasks are counted under the name of the function
+    def succeed():
+        pass
+    monitored = monitor_function_factory(
+        hook_factories=[prometheus_hook_factory], exporter=exporter,
+        callback_factory=_silent_callback_factory,
+        format_str="{$elapsed}")(succeed)
+    for _ in xrange(3):
+        monitored()
+    metrics = exporter.render()
+    assert_in('progressmonitor_task_completed_total{name="succeed"} 3\n',
+              metrics)
+    assert_equal(metrics.count("progressmonitor_task_completed_total{"), 1)
+    # One series per monitor, not per task
+    assert_in('progressmonitor_task_status{name="succeed",status="done"} 1\n',
+              metrics)
+    assert_equal(metrics.count('progressmonitor_task_progress{'
+                               'name="succeed"}'), 1)
+
+    exporter.start()
+    try:
+        response = urllib2.urlopen("http://127.0.0.1:%d/metrics" %
+                                   exporter.port)
+        assert_equal(response.getcode(), 200)
+        assert_in("progressmonitor_task_progress", response.read())
+    finally:
+        exporter.stop()
+
+
+def test_exporter_failures():
+    # Unicode names
+    exporter = PrometheusExporter(port=0)
+    hook = prometheus_hook_factory(exporter, metric_name=u"\xe9t\xe9")
+    task = ProgressableTask(2)
+    task.start()
+    hook(task)
+    assert_in('progressmonitor_task_progress{name="\xc3\xa9t\xc3\xa9"} 0\n',
+              exporter.render())
+
+    # A busy port does not break the monitored code
+    busy = socket.socket()
+    busy.bind(("127.0.0.1", 0))
+    busy.listen(1)
+    try:
+        hook = prometheus_hook_factory(prometheus_port=busy.getsockname()[1])
+        hook(task)
+    finally:
+        busy.close()
+
+
+def test_aggregated_functions():
+    exporter = PrometheusExporter(port=0)
+    embed = monitor_function_factory(aggregate=True,
+                                     callback_factory=_silent_callback_factory,
+                                     task_name="prom_aggregated")
+    double = embed(lambda x: 2 * x)
+    for x in xrange(3):
+        double(x)
+    metrics = exporter.render()
+    assert_in('progressmonitor_function_calls_total'
+              '{function="prom_aggregated"} 3\n', metrics)
+    assert_in('progressmonitor_function_latency_seconds_bucket'
+              '{function="prom_aggregated",le="+Inf"} 3\n', metrics)
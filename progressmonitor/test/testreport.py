@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""
+test queen
+"""
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+from threading import Event
+
+from nose.tools import (assert_equal, assert_in, assert_not_in, assert_true,
+                        assert_false)
+
+from progressmonitor.clock import FakeClock
+from progressmonitor.factory import report_factory
+from progressmonitor.hook import report_hook_factory
+from progressmonitor.monitor import monitor_call
+from progressmonitor.report import render_report, digest_hook_factory
+
+
+def _store_callback_factory(messages):
+    def store_callback_factory():
+        def store_callback(string, last_com=False):
+            messages.append(string)
+        return store_callback
+    return store_callback_factory
+
+
+def test_render_failed_call():
+    reports = []
+    def hook(task, exception=None):
+        if exception is not None:
+            reports.append(render_report(task, exception))
+    def fail():
+        raise ValueError("bad input")
+    try:
+        monitor_call(fail, hook, task_name="fail")
+    except ValueError:
+        pass
+    assert_in("Result\n======\nn/a", reports[0])
+    assert_in("Exception\n=========\nbad input", reports[0])
+
+
+def test_digest():
+    messages = []
+    results = []
+    clock = FakeClock()
+    def format_result(result):
+        results.append(result)
+        return str(result)
+
+    @report_factory(callback_factory=_store_callback_factory(messages),
+                    digest=True, digest_size=5, digest_period=None,
+                    nb_slowest=1, format_result=format_result,
+                    task_name="batch", clock=clock)
+    def process(duration):
+        clock.advance(duration)
+        if duration == 3:
+            raise ValueError("bad %d" % duration)
+        return duration * 10
+
+    for duration in [1, 2, 3, 5, 4, 1]:
+        try:
+            process(duration)
+        except ValueError:
+            pass
+
+    assert_equal(len(messages), 1)
+    digest = messages[0]
+    assert_in("Digest of batch: 5 calls (1 failed)", digest)
+    assert_in("Duration: total 15.00s mean 3.00s min 1.00s max 5.00s",
+              digest)
+    assert_in("1 x ValueError: bad 3", digest)
+    assert_in("Args: (5,)", digest)
+    # Only the slowest call is rendered with its result
+    assert_equal(results, [50])
+
+
+def test_digest_period():
+    messages = []
+    clock = FakeClock()
+    hook = digest_hook_factory(lambda string, last_com=False:
+                               messages.append(string),
+                               digest_period=10., digest_size=None,
+                               clock=clock)
+    for _ in xrange(3):
+        monitor_call(clock.advance, hook, (4.,), task_name="tick",
+                     clock=clock)
+    assert_equal(len(messages), 1)
+    assert_in("Digest of tick: 3 calls (0 failed)", messages[0])
+    hook.digest.flush()
+    assert_equal(len(messages), 1)
+
+
+def test_digest_expiry():
+    messages = []
+    clock = FakeClock()
+    hook = digest_hook_factory(lambda string, last_com=False:
+                               messages.append(string),
+                               digest_period=10., digest_size=None,
+                               clock=clock, use_timer=False)
+    monitor_call(clock.advance, hook, (4.,), task_name="tick", clock=clock)
+    assert_false(hook.digest.flush_expired())
+    clock.advance(6.)
+    # The window is over without any further call
+    assert_true(hook.digest.flush_expired())
+    assert_equal(len(messages), 1)
+    assert_in("Digest of tick: 1 calls (0 failed)", messages[0])
+    assert_false(hook.digest.flush_expired())
+
+    # With a timer, the digest is sent at the end of the window
+    sent = Event()
+    hook = digest_hook_factory(lambda string, last_com=False: sent.set(),
+                               digest_period=0.05, digest_size=None)
+    monitor_call(abs, hook, (1,), task_name="tick")
+    assert_true(sent.wait(2.))
+
+
+def test_digest_summarized_arguments():
+    messages = []
+    hook = digest_hook_factory(lambda string, last_com=False:
+                               messages.append(string),
+                               digest_size=2, digest_period=None)
+    def fail(values, key=None):
+        raise ValueError("bad input")
+    for _ in xrange(2):
+        try:
+            monitor_call(fail, hook, (range(1000),), {"key": "x" * 1000},
+                         task_name="fail")
+        except ValueError:
+            pass
+    assert_equal(len(messages), 1)
+    # The arguments of the retained calls are summarized even though the
+    # tasks capture them in full
+    assert_in("<list len=1000>", messages[0])
+    assert_not_in("x" * 100, messages[0])
+    assert_not_in(", ".join(str(i) for i in xrange(10)), messages[0])
+
+
+def test_digest_default_name():
+    messages = []
+
+    @report_factory(callback_factory=_store_callback_factory(messages),
+                    digest=True, digest_size=4, digest_period=None,
+                    nb_slowest=1, nb_failures=0)
+    def double(x):
+        return 2 * x
+
+    for x in xrange(4):
+        double(x)
+    assert_equal(len(messages), 1)
+    assert_in("Digest of double: 4 calls (0 failed)", messages[0])
+    assert_equal(messages[0].count("Result\n======"), 1)
+
+
+def test_report_hooks():
+    messages = []
+    tasks = []
+    def extra_hook_factory():
+        def extra_hook(task, exception=None):
+            tasks.append(task.status)
+        return extra_hook
+
+    @report_factory(callback_factory=_store_callback_factory(messages),
+                    hook_factories=[extra_hook_factory])
+    def identity(x):
+        return x
+
+    identity(1)
+    assert_equal(len(messages), 1)
+    assert_in("Result\n======\n1", messages[0])
+    assert_equal(len(tasks), 2)
+
+    def name_hook_factory(callback):
+        def name_hook(task, exception=None):
+            if task.is_completed:
+                callback(task.function.__name__)
+        return name_hook
+
+    @report_factory(callback_factory=_store_callback_factory(messages),
+                    hook_factory=name_hook_factory)
+    def replaced():
+        pass
+
+    replaced()
+    assert_equal(messages[-1], "replaced")
+
+
+
+def test_report_last_com():
+    received = []
+    def callback(string, last_com=False):
+        received.append(last_com)
+    # The report is the last communication: it must not be dropped by a
+    # callback which only lets the last communications through
+    callback.wants = lambda task, last_com: last_com
+
+    def fail():
+        raise ValueError("bad input")
+    hook = report_hook_factory(callback)
+    monitor_call(lambda: 1, hook)
+    try:
+        monitor_call(fail, hook)
+    except ValueError:
+        pass
+    assert_equal(received, [True, True])
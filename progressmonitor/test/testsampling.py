@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+test queen
+"""
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+from nose.tools import assert_equal
+
+from progressmonitor.sampling import Sampler
+from progressmonitor.factory import (monitor_generator_factory,
+                                     monitor_function_factory)
+from progressmonitor.formatter import sampling_formatter_factory
+from progressmonitor.config import get_config
+from progressmonitor.clock import FakeClock
+from progressmonitor.util import IdProxy
+from progressmonitor import dict_config, code_monitor
+
+
+def test_sampler_rate():
+    sampler = Sampler(sample_rate=0.)
+    assert_equal([sampler() for _ in xrange(10)], [False] * 10)
+    assert_equal(sampler.nb_seen, 10)
+    assert_equal(sampler.nb_sampled, 0)
+
+def test_sampler_max_per_second():
+    sampler = Sampler(max_per_second=3)
+    sampled = [sampler() for _ in xrange(10)]
+    assert_equal(sum(sampled), 3)
+    assert_equal(sampler.scale, 10 / 3.)
+    formatter = sampling_formatter_factory(sampler)
+    assert_equal(formatter(None), "sampled 3/10 (x3.33)")
+
+
+def test_unsampled_generator():
+    embed = monitor_generator_factory(sample_rate=0.)
+    gen = iter(xrange(10))
+    assert_equal(embed(gen) is gen, True)
+
+def test_unsampled_function():
+    notifs = []
+    def cb_factory():
+        def callback(string, last_com=False):
+            notifs.append(string)
+        return callback
+
+    embed = monitor_function_factory(max_per_second=1,
+                                     callback_factory=cb_factory,
+                                     format_str="{$sampling}")
+    double = embed(lambda x: 2*x)
+    assert_equal([double(x) for x in xrange(5)], [0, 2, 4, 6, 8])
+    # Only the first call is monitored (start + end notifications)
+    assert_equal(notifs, ["sampled 1/1 (x1.00)"] * 2)
+
+
+def test_configured_sampler():
+    def configure(max_per_second):
+        dict_config({"version": 1,
+                     "function_monitors": {
+                         "sampled": {"max_per_second": max_per_second}}})
+    configure(2)
+    sampler = get_config("sampled")["sampler"]
+    # One sampler per monitor name, shared by its monitors
+    assert_equal(get_config("sampled.child")["sampler"] is sampler, False)
+    assert_equal(get_config("sampled")["sampler"] is sampler, True)
+    # Overriden by the arguments and by a new configuration
+    assert_equal(sum(get_config("sampled", max_per_second=5)["sampler"]()
+                     for _ in xrange(10)), 5)
+    configure(3)
+    assert_equal(sum(get_config("sampled")["sampler"]()
+                     for _ in xrange(10)), 3)
+
+
+
+def test_shortcut_sampler():
+    clock = FakeClock()
+    def silent_callback_factory():
+        def callback(string, last_com=False):
+            pass
+        return callback
+    # A monitor is built per use, the sampler is shared by the call site
+    monitored = []
+    for _ in xrange(5):
+        block = code_monitor(max_per_second=1, clock=clock,
+                             callback_factory=silent_callback_factory)
+        with block:
+            monitored.append(not isinstance(block, IdProxy))
+    assert_equal(monitored, [True, False, False, False, False])
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+test queen
+"""
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+import os
+import signal
+import shutil
+import tempfile
+import threading
+from cStringIO import StringIO
+
+from nose.tools import assert_equal, assert_in, assert_raises
+
+from progressmonitor.monitor import monitor_generator, monitor_function
+from progressmonitor.snapshot import (snapshot_tasks, dump_tasks,
+                                      install_dump_signal, DumpServer,
+                                      fetch_snapshot)
+
+
+def _hook(task, exception=None):
+    pass
+
+
+def test_snapshot():
+    assert_equal(snapshot_tasks(), [])
+    snapshots = []
+    def source():
+        for i in xrange(5):
+            if i == 4:
+                snapshots.append(monitor_function(snapshot_tasks, _hook,
+                                                  "inner"))
+            yield i
+    for _ in monitor_generator(source(), _hook, "outer"):
+        pass
+    assert_equal(snapshot_tasks(), [])
+    snapshot = snapshots[0]
+    outer, inner = snapshot
+    assert_equal((outer.name, outer.progress, outer.total),
+                 ("outer", 3, None))
+    assert_equal((inner.name, inner.parent_id), ("inner", outer.id))
+    assert_equal(outer.thread_name, "MainThread")
+    assert_equal(outer.status, "running")
+
+
+def test_other_thread():
+    # The calls are not registered: they are found on the thread stacks
+    started, release = threading.Event(), threading.Event()
+    def wait():
+        started.set()
+        release.wait()
+    thread = threading.Thread(target=monitor_function,
+                              args=(wait, _hook, "waiting"), name="worker")
+    thread.start()
+    try:
+        started.wait()
+        snapshot = snapshot_tasks()
+    finally:
+        release.set()
+        thread.join()
+    assert_equal([(s.name, s.thread_name) for s in snapshot],
+                 [("waiting", "worker")])
+    assert_equal(snapshot_tasks(), [])
+
+
+def test_abandoned_task():
+    generator = monitor_generator(xrange(5), _hook, "abandoned")
+    generator.next()
+    assert_equal([s.name for s in snapshot_tasks()], ["abandoned"])
+    del generator
+    assert_equal(snapshot_tasks(), [])
+
+
+def test_dump():
+    stream = StringIO()
+    for _ in monitor_generator(xrange(2), _hook, "dumped"):
+        dump_tasks(stream=stream)
+    assert_in(" dumped ", stream.getvalue())
+
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, "dump.txt")
+        previous = install_dump_signal(path=path)
+        try:
+            for _ in monitor_generator(xrange(1), _hook, "signaled"):
+                os.kill(os.getpid(), signal.SIGUSR1)
+        finally:
+            signal.signal(signal.SIGUSR1, previous)
+        with open(path) as hdl:
+            assert_in(" signaled ", hdl.read())
+
+        server = DumpServer(os.path.join(tmp_dir, "dump.sock"))
+        server.start()
+        try:
+            for _ in monitor_generator(xrange(1), _hook, "served"):
+                assert_in(" served ", fetch_snapshot(server.path))
+        finally:
+            server.stop()
+        assert_equal(os.path.exists(server.path), False)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_without_unix_sockets():
+    import SocketServer
+    import progressmonitor.snapshot as snapshot
+    server_class = SocketServer.UnixStreamServer
+    del SocketServer.UnixStreamServer
+    try:
+        reload(snapshot)
+        server = snapshot.DumpServer("unused.sock")
+        assert_raises(RuntimeError, server.start)
+    finally:
+        SocketServer.UnixStreamServer = server_class
+        reload(snapshot)
+
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+test queen
+"""
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+from nose.tools import assert_equal
+
+from progressmonitor.stats import CallStatistics
+from progressmonitor.factory import monitor_function_factory
+
+
+def test_aggregate():
+    statistics = CallStatistics("half", flush_period=None)
+
+    def half(x):
+        if x % 2 == 1:
+            raise ValueError("odd")
+        return x // 2
+
+    half_ = statistics.wrap(half)
+    for x in xrange(10):
+        try:
+            assert_equal(half_(x), x // 2)
+        except ValueError:
+            pass
+
+    stats = statistics.snapshot()
+    assert_equal(stats["calls"], 10)
+    assert_equal(stats["errors"], 5)
+    assert_equal(sum(stats["histogram"]), 10)
+    assert_equal(stats["min"] <= stats["mean"] <= stats["max"], True)
+
+
+def test_aggregate_flush():
+    messages = []
+    def cb_factory():
+        def callback(string, last_com=False):
+            messages.append((string, last_com))
+        return callback
+
+    embed = monitor_function_factory(aggregate=True, flush_period=0,
+                                     callback_factory=cb_factory,
+                                     task_name="noop")
+    noop = embed(lambda: None)
+    noop()
+    noop()
+    assert_equal(len(messages), 2)
+    assert_equal(messages[-1][0].startswith("noop: 2 calls (0 errors)"), True)
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+test queen
+"""
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+import socket
+
+from nose.tools import assert_equal
+
+from progressmonitor.statsd import StatsdClient, statsd_hook_factory
+from progressmonitor.rule import span_rule_factory
+from progressmonitor.factory import monitor_function_factory
+from progressmonitor import dict_config, monitor_with
+
+
+def _listener():
+    listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    listener.bind(("127.0.0.1", 0))
+    listener.settimeout(2)
+    return listener
+
+
+def _silent_callback_factory():
+    def callback(string, last_com=False):
+        pass
+    return callback
+
+
+def test_batching():
+    listener = _listener()
+    client = StatsdClient(port=listener.getsockname()[1], mtu=20,
+                          flush_interval=None)
+    for i in xrange(3):
+        client.send("a.b:%d|g" % i)
+    # The third metric does not fit: the first two were sent together
+    assert_equal(listener.recv(1024), "a.b:0|g\na.b:1|g")
+    client.flush()
+    assert_equal(listener.recv(1024), "a.b:2|g")
+    client.close()
+    listener.close()
+
+
+def test_unreachable():
+    client = StatsdClient(port=1, flush_interval=None)
+    client.send("a.b:1|c")
+    client.flush()
+    client.close()
+    # Unresolved hosts are not looked up again when sending
+    client = StatsdClient(host="unresolved.invalid", flush_interval=None)
+    lookups = []
+    getaddrinfo = socket.getaddrinfo
+    socket.getaddrinfo = lambda *args: lookups.append(args)
+    try:
+        client.send("a.b:1|c")
+        client.flush()
+    finally:
+        socket.getaddrinfo = getaddrinfo
+    assert_equal(lookups, [])
+    assert_equal(client.nb_dropped, 1)
+    client.close()
+
+
+def test_statsd_hook():
+    listener = _listener()
+    client = StatsdClient(port=listener.getsockname()[1],
+                          flush_interval=None)
+    dict_config({"version": 1,
+                 "generator_monitors": {
+                     "statsd_gen": {"hook_factories": ["$statsd"],
+                                    "statsd_client": client,
+                                    "callback_factory":
+                                        _silent_callback_factory,
+                                    "task_name": "my job",
+                                    "rule_factory": span_rule_factory,
+                                    "span": 2}}})
+    assert_equal(list(monitor_with("statsd_gen")(xrange(3))), range(3))
+    client.flush()
+    metrics = listener.recv(1500).split("\n")
+    assert_equal(metrics[:3], ["progressmonitor.my_job.progress:0|g",
+                               "progressmonitor.my_job.progress:2|g",
+                               "progressmonitor.my_job.progress:2|g"])
+    assert_equal(metrics[3], "progressmonitor.my_job.completed:1|c")
+    assert_equal(metrics[4].startswith("progressmonitor.my_job.duration:"),
+                 True)
+    client.close()
+    listener.close()
+
+
+def test_statsd_metric_name():
+    listener = _listener()
+    client = StatsdClient(port=listener.getsockname()[1],
+                          flush_interval=None)
+    # Unnamed tasks are aggregated under the function name
+    embed = monitor_function_factory(hook_factories=[statsd_hook_factory],
+                                     statsd_client=client,
+                                     callback_factory=_silent_callback_factory,
+                                     format_str="{$elapsed}")
+    def triple(x):
+        return 3 * x
+    triple = embed(triple)
+    for x in xrange(3):
+        triple(x)
+    client.flush()
+    names = set(metric.split(":")[0]
+                for metric in listener.recv(1500).split("\n"))
+    assert_equal(names, set(["progressmonitor.triple.progress",
+                             "progressmonitor.triple.completed",
+                             "progressmonitor.triple.duration"]))
+    client.close()
+    listener.close()
+
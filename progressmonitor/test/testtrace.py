@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+test queen
+"""
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+import os
+import json
+import shutil
+import tempfile
+
+from nose.tools import assert_equal
+
+from progressmonitor.monitor import (monitor_generator, monitor_function,
+                                     monitor_code, monitor_call,
+                                     current_task)
+from progressmonitor.trace import (ChromeTraceExporter,
+                                   chrome_trace_hook_factory)
+
+
+def test_nesting():
+    tasks = dict()
+    def hook(task, exception=None):
+        tasks[task.name] = task
+
+    def process(data):
+        with monitor_code(hook, "block"):
+            return sum(monitor_generator(data, hook, "gen"))
+
+    assert_equal(monitor_function(process, hook, "func", range(3)), 3)
+    assert_equal(current_task(), None)
+    func, block, gen = tasks["func"], tasks["block"], tasks["gen"]
+    assert_equal(func.parent_id, None)
+    assert_equal(func.trace_id, func.id)
+    assert_equal(block.parent_id, func.id)
+    assert_equal(gen.parent_id, block.id)
+    assert_equal(gen.trace_id, func.id)
+
+    # A new root
+    monitor_function(len, hook, "other", [])
+    assert_equal(tasks["other"].parent_id, None)
+
+
+def test_interleaved_generators():
+    tasks = dict()
+    def hook(task, exception=None):
+        tasks[task.name] = task
+
+    first = monitor_generator(range(2), hook, "first")
+    second = monitor_generator(range(2), hook, "second")
+    next(first)
+    next(second)
+    # Suspended generators are not current
+    assert_equal(current_task(), None)
+    # Exhaust the first one before the second
+    list(first)
+    list(second)
+    assert_equal(current_task(), None)
+
+
+def test_unfinished_generator():
+    tasks = dict()
+    def hook(task, exception=None):
+        tasks[task.name] = task
+
+    generator = monitor_generator(range(4), hook, "unfinished")
+    for i in generator:
+        if i == 1:
+            break
+    assert_equal(current_task(), None)
+    monitor_call(len, hook, ([],), task_name="unrelated")
+    assert_equal(tasks["unrelated"].parent_id, None)
+    assert_equal(tasks["unrelated"].trace_id, tasks["unrelated"].id)
+    # The generator is still the parent of what it runs
+    def source():
+        yield monitor_call(current_task, hook, task_name="inner")
+    outer = monitor_generator(source(), hook, "outer")
+    next(outer)
+    assert_equal(tasks["inner"].parent_id, tasks["outer"].id)
+    del generator, outer
+
+
+def test_chrome_trace():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp_dir, "trace.json")
+        exporter = ChromeTraceExporter(path)
+        hook = chrome_trace_hook_factory(trace_exporter=exporter)
+
+        def outer():
+            return list(monitor_generator(range(2), hook, "inner"))
+        monitor_function(outer, hook, "outer")
+        exporter.write()
+        with open(path) as hdl:
+            events = json.load(hdl)["traceEvents"]
+        assert_equal([e["name"] for e in events], ["inner", "outer"])
+        assert_equal([e["ph"] for e in events], ["X", "X"])
+        assert_equal(events[0]["args"]["parent_id"], events[1]["args"]["id"])
+        assert_equal(events[0]["args"]["status"], "done")
+    finally:
+        shutil.rmtree(tmp_dir)
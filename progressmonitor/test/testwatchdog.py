@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+test queen
+"""
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+from nose.tools import assert_equal
+
+from progressmonitor.clock import FakeClock
+from progressmonitor.monitor import ProgressableTask, monitor_generator
+from progressmonitor.watchdog import (Watchdog, watchdog_hook_factory,
+                                      stall_hook_factory)
+
+
+def test_stall_detection():
+    stalled = []
+    def stall_hook(task, stalled_for, frame=None):
+        stalled.append((task, stalled_for))
+
+    clock = FakeClock()
+    watchdog = Watchdog(stall_hook, clock=clock)
+    task = ProgressableTask(10)
+    task.start()
+    watchdog.watch(task, 5)
+    watchdog.stop()
+
+    clock.advance(1)
+    assert_equal(watchdog.check(), [])
+    clock.advance(5)
+    assert_equal(watchdog.check(), [task])
+    # Reported only once
+    clock.advance(1)
+    assert_equal(watchdog.check(), [])
+    # Re-armed after progress
+    task.update(1)
+    clock.advance(1)
+    assert_equal(watchdog.check(), [])
+    clock.advance(6)
+    assert_equal(watchdog.check(), [task])
+    assert_equal(stalled, [(task, 6), (task, 6)])
+
+    task.close()
+    clock.advance(6)
+    assert_equal(watchdog.check(), [])
+    assert_equal(watchdog.is_watching(task), False)
+
+
+def test_watchdog_hook():
+    watchdog = Watchdog(lambda *args: None)
+    watchdog_hook = watchdog_hook_factory(60, watchdog)
+    tasks = []
+    def hook(task, exception=None):
+        tasks.append(task)
+        watchdog_hook(task, exception)
+    seen = []
+    for _ in monitor_generator(xrange(3), hook):
+        seen.append(watchdog.is_watching(tasks[-1]))
+    watchdog.stop()
+    assert_equal(seen, [True, True, True])
+    # The finished task is not watched anymore
+    assert_equal(watchdog.is_watching(tasks[0]), False)
+
+
+def test_stall_hook_message():
+    messages = []
+    def callback(string, last_com=False):
+        messages.append(string)
+    task = ProgressableTask(None, "lengthy")
+    stall_hook_factory(callback)(task, 3.5)
+    assert_equal(messages[0].endswith("lengthy stalled for 3.50 s "
+                                      "(progress: 0/???)"), True)
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Module :mod:`trace` exports the monitored tasks as a timeline.
+
+Nested monitors (a monitored function iterating over a monitored generator,
+for instance) produce linked tasks: each task records the id of the task
+which was running when it was created (see :func:`monitor.current_task`)
+and the trace id of the tree it belongs to. The context is kept per
+thread, so that tasks created in another thread start a new trace.
+
+A :class:`ChromeTraceExporter` collects the finished tasks as complete
+events of the trace event format, which can be loaded in a trace viewer
+(chrome://tracing, Perfetto, ...).
+"""
+
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+import os
+import json
+import atexit
+from threading import Lock
+try:
+    from threading import current_thread
+except ImportError:
+    from threading import currentThread as current_thread
+
+from .monitor import Task
+
+
+class ChromeTraceExporter(object):
+    """
+    ===================
+    ChromeTraceExporter
+    ===================
+    A :class:`ChromeTraceExporter` collects the finished tasks and writes
+    them as a trace event JSON file. The file is written by :meth:`write`
+    and at interpreter exit.
+
+    Constructor parameters
+    ----------------------
+    path : str
+        The path of the trace file
+    max_events : int (Default : 100000)
+        The maximum number of events kept (the subsequent ones are dropped)
+    """
+
+    def __init__(self, path, max_events=100000):
+        self._path = path
+        self._max_events = max_events
+        self._lock = Lock()
+        self._events = []
+        self._pid = os.getpid()
+        atexit.register(self._write_at_exit)
+
+    @property
+    def events(self):
+        """
+        Return
+        ------
+        events : list of dict
+            The events collected so far
+        """
+        with self._lock:
+            return list(self._events)
+
+    def add(self, task, exception=None):
+        """
+        Add a finished task to the trace
+
+        Parameters
+        ----------
+        task : :class:`Task`
+            The finished task
+        exception : Exception (Default : None)
+            The exception if one occured (None otherwise)
+        """
+        args = {"id": task.id, "trace_id": task.trace_id,
+                "parent_id": task.parent_id, "progress": task.progress,
+                "status": Task.STATUS_NAMES.get(task.status, "unknown")}
+        if exception is not None:
+            args["exception"] = exception.__class__.__name__
+        event = {"name": str(task.name), "cat": "progressmonitor",
+                 "ph": "X", "ts": task.timestamp * 1e6,
+                 "dur": task.duration * 1e6, "pid": self._pid,
+                 "tid": current_thread().ident, "args": args}
+        with self._lock:
+            if len(self._events) < self._max_events:
+                self._events.append(event)
+
+    def write(self):
+        """
+        Write the trace file
+        """
+        trace = {"traceEvents": self.events, "displayTimeUnit": "ms"}
+        with open(self._path, "w") as hdl:
+            json.dump(trace, hdl)
+
+    def _write_at_exit(self):
+        try:
+            self.write()
+        except (IOError, OSError):
+            # The directory may be gone by now
+            pass
+
+
+_exporters = dict()
+_exporters_lock = Lock()
+
+def get_chrome_trace_exporter(path):
+    """
+    Return
+    ------
+    exporter : :class:`ChromeTraceExporter`
+        The exporter of the given path, shared by all the monitors (created
+        on first use)
+    """
+    with _exporters_lock:
+        exporter = _exporters.get(path, None)
+        if exporter is None:
+            exporter = ChromeTraceExporter(path)
+            _exporters[path] = exporter
+    return exporter
+
+
+def chrome_trace_hook_factory(trace_path="progressmonitor_trace.json",
+                              trace_exporter=None):
+    """
+    Hook factory which adds the finished tasks to a
+    :class:`ChromeTraceExporter`
+
+    Parameters
+    ----------
+    trace_path : str (Default : "progressmonitor_trace.json")
+        The path of the trace file
+    trace_exporter : :class:`ChromeTraceExporter` or None (Default : None)
+        The exporter to use. If None, the shared exporter of the given path
+        is used
+
+    Return
+    ------
+    :func:`chrome_trace_hook`
+    """
+    if trace_exporter is None:
+        trace_exporter = get_chrome_trace_exporter(trace_path)
+
+    def chrome_trace_hook(task, exception=None):
+        """
+        :func:`hook` which adds the task to the trace once it is over
+
+        Parameters
+        ----------
+        task : :class:`Task`
+            The monitored task
+        exception : Exception (Default : None)
+            The exception if one occured (None otherwise)
+        """
+        if exception is not None or task.status > Task.RUNNING:
+            trace_exporter.add(task, exception)
+
+    return chrome_trace_hook
@@ -9,9 +9,16 @@ __copyright__ = "3-clause BSD License"
 __version__ = '1.0'
 __date__ = "08 January 2015"
 
+import os
+import sys
 import math
 from inspect import getargspec
 import logging
+from itertools import islice
+try:
+    from reprlib import Repr
+except ImportError:
+    from repr import Repr
 
 
 def nb_notifs_from_rate(rate, length):
@@ -119,6 +126,174 @@ def format_size(nb_bytes):
     return "%3.1f %s" % (nb_bytes, 'TB')
 
 
+class Summary(str):
+    """
+    =======
+    Summary
+    =======
+    A string which is its own representation, so that the summaries held in
+    containers are displayed as is (see :func:`summarize`)
+
+    >>> (Summary("<list len=3>"),)
+    (<list len=3>,)
+    """
+    __slots__ = ()
+
+    def __repr__(self):
+        return str.__str__(self)
+
+
+def _describe(obj):
+    # A constant-cost description of the objects which have no bounded
+    # representation
+    try:
+        return "<%s len=%d>" % (type(obj).__name__, len(obj))
+    except Exception:
+        return object.__repr__(obj)
+
+
+class _SummaryRepr(Repr):
+    # A :class:`Repr` whose cost does not depend on the size of the object:
+    # the builtin repr is only used for the scalars, the sets and dicts are
+    # not sorted and everything else is described by its type and length
+
+    _scalar_types = (bool, float, complex, type(None))
+
+    def repr1(self, x, level):
+        if isinstance(x, (int, long)) and not isinstance(x, bool):
+            if abs(x).bit_length() > 4 * self.maxother:
+                return "<%s bits=%d>" % (type(x).__name__,
+                                          abs(x).bit_length())
+            return Repr.repr1(self, x, level)
+        if (type(x) in self._scalar_types or
+                hasattr(self, "repr_" + type(x).__name__)):
+            return Repr.repr1(self, x, level)
+        return _describe(x)
+
+    def repr_unicode(self, x, level):
+        # Same truncation as str (the slice bounds the work)
+        return Repr.repr_str(self, x, level)
+
+    def repr_set(self, x, level):
+        return self._repr_iterable(x, level, "set([", "])", self.maxset)
+
+    def repr_frozenset(self, x, level):
+        return self._repr_iterable(x, level, "frozenset([", "])",
+                                   self.maxfrozenset)
+
+    def repr_dict(self, x, level):
+        if len(x) == 0:
+            return "{}"
+        if level <= 0:
+            return "{...}"
+        pieces = []
+        for key, value in islice(x.iteritems(), self.maxdict):
+            pieces.append("%s: %s" % (self.repr1(key, level - 1),
+                                      self.repr1(value, level - 1)))
+        if len(x) > self.maxdict:
+            pieces.append("...")
+        return "{%s}" % ", ".join(pieces)
+
+    def repr_instance(self, x, level):
+        return _describe(x)
+
+
+_summary_repr = _SummaryRepr()
+_summary_repr.maxlevel = 2
+_summary_repr.maxstring = 40
+_summary_repr.maxother = 40
+
+def summarize(obj):
+    """
+    Summarize an object in bounded memory and time: its type, its length or
+    shape if it has one and a truncated representation. Only the builtin
+    scalars and containers are represented; the other objects (arrays,
+    bytearrays, instances, ...) are only described
+
+    Parameters
+    ----------
+    obj : object
+        The object to summarize
+
+    Return
+    ------
+    summary : :class:`Summary`
+        The summary of the object
+
+    Example
+    -------
+    >>> summarize(range(1000))
+    <list len=1000> [0, 1, 2, 3, 4, 5, ...]
+    >>> summarize(3.5)
+    3.5
+    >>> summarize("spam")
+    'spam'
+    >>> summarize(bytearray(1000))
+    <bytearray len=1000>
+    """
+    if isinstance(obj, Summary):
+        return obj
+    shape = getattr(obj, "shape", None)
+    if isinstance(shape, tuple) and len(shape) > 0:
+        # Arrays, data frames, ...
+        dtype = getattr(obj, "dtype", None)
+        return Summary("<%s shape=%s%s>" % (type(obj).__name__, shape,
+                                            "" if dtype is None else
+                                            " dtype=%s" % dtype))
+    try:
+        string = _summary_repr.repr(obj)
+    except Exception:
+        string = "<%s object>" % type(obj).__name__
+    if string.startswith("<"):
+        # Already a description
+        return Summary(string)
+    if isinstance(obj, basestring):
+        if len(obj) <= _summary_repr.maxstring:
+            return Summary(string)
+    elif not hasattr(obj, "__len__"):
+        return Summary(string)
+    try:
+        length = len(obj)
+    except Exception:
+        return Summary(string)
+    return Summary("<%s len=%d> %s" % (type(obj).__name__, length, string))
+
+
+
+def terminal_width(stream=None, default=80):
+    """
+    Return the width (in characters) of the terminal
+
+    Parameters
+    ----------
+    stream : file or None (Default : None)
+        The stream attached to the terminal. If None, stdout is used
+    default : int (Default : 80)
+        The width to return if it cannot be determined
+
+    Return
+    ------
+    width : int
+        The number of columns of the terminal
+    """
+    if stream is None:
+        stream = sys.stdout
+    try:
+        import fcntl
+        import termios
+        import struct
+        packed = fcntl.ioctl(stream.fileno(), termios.TIOCGWINSZ, "\0" * 8)
+        width = struct.unpack("hhhh", packed)[1]
+        if width > 0:
+            return width
+    except Exception:
+        pass
+    try:
+        return int(os.environ["COLUMNS"])
+    except (KeyError, ValueError):
+        return default
+
+
 
 # ============================== INSPECTION ============================== #
 
@@ -274,6 +449,9 @@ class IdProxy(object):
     def __call__(self, f):
         return f
 
+    def lap(self, phase_name=None):
+        pass
+
     def __enter__(self):
         return self
 
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+Module :mod:`watchdog` provides a stall detection mechanism for monitored
+tasks.
+
+Monitors only notify their hook when an element is produced (generators) or
+at the end of the task (functions and pieces of code). A task which hangs
+(on a network read, for instance) therefore goes silent. A :class:`Watchdog`
+keeps track of the last progress of the tasks it watches and, from a single
+background thread, issues a stall hook for those which have not progressed
+for longer than their threshold.
+
+The watchdog reads the state of the tasks; it does not need to be notified
+at each iteration and thus imposes no overhead on the iteration path.
+
+Stall hooks are of the form
+    Parameters
+    ----------
+    task : :class:`Task`
+        The stalled task
+    stalled_for : float
+        The time elapsed since the last progress (in seconds)
+    frame : frame or None
+        The current frame of the thread which runs the task (None if the
+        thread is not alive anymore)
+"""
+
+
+__author__ = "Begon Jean-Michel <jm.begon@gmail.com>"
+__copyright__ = "3-clause BSD License"
+__version__ = '1.0'
+__date__ = "19 October 2026"
+
+import sys
+import atexit
+import traceback
+import weakref
+from threading import Thread, Lock, Event
+from logging import WARNING
+try:
+    from threading import current_thread
+except ImportError:
+    from threading import currentThread as current_thread
+
+from .monitor import Task
+from .callback import logging_callback_factory
+from .clock import monotonic
+
+
+# ============================== STALL HOOK ============================== #
+
+def stall_hook_factory(callback=None, dump_stack=True):
+    """
+    Stall hook factory
+
+    Parameters
+    ----------
+    callback : :func:`callback` or None (Default : None)
+        The callback through which to send the message. If None, the message
+        is logged with the 'progressmonitor.watchdog' logger at the WARNING
+        level
+    dump_stack : bool (Default : True)
+        Whether to append the stack of the stuck thread to the message
+
+    Return
+    ------
+    :func:`stall_hook`
+    """
+    if callback is None:
+        callback = logging_callback_factory("progressmonitor.watchdog",
+                                            WARNING)
+
+    def stall_hook(task, stalled_for, frame=None):
+        """
+        Stall hook
+
+        Example
+        -------
+        Task # 3: download stalled for 31.02 s (progress: 12/???)
+        """
+        length = task.nb_steps
+        length = str(length) if length is not None else "???"
+        msg = "Task # %d: %s stalled for %.2f s (progress: %d/%s)" % \
+              (task.id, task.name, stalled_for, task.progress, length)
+        if dump_stack and frame is not None:
+            msg += "\n" + "".join(traceback.format_stack(frame))
+        callback(msg, False)
+
+    return stall_hook
+
+
+# ============================== WATCHDOG ============================== #
+
+class Watchdog(object):
+    """
+    ========
+    Watchdog
+    ========
+    A :class:`Watchdog` detects tasks which do not make progress anymore.
+
+    The tasks are watched through weak references so that an abandoned
+    generator does not keep its task alive. A stall is reported once; the
+    watchdog re-arms itself as soon as the task progresses again.
+
+    Constructor parameters
+    ----------------------
+    stall_hook : callable (:class:`Task`, float, frame) or None
+    (Default : None)
+        The hook to call when a task is stalled. If None, a default
+        :func:`stall_hook_factory` is used
+    period : float (Default : 1.)
+        The period (in seconds) at which the background thread inspects
+        the tasks
+    clock : callable () --> float or None (Default : None)
+        The clock measuring the stalls (see :mod:`clock`). If None,
+        :data:`clock.monotonic` is used, so that an adjustment of the system
+        time neither fakes nor hides a stall (the clock is only read once
+        per period)
+    """
+
+    def __init__(self, stall_hook=None, period=1., clock=None):
+        if stall_hook is None:
+            stall_hook = stall_hook_factory()
+        self._stall_hook = stall_hook
+        self._period = period
+        self._clock = monotonic if clock is None else clock
+        self._lock = Lock()
+        self._watched = dict()
+        self._thread = None
+        self._stop_event = Event()
+
+    def watch(self, task, threshold, thread_id=None):
+        """
+        Start watching the given task
+
+        Parameters
+        ----------
+        task : :class:`Task`
+            The task to watch
+        threshold : float
+            The time (in seconds) without progress after which the task is
+            deemed stalled
+        thread_id : int or None (Default : None)
+            The id of the thread running the task. If None, the current
+            thread is assumed
+        """
+        if thread_id is None:
+            thread_id = current_thread().ident
+        entry = [weakref.ref(task), thread_id, threshold, task.progress,
+                 self._clock(), False]
+        with self._lock:
+            self._watched[task.id] = entry
+        if self._thread is None:
+            self.start()
+
+    def unwatch(self, task):
+        """
+        Stop watching the given task
+
+        Parameters
+        ----------
+        task : :class:`Task`
+            The task to forget about
+        """
+        with self._lock:
+            self._watched.pop(task.id, None)
+
+    def is_watching(self, task):
+        """
+        Return
+        ------
+        is_watching : bool
+            Whether the given task is being watched
+        """
+        return task.id in self._watched
+
+    def check(self, now=None):
+        """
+        Inspect the watched tasks and issue the stall hook for those which
+        have not made progress for longer than their threshold
+
+        Parameters
+        ----------
+        now : float or None (Default : None)
+            The current timestamp. If None, it is read from the clock
+
+        Return
+        ------
+        stalled : list of :class:`Task`
+            The tasks for which the stall hook has been issued
+        """
+        if now is None:
+            now = self._clock()
+        stalled = []
+        with self._lock:
+            for task_id, entry in list(self._watched.items()):
+                task = entry[0]()
+                if task is None or task.status > Task.RUNNING:
+                    # Abandoned or finished task
+                    del self._watched[task_id]
+                    continue
+                progress = task.progress
+                if progress != entry[3]:
+                    # The task moved on: re-arm
+                    entry[3] = progress
+                    entry[4] = now
+                    entry[5] = False
+                elif not entry[5] and (now - entry[4]) >= entry[2]:
+                    entry[5] = True
+                    stalled.append((task, entry[1], now - entry[4]))
+        # Hooks are called outside of the lock
+        frames = sys._current_frames() if len(stalled) > 0 else {}
+        for task, thread_id, stalled_for in stalled:
+            self._stall_hook(task, stalled_for, frames.get(thread_id))
+        return [task for task, _, _ in stalled]
+
+    def _run(self):
+        while not self._stop_event.wait(self._period):
+            self.check()
+
+    def start(self):
+        """
+        Start the background thread (done automatically on the first
+        :meth:`watch`)
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop_event.clear()
+            thread = Thread(target=self._run, name="progressmonitor.watchdog")
+            thread.daemon = True
+            self._thread = thread
+        atexit.register(self.stop)
+        thread.start()
+
+    def stop(self):
+        """
+        Stop the background thread
+        """
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._stop_event.set()
+            thread.join()
+
+
+_default_watchdog = [None]
+_default_watchdog_lock = Lock()
+
+def default_watchdog():
+    """
+    Return
+    ------
+    watchdog : :class:`Watchdog`
+        The library-wide watchdog (created on first use)
+    """
+    with _default_watchdog_lock:
+        if _default_watchdog[0] is None:
+            _default_watchdog[0] = Watchdog()
+    return _default_watchdog[0]
+
+
+def watchdog_hook_factory(stall_threshold, watchdog=None):
+    """
+    Hook factory which registers the notified tasks to a watchdog
+
+    Parameters
+    ----------
+    stall_threshold : float
+        The time (in seconds) without progress after which a task is
+        deemed stalled
+    watchdog : :class:`Watchdog` or None (Default : None)
+        The watchdog to use. If None, the library-wide one is used
+
+    Return
+    ------
+    :func:`watchdog_hook`
+    """
+    if watchdog is None:
+        watchdog = default_watchdog()
+
+    def watchdog_hook(task, exception=None):
+        """
+        :func:`hook` which (un)registers the task to the watchdog
+
+        Parameters
+        ----------
+        task : :class:`Task`
+            The monitored task
+        exception : Exception (Default : None)
+            The exception if one occured (None otherwise)
+        """
+        if exception is not None or task.status > Task.RUNNING:
+            watchdog.unwatch(task)
+        elif not watchdog.is_watching(task):
+            watchdog.watch(task, stall_threshold)
+
+    return watchdog_hook